@@ -21,6 +21,98 @@ class Settings:
     db_path: str = os.getenv("DB_PATH", "data/database.sqlite3")
     log_level: str = os.getenv("LOG_LEVEL", "INFO")
 
+    # Пул подключений к SQLite: один писатель + N читателей
+    db_pool_size: int = int(os.getenv("DB_POOL_SIZE", "4"))
+    db_mmap_size: int = int(os.getenv("DB_MMAP_SIZE", str(256 * 1024 * 1024)))
+    # Отрицательное значение — размер кэша в KiB (см. PRAGMA cache_size)
+    db_cache_size: int = int(os.getenv("DB_CACHE_SIZE", "-32768"))
+    db_synchronous: str = os.getenv("DB_SYNCHRONOUS", "NORMAL")
+    db_busy_timeout_ms: int = int(os.getenv("DB_BUSY_TIMEOUT_MS", "5000"))
+
+    # Group commit: пачка коммитится по таймеру или по числу записей
+    db_flush_interval_ms: int = int(os.getenv("DB_FLUSH_INTERVAL_MS", "50"))
+    db_flush_max_rows: int = int(os.getenv("DB_FLUSH_MAX_ROWS", "500"))
+
+    # Пакетное сохранение пользователей из входящих событий
+    user_sync_interval: float = float(os.getenv("USER_SYNC_INTERVAL", "1.0"))
+    user_sync_batch_size: int = int(os.getenv("USER_SYNC_BATCH_SIZE", "200"))
+
+    # Рассылки: глобальный лимит Telegram ~30 сообщений/сек
+    broadcast_rate: float = float(os.getenv("BROADCAST_RATE", "30"))
+    broadcast_chat_interval: float = float(os.getenv("BROADCAST_CHAT_INTERVAL", "1.0"))
+    broadcast_workers: int = int(os.getenv("BROADCAST_WORKERS", "16"))
+    broadcast_batch_size: int = int(os.getenv("BROADCAST_BATCH_SIZE", "200"))
+    broadcast_max_attempts: int = int(os.getenv("BROADCAST_MAX_ATTEMPTS", "3"))
+    broadcast_progress_interval: float = float(os.getenv("BROADCAST_PROGRESS_INTERVAL", "5"))
+
+    # Кэш сроков подписки (проверка доступа без запроса к БД)
+    subscription_cache_size: int = int(os.getenv("SUBSCRIPTION_CACHE_SIZE", "100000"))
+    subscription_cache_ttl: float = float(os.getenv("SUBSCRIPTION_CACHE_TTL", "300"))
+
+    # Планировщик окончания подписок
+    expiry_reminder_days: float = float(os.getenv("EXPIRY_REMINDER_DAYS", "3"))
+    expiry_window_days: float = float(os.getenv("EXPIRY_WINDOW_DAYS", "7"))
+
+    # Кэш готовых планов (только для генерации с seed)
+    plan_cache_size: int = int(os.getenv("PLAN_CACHE_SIZE", "5000"))
+    plan_cache_ttl: float = float(os.getenv("PLAN_CACHE_TTL", "21600"))
+
+    # Пакетная генерация (/batch)
+    batch_max_plans: int = int(os.getenv("BATCH_MAX_PLANS", "50"))
+    batch_max_file_size: int = int(os.getenv("BATCH_MAX_FILE_SIZE", "65536"))
+
+    # История планов (/history): планов на странице
+    history_page_size: int = int(os.getenv("HISTORY_PAGE_SIZE", "5"))
+
+    # Поиск по планам (/search): результатов на странице, фоновая индексация старых планов
+    search_page_size: int = int(os.getenv("SEARCH_PAGE_SIZE", "5"))
+    search_backfill_batch_size: int = int(os.getenv("SEARCH_BACKFILL_BATCH_SIZE", "2000"))
+    search_backfill_pause: float = float(os.getenv("SEARCH_BACKFILL_PAUSE", "0.05"))
+
+    # Выгрузка истории (/export): до N байт в памяти, дальше — во временном файле
+    export_spool_size: int = int(os.getenv("EXPORT_SPOOL_SIZE", str(1024 * 1024)))
+    export_max_concurrency: int = int(os.getenv("EXPORT_MAX_CONCURRENCY", "2"))
+
+    # Статистика /admin: как часто записывать число активных подписчиков, сек
+    stats_snapshot_interval: float = float(os.getenv("STATS_SNAPSHOT_INTERVAL", "3600"))
+
+    # Популярные ниши (/top): top-K за час, размер count-min sketch, сброс в БД, хранение
+    trends_top_k: int = int(os.getenv("TRENDS_TOP_K", "50"))
+    trends_sketch_width: int = int(os.getenv("TRENDS_SKETCH_WIDTH", "2048"))
+    trends_sketch_depth: int = int(os.getenv("TRENDS_SKETCH_DEPTH", "4"))
+    trends_flush_interval: float = float(os.getenv("TRENDS_FLUSH_INTERVAL", "300"))
+    trends_retention_days: float = float(os.getenv("TRENDS_RETENTION_DAYS", "7"))
+
+    # Прогрев кэша планов: сколько популярных ниш за сутки, пауза между планами, сек
+    prewarm_top_niches: int = int(os.getenv("PREWARM_TOP_NICHES", "20"))
+    prewarm_pause: float = float(os.getenv("PREWARM_PAUSE", "0.01"))
+
+    # Оценки планов: запись пачкой раз в N секунд или по N оценок
+    feedback_flush_interval: float = float(os.getenv("FEEDBACK_FLUSH_INTERVAL", "5"))
+    feedback_batch_size: int = int(os.getenv("FEEDBACK_BATCH_SIZE", "200"))
+
+    # Пул генерации планов: "thread" или "process"; 0 воркеров — по числу CPU (до 4)
+    planner_executor: str = os.getenv("PLANNER_EXECUTOR", "thread")
+    planner_workers: int = int(os.getenv("PLANNER_WORKERS", "0"))
+    planner_max_queue: int = int(os.getenv("PLANNER_MAX_QUEUE", "100"))
+
+    # Очередь заданий генерации (SQLite)
+    job_workers: int = int(os.getenv("JOB_WORKERS", "4"))
+    job_max_pending: int = int(os.getenv("JOB_MAX_PENDING", "10000"))
+    job_retention_days: float = float(os.getenv("JOB_RETENTION_DAYS", "7"))
+
+    # LLM-бэкенд (GigaChat-совместимый /chat/completions); пустой URL — только шаблоны
+    llm_api_url: str = os.getenv("LLM_API_URL", "")
+    llm_api_token: str = os.getenv("LLM_API_TOKEN", "")
+    llm_model: str = os.getenv("LLM_MODEL", "GigaChat")
+    llm_timeout: float = float(os.getenv("LLM_TIMEOUT", "30"))
+    llm_latency_budget: float = float(os.getenv("LLM_LATENCY_BUDGET", "15"))
+    llm_max_concurrency: int = int(os.getenv("LLM_MAX_CONCURRENCY", "8"))
+    llm_verify_ssl: bool = os.getenv("LLM_VERIFY_SSL", "true").lower() not in ("0", "false", "no")
+
+    # Постепенная доставка плана: не чаще одной правки сообщения за N секунд
+    stream_edit_interval: float = float(os.getenv("STREAM_EDIT_INTERVAL", "1.0"))
+
     def __post_init__(self):
         admin_ids_str = os.getenv("ADMIN_IDS", "")
         if admin_ids_str:
@@ -1,30 +1,65 @@
 """
 Управление подключением к базе данных.
 Использует aiosqlite для асинхронной работы с SQLite.
+
+Пул состоит из одного подключения-писателя и нескольких read-only
+подключений. В режиме WAL читатели не блокируются писателем, поэтому
+медленные выборки не задерживают проверки подписки и наоборот.
 """
 
 import aiosqlite
+import itertools
 import logging
 import os
-from typing import Optional
+from pathlib import Path
+from typing import Iterator, List, Optional
 
 from app.config import settings
+from app.database.migrations import migrate
 
 logger = logging.getLogger(__name__)
 
-_connection: Optional[aiosqlite.Connection] = None
+_writer: Optional[aiosqlite.Connection] = None
+_readers: List[aiosqlite.Connection] = []
+_reader_cycle: Optional[Iterator[aiosqlite.Connection]] = None
+
+
+def _is_memory_db(path: str) -> bool:
+    """In-memory БД не разделяется между подключениями."""
+    return path == ":memory:" or path.startswith("file::memory:")
+
+
+async def _apply_pragmas(conn: aiosqlite.Connection, readonly: bool) -> None:
+    """Общие PRAGMA для всех подключений пула."""
+    await conn.execute(f"PRAGMA busy_timeout = {int(settings.db_busy_timeout_ms)}")
+    await conn.execute(f"PRAGMA cache_size = {int(settings.db_cache_size)}")
+    await conn.execute(f"PRAGMA mmap_size = {int(settings.db_mmap_size)}")
+    await conn.execute("PRAGMA temp_store = MEMORY")
+    if readonly:
+        await conn.execute("PRAGMA query_only = ON")
+    else:
+        await conn.execute(f"PRAGMA synchronous = {settings.db_synchronous}")
 
 
-async def get_connection() -> aiosqlite.Connection:
-    """Получить текущее подключение к БД."""
-    if _connection is None:
+async def get_connection(readonly: bool = False) -> aiosqlite.Connection:
+    """
+    Получить подключение к БД.
+
+    Args:
+        readonly: True — вернуть одно из read-only подключений пула
+            (по кругу). Для in-memory БД и пула без читателей
+            возвращается подключение-писатель.
+    """
+    if _writer is None:
         raise RuntimeError("Database not initialized. Call init_db() first.")
-    return _connection
+    if readonly and _reader_cycle is not None:
+        return next(_reader_cycle)
+    return _writer
 
 
 async def init_db() -> None:
     """Инициализация базы данных."""
-    global _connection
+    global _writer, _readers, _reader_cycle
 
     # Создаём директорию для БД если не существует
     db_dir = os.path.dirname(settings.db_path)
@@ -32,41 +67,43 @@ async def init_db() -> None:
         os.makedirs(db_dir, exist_ok=True)
         logger.info(f"Created database directory: {db_dir}")
 
-    _connection = await aiosqlite.connect(settings.db_path)
-    _connection.row_factory = aiosqlite.Row
-
-    # Создание таблиц
-    await _connection.executescript("""
-        CREATE TABLE IF NOT EXISTS users (
-            id INTEGER PRIMARY KEY,
-            telegram_id INTEGER UNIQUE NOT NULL,
-            username TEXT,
-            first_name TEXT,
-            subscription_end_date TIMESTAMP,
-            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-        );
-
-        CREATE TABLE IF NOT EXISTS content_plans (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            user_id INTEGER NOT NULL,
-            niche TEXT NOT NULL,
-            target_audience TEXT,
-            plan_content TEXT NOT NULL,
-            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-            FOREIGN KEY (user_id) REFERENCES users(telegram_id)
-        );
-
-        CREATE INDEX IF NOT EXISTS idx_users_telegram_id ON users(telegram_id);
-        CREATE INDEX IF NOT EXISTS idx_plans_user_id ON content_plans(user_id);
-    """)
-    await _connection.commit()
-    logger.info(f"Database initialized: {settings.db_path}")
+    _writer = await aiosqlite.connect(settings.db_path)
+    _writer.row_factory = aiosqlite.Row
+
+    in_memory = _is_memory_db(settings.db_path)
+    if not in_memory:
+        await _writer.execute("PRAGMA journal_mode = WAL")
+    await _apply_pragmas(_writer, readonly=False)
+
+    # Схема создаётся и обновляется версионными миграциями
+    version = await migrate(_writer)
+
+    # Читатели открываются после создания схемы: read-only подключение
+    # не может создать файл БД
+    _readers = []
+    if not in_memory:
+        uri = Path(settings.db_path).resolve().as_uri() + "?mode=ro"
+        for _ in range(max(0, settings.db_pool_size)):
+            reader = await aiosqlite.connect(uri, uri=True)
+            reader.row_factory = aiosqlite.Row
+            await _apply_pragmas(reader, readonly=True)
+            _readers.append(reader)
+    _reader_cycle = itertools.cycle(_readers) if _readers else None
+
+    logger.info(
+        f"Database initialized: {settings.db_path} "
+        f"(schema v{version}, readers: {len(_readers)})"
+    )
 
 
 async def close_db() -> None:
-    """Закрытие подключения к БД."""
-    global _connection
-    if _connection:
-        await _connection.close()
-        _connection = None
+    """Закрытие подключений к БД."""
+    global _writer, _readers, _reader_cycle
+    for reader in _readers:
+        await reader.close()
+    _readers = []
+    _reader_cycle = None
+    if _writer:
+        await _writer.close()
+        _writer = None
         logger.info("Database connection closed")
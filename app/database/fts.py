@@ -0,0 +1,87 @@
+"""
+Термы полнотекстового индекса планов (content_plans_fts).
+
+Каждое слово индексируется вместе с ID владельца плана: «17_марафон».
+Поиск пользователя затрагивает только его термы — префиксный запрос
+«17_мара»* читает узкий диапазон словаря FTS5, а не списки документов
+всех пользователей, поэтому время запроса не растёт с размером таблицы.
+
+Термы считаются в Python при сохранении плана (search_terms) и хранятся
+в content_plans.search_terms; триггеры только переносят их в индекс.
+Индекс без содержимого (content=''), и удаление из него должно получить
+ровно те термы, что были добавлены, — их и даёт сохранённая колонка,
+что бы потом ни поменялось в шаблонах планов. Для компактного плана
+(plan_content пуст) термы считаются по отрисованному тексту.
+"""
+
+import re
+from typing import List, Optional
+
+# Вес поля для bm25: сколько раз его термы повторяются в документе
+NICHE_WEIGHT = 3
+AUDIENCE_WEIGHT = 2
+
+# Слов запроса, которые учитываются при поиске
+MAX_QUERY_WORDS = 8
+# У длинных слов запроса отбрасывается окончание: «марафону» ищется как «марафо»*
+STEM_MIN_LENGTH = 6
+STEM_CUT = 2
+
+_WORD_RE = re.compile(r"[^\W_]+")
+_HTML_TAG_RE = re.compile(r"<[^>]+>")
+
+
+def normalize_word(word: str) -> str:
+    """Слово в форме для индекса: без регистра, «ё» как «е»."""
+    return word.casefold().replace("ё", "е")
+
+
+def search_words(text: Optional[str]) -> List[str]:
+    """Слова текста для индекса и запросов (HTML-теги отбрасываются)."""
+    if not text:
+        return []
+    return [normalize_word(w) for w in _WORD_RE.findall(_HTML_TAG_RE.sub(" ", text))]
+
+
+def search_terms(
+    user_id: int,
+    niche: Optional[str],
+    target_audience: Optional[str],
+    plan_content: Optional[str]
+) -> str:
+    """
+    Текст документа FTS для плана: слова с префиксом владельца.
+
+    Слова текста плана берутся по одному разу: термы хранятся в строке
+    плана, а шаблонные планы повторяют одни и те же слова изо дня в день.
+    """
+    terms = []
+    for words, weight in (
+        (search_words(niche), NICHE_WEIGHT),
+        (search_words(target_audience), AUDIENCE_WEIGHT),
+        (dict.fromkeys(search_words(plan_content)), 1),
+    ):
+        terms.extend([f"{user_id}_{word}" for word in words] * weight)
+    return " ".join(terms)
+
+
+def build_match(user_id: int, query: str) -> Optional[str]:
+    """
+    Выражение MATCH для запроса пользователя.
+
+    Все слова (кроме однобуквенных предлогов) обязательны и ищутся по
+    началу, без окончания у длинных слов: «подготовку к марафону»
+    находит «марафон: подготовка».
+
+    Returns:
+        Выражение или None, если в запросе нет слов
+    """
+    words = [
+        word[:-STEM_CUT] if len(word) >= STEM_MIN_LENGTH else word
+        for word in search_words(query)
+        if len(word) > 1
+    ]
+    words = list(dict.fromkeys(words))[:MAX_QUERY_WORDS]
+    if not words:
+        return None
+    return " ".join(f'"{user_id}_{word}"*' for word in words)
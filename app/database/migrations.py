@@ -0,0 +1,745 @@
+"""
+Версионные миграции схемы БД.
+
+Текущая версия схемы хранится в ``PRAGMA user_version``. Каждая миграция
+применяется один раз и повышает версию. Долгие миграции переносят данные
+пачками, а позицию сохраняют в ``schema_migration_progress`` в той же
+транзакции, что и пачку, — после падения процесса перенос продолжается
+с последней закоммиченной пачки.
+
+Запуск вручную (например, из entrypoint.sh):
+    python -m app.database.migrations
+"""
+
+import asyncio
+import logging
+from dataclasses import dataclass
+from typing import Awaitable, Callable, List, Optional
+
+import aiosqlite
+
+logger = logging.getLogger(__name__)
+
+# Сколько строк переносится за одну транзакцию
+BATCH_SIZE = 20_000
+
+# Текущее время в секундах Unix внутри SQL
+SQL_NOW = "CAST(strftime('%s', 'now') AS INTEGER)"
+
+
+@dataclass(frozen=True)
+class Migration:
+    """Одна миграция схемы."""
+
+    version: int
+    name: str
+    apply: Callable[[aiosqlite.Connection], Awaitable[None]]
+
+
+async def _get_version(conn: aiosqlite.Connection) -> int:
+    cursor = await conn.execute("PRAGMA user_version")
+    row = await cursor.fetchone()
+    return row[0]
+
+
+async def _get_progress(conn: aiosqlite.Connection, version: int, step: str) -> int:
+    cursor = await conn.execute(
+        "SELECT position FROM schema_migration_progress WHERE version = ? AND step = ?",
+        (version, step)
+    )
+    row = await cursor.fetchone()
+    return row[0] if row else 0
+
+
+async def copy_in_batches(
+    conn: aiosqlite.Connection,
+    version: int,
+    step: str,
+    source_table: str,
+    insert_sql: str,
+    batch_size: Optional[int] = None
+) -> int:
+    """
+    Перенести строки таблицы пачками по возрастанию rowid.
+
+    Args:
+        conn: Подключение-писатель
+        version: Версия миграции (для учёта прогресса)
+        step: Имя шага внутри миграции
+        source_table: Таблица-источник
+        insert_sql: INSERT ... SELECT ... FROM source_table
+            WHERE rowid > ? AND rowid <= ?
+        batch_size: Размер пачки (по умолчанию BATCH_SIZE)
+
+    Returns:
+        Количество перенесённых строк
+    """
+    batch_size = batch_size or BATCH_SIZE
+    position = await _get_progress(conn, version, step)
+    copied = 0
+
+    while True:
+        cursor = await conn.execute(
+            f"""SELECT MAX(rowid), COUNT(*) FROM (
+                    SELECT rowid FROM {source_table}
+                    WHERE rowid > ? ORDER BY rowid LIMIT ?
+                )""",
+            (position, batch_size)
+        )
+        upper, count = await cursor.fetchone()
+        if not count:
+            break
+
+        await conn.execute(insert_sql, (position, upper))
+        await conn.execute(
+            """INSERT OR REPLACE INTO schema_migration_progress (version, step, position)
+               VALUES (?, ?, ?)""",
+            (version, step, upper)
+        )
+        await conn.commit()
+
+        position = upper
+        copied += count
+        logger.info(f"Migration {version}/{step}: {copied} rows copied (rowid <= {upper})")
+
+    return copied
+
+
+async def _m001_initial(conn: aiosqlite.Connection) -> None:
+    """Исходная схема (совпадает с тем, что создавал старый init_db)."""
+    await conn.executescript("""
+        CREATE TABLE IF NOT EXISTS users (
+            id INTEGER PRIMARY KEY,
+            telegram_id INTEGER UNIQUE NOT NULL,
+            username TEXT,
+            first_name TEXT,
+            subscription_end_date TIMESTAMP,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        );
+
+        CREATE TABLE IF NOT EXISTS content_plans (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            user_id INTEGER NOT NULL,
+            niche TEXT NOT NULL,
+            target_audience TEXT,
+            plan_content TEXT NOT NULL,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY (user_id) REFERENCES users(telegram_id)
+        );
+
+        CREATE INDEX IF NOT EXISTS idx_users_telegram_id ON users(telegram_id);
+        CREATE INDEX IF NOT EXISTS idx_plans_user_id ON content_plans(user_id);
+    """)
+
+
+async def _m002_rowid_users_epoch_timestamps(conn: aiosqlite.Connection) -> None:
+    """
+    telegram_id становится rowid таблицы users, даты — целыми секундами Unix.
+
+    Таблицы пересобираются копированием пачками в users_v2/content_plans_v2,
+    затем одной транзакцией подменяются исходные.
+    """
+    await conn.executescript(f"""
+        CREATE TABLE IF NOT EXISTS users_v2 (
+            telegram_id INTEGER PRIMARY KEY,
+            username TEXT,
+            first_name TEXT,
+            subscription_end_date INTEGER,
+            created_at INTEGER NOT NULL DEFAULT ({SQL_NOW})
+        );
+
+        CREATE TABLE IF NOT EXISTS content_plans_v2 (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            user_id INTEGER NOT NULL,
+            niche TEXT NOT NULL,
+            target_audience TEXT,
+            plan_content TEXT NOT NULL,
+            created_at INTEGER NOT NULL DEFAULT ({SQL_NOW}),
+            FOREIGN KEY (user_id) REFERENCES users(telegram_id)
+        );
+    """)
+    await conn.commit()
+
+    # subscription_end_date писался из datetime.now() — локальное время,
+    # created_at — CURRENT_TIMESTAMP, т.е. UTC
+    await copy_in_batches(conn, 2, "users", "users", f"""
+        INSERT OR REPLACE INTO users_v2
+            (telegram_id, username, first_name, subscription_end_date, created_at)
+        SELECT
+            telegram_id,
+            username,
+            first_name,
+            CASE
+                WHEN subscription_end_date IS NULL THEN NULL
+                WHEN typeof(subscription_end_date) IN ('integer', 'real')
+                    THEN CAST(subscription_end_date AS INTEGER)
+                ELSE CAST(strftime('%s', subscription_end_date, 'utc') AS INTEGER)
+            END,
+            COALESCE(CAST(strftime('%s', created_at) AS INTEGER), {SQL_NOW})
+        FROM users
+        WHERE rowid > ? AND rowid <= ?
+    """)
+
+    await copy_in_batches(conn, 2, "content_plans", "content_plans", f"""
+        INSERT OR REPLACE INTO content_plans_v2
+            (id, user_id, niche, target_audience, plan_content, created_at)
+        SELECT
+            id, user_id, niche, target_audience, plan_content,
+            COALESCE(CAST(strftime('%s', created_at) AS INTEGER), {SQL_NOW})
+        FROM content_plans
+        WHERE rowid > ? AND rowid <= ?
+    """)
+
+    await conn.executescript("""
+        BEGIN;
+        DROP TABLE users;
+        ALTER TABLE users_v2 RENAME TO users;
+        DROP TABLE content_plans;
+        ALTER TABLE content_plans_v2 RENAME TO content_plans;
+        CREATE INDEX IF NOT EXISTS idx_plans_user_created
+            ON content_plans(user_id, created_at DESC, id DESC);
+        DELETE FROM schema_migration_progress WHERE version = 2;
+        PRAGMA user_version = 2;
+        COMMIT;
+    """)
+
+
+async def _m003_broadcast_jobs(conn: aiosqlite.Connection) -> None:
+    """Флаг активности пользователя и таблица заданий рассылки."""
+    cursor = await conn.execute("PRAGMA table_info(users)")
+    columns = {row[1] for row in await cursor.fetchall()}
+    if "is_active" not in columns:
+        # ADD COLUMN с константой по умолчанию не переписывает таблицу
+        await conn.execute(
+            "ALTER TABLE users ADD COLUMN is_active INTEGER NOT NULL DEFAULT 1"
+        )
+
+    await conn.executescript(f"""
+        CREATE TABLE IF NOT EXISTS broadcast_jobs (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            text TEXT NOT NULL,
+            admin_chat_id INTEGER NOT NULL,
+            progress_message_id INTEGER,
+            status TEXT NOT NULL DEFAULT 'running',
+            total INTEGER NOT NULL DEFAULT 0,
+            last_user_id INTEGER NOT NULL DEFAULT 0,
+            sent INTEGER NOT NULL DEFAULT 0,
+            failed INTEGER NOT NULL DEFAULT 0,
+            blocked INTEGER NOT NULL DEFAULT 0,
+            created_at INTEGER NOT NULL DEFAULT ({SQL_NOW}),
+            updated_at INTEGER NOT NULL DEFAULT ({SQL_NOW})
+        );
+
+        CREATE INDEX IF NOT EXISTS idx_broadcast_jobs_status ON broadcast_jobs(status);
+    """)
+
+
+async def _m004_subscription_end_index(conn: aiosqlite.Connection) -> None:
+    """Индекс для загрузки ближайших окончаний подписок планировщиком."""
+    await conn.execute("""
+        CREATE INDEX IF NOT EXISTS idx_users_subscription_end
+            ON users(subscription_end_date)
+            WHERE subscription_end_date IS NOT NULL
+    """)
+
+
+async def _m005_generation_jobs(conn: aiosqlite.Connection) -> None:
+    """Персистентная очередь заданий генерации планов."""
+    await conn.executescript("""
+        CREATE TABLE IF NOT EXISTS generation_jobs (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            user_id INTEGER NOT NULL,
+            chat_id INTEGER NOT NULL,
+            request_text TEXT NOT NULL,
+            dedup_key TEXT NOT NULL,
+            priority INTEGER NOT NULL,
+            status TEXT NOT NULL DEFAULT 'pending',
+            attempts INTEGER NOT NULL DEFAULT 0,
+            error TEXT,
+            created_at REAL NOT NULL,
+            started_at REAL,
+            finished_at REAL
+        );
+
+        -- Выбор следующего задания: только ожидающие, по приоритету и порядку
+        CREATE INDEX IF NOT EXISTS idx_generation_jobs_pending
+            ON generation_jobs(priority, id) WHERE status = 'pending';
+
+        -- Один и тот же запрос пользователя не ставится в очередь дважды
+        CREATE UNIQUE INDEX IF NOT EXISTS idx_generation_jobs_dedup
+            ON generation_jobs(user_id, dedup_key) WHERE status IN ('pending', 'running');
+
+        CREATE INDEX IF NOT EXISTS idx_generation_jobs_finished
+            ON generation_jobs(finished_at) WHERE finished_at IS NOT NULL;
+    """)
+
+
+async def _m006_generation_job_message(conn: aiosqlite.Connection) -> None:
+    """Сообщение «⏳ Генерирую...», в которое дописывается план."""
+    cursor = await conn.execute("PRAGMA table_info(generation_jobs)")
+    columns = {row[1] for row in await cursor.fetchall()}
+    if "message_id" not in columns:
+        await conn.execute("ALTER TABLE generation_jobs ADD COLUMN message_id INTEGER")
+
+
+async def _m007_compact_plans(conn: aiosqlite.Connection) -> None:
+    """
+    Компактное хранение планов и seed заданий генерации.
+
+    Для компактной записи plan_content пуст, а план отрисовывается по
+    (niche, target_audience, start_date, seed, templates).
+    """
+    cursor = await conn.execute("PRAGMA table_info(content_plans)")
+    columns = {row[1] for row in await cursor.fetchall()}
+    for column, sql_type in (("seed", "INTEGER"), ("start_date", "TEXT"), ("templates", "TEXT")):
+        if column not in columns:
+            await conn.execute(f"ALTER TABLE content_plans ADD COLUMN {column} {sql_type}")
+
+    cursor = await conn.execute("PRAGMA table_info(generation_jobs)")
+    columns = {row[1] for row in await cursor.fetchall()}
+    if "seed" not in columns:
+        await conn.execute("ALTER TABLE generation_jobs ADD COLUMN seed INTEGER")
+
+
+async def _m008_plan_platform(conn: aiosqlite.Connection) -> None:
+    """Площадка компактного плана (см. planner.PLATFORMS)."""
+    cursor = await conn.execute("PRAGMA table_info(content_plans)")
+    columns = {row[1] for row in await cursor.fetchall()}
+    if "platform" not in columns:
+        await conn.execute("ALTER TABLE content_plans ADD COLUMN platform TEXT")
+
+
+# План с этим id уже в индексе (не ждёт фоновой индексации)
+_FTS_INDEXED = """NOT EXISTS (
+    SELECT 1 FROM content_plans_fts_backfill WHERE {id} > position AND {id} <= last_id
+)"""
+
+
+def _plan_search_triggers(old_terms: str, new_terms: str, columns: str) -> str:
+    """Триггеры синхронизации content_plans_fts (columns — колонки, от которых зависят термы)."""
+    return f"""
+        CREATE TRIGGER IF NOT EXISTS content_plans_fts_insert
+        AFTER INSERT ON content_plans
+        BEGIN
+            INSERT INTO content_plans_fts (rowid, terms) VALUES (new.id, {new_terms});
+        END;
+
+        CREATE TRIGGER IF NOT EXISTS content_plans_fts_delete
+        AFTER DELETE ON content_plans
+        WHEN {_FTS_INDEXED.format(id="old.id")}
+        BEGIN
+            INSERT INTO content_plans_fts (content_plans_fts, rowid, terms)
+                VALUES ('delete', old.id, {old_terms});
+        END;
+
+        CREATE TRIGGER IF NOT EXISTS content_plans_fts_update
+        AFTER UPDATE OF {columns} ON content_plans
+        WHEN {_FTS_INDEXED.format(id="old.id")}
+        BEGIN
+            INSERT INTO content_plans_fts (content_plans_fts, rowid, terms)
+                VALUES ('delete', old.id, {old_terms});
+            INSERT INTO content_plans_fts (rowid, terms) VALUES (new.id, {new_terms});
+        END;
+    """
+
+
+async def _m009_plan_search(conn: aiosqlite.Connection) -> None:
+    """
+    Полнотекстовый поиск по планам (FTS5) и триггеры синхронизации.
+
+    Существующие планы индексируются не здесь, а в фоне после запуска
+    (см. services/search.py): миграция только запоминает диапазон id,
+    который осталось проиндексировать, и не задерживает старт бота.
+    Термы документа считает plan_search_terms() (см. fts.py).
+    """
+    old_terms = "plan_search_terms(old.user_id, old.niche, old.target_audience, old.plan_content)"
+    new_terms = "plan_search_terms(new.user_id, new.niche, new.target_audience, new.plan_content)"
+    await conn.executescript(f"""
+        CREATE VIRTUAL TABLE IF NOT EXISTS content_plans_fts USING fts5(
+            terms,
+            content='',
+            tokenize="unicode61 remove_diacritics 2 tokenchars '_'"
+        );
+
+        -- Планы с id в (position, last_id] ещё не проиндексированы
+        CREATE TABLE IF NOT EXISTS content_plans_fts_backfill (
+            id INTEGER PRIMARY KEY CHECK (id = 1),
+            position INTEGER NOT NULL,
+            last_id INTEGER NOT NULL
+        );
+        INSERT OR IGNORE INTO content_plans_fts_backfill (id, position, last_id)
+            SELECT 1, 0, MAX(id) FROM content_plans HAVING MAX(id) IS NOT NULL;
+        {_plan_search_triggers(old_terms, new_terms, "user_id, niche, target_audience, plan_content")}
+    """)
+
+
+# День события для дневных агрегатов (локальное время сервера, как и сроки подписок)
+_SQL_DAY = "date({ts}, 'unixepoch', 'localtime')"
+_SQL_TODAY = "date('now', 'localtime')"
+
+
+def _bump_daily(day: str, column: str, delta: str = "1") -> str:
+    """UPSERT счётчика дня в stats_daily."""
+    return f"""INSERT INTO stats_daily (day, {column}) VALUES ({day}, {delta})
+            ON CONFLICT (day) DO UPDATE SET {column} = {column} + excluded.{column};"""
+
+
+# Первая за день активность пользователя. Не INSERT OR IGNORE: внутри UPSERT
+# в users алгоритм конфликта внешней команды заменяет OR IGNORE триггера
+_MARK_ACTIVE = f"""INSERT INTO stats_active_users (day, user_id)
+            SELECT {_SQL_TODAY}, new.telegram_id
+            WHERE NOT EXISTS (
+                SELECT 1 FROM stats_active_users WHERE day = {_SQL_TODAY} AND user_id = new.telegram_id
+            );"""
+
+
+def _bump_counter(name: str, delta: str) -> str:
+    """Изменение счётчика в stats_counters."""
+    return f"UPDATE stats_counters SET value = value + ({delta}) WHERE name = '{name}';"
+
+
+async def _m010_stats_rollups(conn: aiosqlite.Connection) -> None:
+    """
+    Счётчики и дневные агрегаты для /admin, поддерживаемые триггерами.
+
+    stats_counters — итоговые значения (пользователи, активные, планы),
+    stats_daily — по дням: новые пользователи, созданные планы, продления
+    подписки, DAU и число активных подписчиков (его раз в час записывает
+    services/stats.py). DAU считается через stats_active_users: первая
+    за день запись пользователя (upsert из UserTrackingMiddleware)
+    добавляет строку (day, user_id), а её вставка увеличивает active_users.
+
+    Существующие данные агрегируются пачками по rowid до создания
+    триггеров (бот в это время не пишет в БД); после падения процесса
+    перенос продолжается с последней пачки. Истории продлений и
+    активности до миграции нет — эти ряды начинаются с нуля.
+    """
+    await conn.executescript("""
+        CREATE TABLE IF NOT EXISTS stats_counters (
+            name TEXT PRIMARY KEY,
+            value INTEGER NOT NULL DEFAULT 0
+        ) WITHOUT ROWID;
+
+        CREATE TABLE IF NOT EXISTS stats_daily (
+            day TEXT PRIMARY KEY,
+            new_users INTEGER NOT NULL DEFAULT 0,
+            plans INTEGER NOT NULL DEFAULT 0,
+            payments INTEGER NOT NULL DEFAULT 0,
+            active_users INTEGER NOT NULL DEFAULT 0,
+            subscribers INTEGER
+        ) WITHOUT ROWID;
+
+        CREATE TABLE IF NOT EXISTS stats_active_users (
+            day TEXT NOT NULL,
+            user_id INTEGER NOT NULL,
+            PRIMARY KEY (day, user_id)
+        ) WITHOUT ROWID;
+
+        INSERT OR IGNORE INTO stats_counters (name) VALUES ('users'), ('active_users'), ('plans');
+    """)
+    await conn.commit()
+
+    day = _SQL_DAY.format(ts="created_at")
+    # ?1/?2 — границы пачки по rowid (см. copy_in_batches)
+    await copy_in_batches(conn, 10, "users_daily", "users", f"""
+        INSERT INTO stats_daily (day, new_users)
+        SELECT {day}, COUNT(*) FROM users
+        WHERE rowid > ?1 AND rowid <= ?2
+        GROUP BY 1
+        ON CONFLICT (day) DO UPDATE SET new_users = new_users + excluded.new_users
+    """)
+    await copy_in_batches(conn, 10, "users_counters", "users", """
+        UPDATE stats_counters SET value = value + (
+            SELECT CASE stats_counters.name WHEN 'users' THEN COUNT(*) ELSE SUM(is_active) END
+            FROM users WHERE rowid > ?1 AND rowid <= ?2
+        )
+        WHERE name IN ('users', 'active_users')
+    """)
+    await copy_in_batches(conn, 10, "plans_daily", "content_plans", f"""
+        INSERT INTO stats_daily (day, plans)
+        SELECT {day}, COUNT(*) FROM content_plans
+        WHERE rowid > ?1 AND rowid <= ?2
+        GROUP BY 1
+        ON CONFLICT (day) DO UPDATE SET plans = plans + excluded.plans
+    """)
+    await copy_in_batches(conn, 10, "plans_counters", "content_plans", """
+        UPDATE stats_counters SET value = value + (
+            SELECT COUNT(*) FROM content_plans WHERE rowid > ?1 AND rowid <= ?2
+        )
+        WHERE name = 'plans'
+    """)
+
+    await conn.executescript(f"""
+        BEGIN;
+
+        CREATE TRIGGER IF NOT EXISTS stats_users_insert
+        AFTER INSERT ON users
+        BEGIN
+            {_bump_counter("users", "1")}
+            {_bump_counter("active_users", "new.is_active")}
+            {_bump_daily(_SQL_DAY.format(ts="new.created_at"), "new_users")}
+            {_MARK_ACTIVE}
+        END;
+
+        CREATE TRIGGER IF NOT EXISTS stats_users_delete
+        AFTER DELETE ON users
+        BEGIN
+            {_bump_counter("users", "-1")}
+            {_bump_counter("active_users", "-old.is_active")}
+        END;
+
+        CREATE TRIGGER IF NOT EXISTS stats_users_active
+        AFTER UPDATE OF is_active ON users
+        WHEN new.is_active != old.is_active
+        BEGIN
+            {_bump_counter("active_users", "new.is_active - old.is_active")}
+        END;
+
+        -- upsert пользователя из входящего апдейта — пользователь активен сегодня
+        CREATE TRIGGER IF NOT EXISTS stats_users_seen
+        AFTER UPDATE OF username, first_name ON users
+        WHEN new.is_active = 1
+        BEGIN
+            {_MARK_ACTIVE}
+        END;
+
+        -- Продление подписки (grant_access после оплаты)
+        CREATE TRIGGER IF NOT EXISTS stats_users_payment
+        AFTER UPDATE OF subscription_end_date ON users
+        WHEN new.subscription_end_date > COALESCE(old.subscription_end_date, 0)
+        BEGIN
+            {_bump_daily(_SQL_TODAY, "payments")}
+        END;
+
+        CREATE TRIGGER IF NOT EXISTS stats_active_users_insert
+        AFTER INSERT ON stats_active_users
+        BEGIN
+            {_bump_daily("new.day", "active_users")}
+        END;
+
+        CREATE TRIGGER IF NOT EXISTS stats_plans_insert
+        AFTER INSERT ON content_plans
+        BEGIN
+            {_bump_counter("plans", "1")}
+            {_bump_daily(_SQL_DAY.format(ts="new.created_at"), "plans")}
+        END;
+
+        CREATE TRIGGER IF NOT EXISTS stats_plans_delete
+        AFTER DELETE ON content_plans
+        BEGIN
+            {_bump_counter("plans", "-1")}
+        END;
+
+        DELETE FROM schema_migration_progress WHERE version = 10;
+        COMMIT;
+    """)
+
+
+async def _m011_niche_trends(conn: aiosqlite.Connection) -> None:
+    """
+    Популярные ниши и ЦА по часам (см. services/trends.py).
+
+    Хранится только top-K каждого часа, поэтому таблица остаётся маленькой.
+    """
+    await conn.executescript("""
+        CREATE TABLE IF NOT EXISTS niche_trends (
+            kind TEXT NOT NULL,
+            bucket INTEGER NOT NULL,
+            key TEXT NOT NULL,
+            count INTEGER NOT NULL,
+            PRIMARY KEY (kind, bucket, key)
+        ) WITHOUT ROWID;
+    """)
+
+
+async def _m012_plan_feedback(conn: aiosqlite.Connection) -> None:
+    """
+    Оценки планов («👍/👎») и их сумма по шаблонам CONTENT_TEMPLATES.
+
+    План определяется seed: компактная запись в истории с тем же
+    (user_id, seed) знает, из каких шаблонов он собран.
+    """
+    await conn.executescript(f"""
+        CREATE TABLE IF NOT EXISTS plan_feedback (
+            user_id INTEGER NOT NULL,
+            seed INTEGER NOT NULL,
+            useful INTEGER NOT NULL,
+            created_at INTEGER NOT NULL DEFAULT ({SQL_NOW}),
+            PRIMARY KEY (user_id, seed)
+        ) WITHOUT ROWID;
+
+        CREATE TABLE IF NOT EXISTS template_feedback (
+            content_type TEXT NOT NULL,
+            template_index INTEGER NOT NULL,
+            useful INTEGER NOT NULL DEFAULT 0,
+            not_useful INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY (content_type, template_index)
+        ) WITHOUT ROWID;
+    """)
+
+
+async def _m013_plan_search_compact(conn: aiosqlite.Connection) -> None:
+    """
+    Текст компактных планов в поисковом индексе (SQL-функция).
+
+    Заменена миграцией 15: функция была зарегистрирована только на
+    подключении-писателе, а термы компактных планов зависели от шаблонов.
+    """
+    columns = "user_id, niche, target_audience, plan_content, start_date, seed, templates, platform"
+    terms = "plan_search_terms({})"
+    old_terms = terms.format(", ".join(f"old.{column}" for column in columns.split(", ")))
+    new_terms = terms.format(", ".join(f"new.{column}" for column in columns.split(", ")))
+    await conn.executescript(f"""
+        DROP TRIGGER IF EXISTS content_plans_fts_insert;
+        DROP TRIGGER IF EXISTS content_plans_fts_delete;
+        DROP TRIGGER IF EXISTS content_plans_fts_update;
+
+        INSERT INTO content_plans_fts (content_plans_fts) VALUES ('delete-all');
+        DELETE FROM content_plans_fts_backfill;
+        INSERT INTO content_plans_fts_backfill (id, position, last_id)
+            SELECT 1, 0, MAX(id) FROM content_plans HAVING MAX(id) IS NOT NULL;
+        {_plan_search_triggers(old_terms, new_terms, columns)}
+    """)
+
+
+async def _m014_niche_trend_labels(conn: aiosqlite.Connection) -> None:
+    """Исходное написание ниши/ЦА для /top и прогрева (у старых строк — NULL, показывается ключ)."""
+    cursor = await conn.execute("PRAGMA table_info(niche_trends)")
+    columns = {row[1] for row in await cursor.fetchall()}
+    if "label" not in columns:
+        await conn.execute("ALTER TABLE niche_trends ADD COLUMN label TEXT")
+
+
+async def _m015_plan_search_terms(conn: aiosqlite.Connection) -> None:
+    """
+    Термы поискового индекса хранятся в строке плана (search_terms).
+
+    Их считает и записывает вместе с планом Python (см. fts.search_terms),
+    триггеры только переносят колонку в индекс. Без SQL-функций запись в
+    content_plans работает с любого подключения (sqlite3, скрипты), а
+    удаление из индекса без содержимого получает ровно добавленные термы.
+    Существующие планы получают термы в фоне (SearchIndexer), как после
+    миграции 9; до этого поиск находит только новые планы.
+    """
+    cursor = await conn.execute("PRAGMA table_info(content_plans)")
+    columns = {row[1] for row in await cursor.fetchall()}
+    if "search_terms" not in columns:
+        await conn.execute("ALTER TABLE content_plans ADD COLUMN search_terms TEXT")
+    await conn.executescript(f"""
+        DROP TRIGGER IF EXISTS content_plans_fts_insert;
+        DROP TRIGGER IF EXISTS content_plans_fts_delete;
+        DROP TRIGGER IF EXISTS content_plans_fts_update;
+
+        INSERT INTO content_plans_fts (content_plans_fts) VALUES ('delete-all');
+        DELETE FROM content_plans_fts_backfill;
+        INSERT INTO content_plans_fts_backfill (id, position, last_id)
+            SELECT 1, 0, MAX(id) FROM content_plans HAVING MAX(id) IS NOT NULL;
+        {_plan_search_triggers("old.search_terms", "new.search_terms", "search_terms")}
+    """)
+
+
+async def _m016_expiry_notices(conn: aiosqlite.Connection) -> None:
+    """
+    Отправленные события подписки (см. services/expiry.py).
+
+    expiry_reminded_for / expiry_notified_for — окончание подписки, о
+    котором уже напомнили / сообщили, что оно наступило. Продление меняет
+    subscription_end_date, и события для нового срока отправятся снова.
+    Истёкшие до миграции подписки считаются уведомлёнными.
+    """
+    cursor = await conn.execute("PRAGMA table_info(users)")
+    columns = {row[1] for row in await cursor.fetchall()}
+    for column in ("expiry_reminded_for", "expiry_notified_for"):
+        if column not in columns:
+            await conn.execute(f"ALTER TABLE users ADD COLUMN {column} INTEGER")
+    await conn.execute(
+        f"""UPDATE users SET expiry_notified_for = subscription_end_date
+            WHERE subscription_end_date <= {SQL_NOW}"""
+    )
+
+
+async def _m017_plan_seed_index(conn: aiosqlite.Connection) -> None:
+    """
+    Индекс для ContentPlanRepository.get_by_seed (оценки планов).
+
+    Частичный: у планов от LLM seed нет.
+    """
+    await conn.execute("""
+        CREATE INDEX IF NOT EXISTS idx_plans_user_seed
+            ON content_plans(user_id, seed)
+            WHERE seed IS NOT NULL
+    """)
+
+
+MIGRATIONS: List[Migration] = [
+    Migration(1, "initial", _m001_initial),
+    Migration(2, "rowid_users_epoch_timestamps", _m002_rowid_users_epoch_timestamps),
+    Migration(3, "broadcast_jobs", _m003_broadcast_jobs),
+    Migration(4, "subscription_end_index", _m004_subscription_end_index),
+    Migration(5, "generation_jobs", _m005_generation_jobs),
+    Migration(6, "generation_job_message", _m006_generation_job_message),
+    Migration(7, "compact_plans", _m007_compact_plans),
+    Migration(8, "plan_platform", _m008_plan_platform),
+    Migration(9, "plan_search", _m009_plan_search),
+    Migration(10, "stats_rollups", _m010_stats_rollups),
+    Migration(11, "niche_trends", _m011_niche_trends),
+    Migration(12, "plan_feedback", _m012_plan_feedback),
+    Migration(13, "plan_search_compact", _m013_plan_search_compact),
+    Migration(14, "niche_trend_labels", _m014_niche_trend_labels),
+    Migration(15, "plan_search_terms", _m015_plan_search_terms),
+    Migration(16, "expiry_notices", _m016_expiry_notices),
+    Migration(17, "plan_seed_index", _m017_plan_seed_index),
+]
+
+
+async def migrate(conn: aiosqlite.Connection, target: Optional[int] = None) -> int:
+    """
+    Применить недостающие миграции.
+
+    Args:
+        conn: Подключение-писатель
+        target: Версия, до которой мигрировать (по умолчанию — последняя)
+
+    Returns:
+        Версия схемы после миграции
+    """
+    await conn.execute("""
+        CREATE TABLE IF NOT EXISTS schema_migration_progress (
+            version INTEGER NOT NULL,
+            step TEXT NOT NULL,
+            position INTEGER NOT NULL,
+            PRIMARY KEY (version, step)
+        )
+    """)
+    await conn.commit()
+
+    current = await _get_version(conn)
+    target = MIGRATIONS[-1].version if target is None else target
+
+    for migration in MIGRATIONS:
+        if migration.version <= current or migration.version > target:
+            continue
+        logger.info(f"Applying migration {migration.version}: {migration.name}")
+        await migration.apply(conn)
+        await conn.commit()
+        # PRAGMA не принимает параметры; version — целое из кода
+        await conn.execute(f"PRAGMA user_version = {int(migration.version)}")
+        await conn.commit()
+        current = migration.version
+
+    return current
+
+
+async def _main() -> None:
+    from app.config import settings
+    from app.database.connection import init_db, close_db
+
+    # init_db сам прогоняет миграции на подключении-писателе
+    await init_db()
+    await close_db()
+    logger.info(f"Migrations applied: {settings.db_path}")
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    asyncio.run(_main())
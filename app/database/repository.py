@@ -3,50 +3,93 @@ Repository для работы с данными.
 Паттерн Repository для абстрагирования доступа к данным.
 """
 
-from typing import Optional, List, Dict, Any
+from typing import Optional, List, Dict, Any, AsyncIterator, Iterable, Sequence, Tuple
 from datetime import datetime
+import time
 
 from app.database.connection import get_connection
+from app.database.fts import build_match, search_terms
+from app.database.write_buffer import write_buffer
+
+# Строк в одном INSERT upsert_many (3 параметра на строку, лимит SQLite — 32766)
+UPSERT_CHUNK_SIZE = 5000
+
+_UPSERT_SQL = """
+    INSERT INTO users (telegram_id, username, first_name)
+    VALUES {values}
+    ON CONFLICT (telegram_id) DO UPDATE SET
+        username = COALESCE(excluded.username, users.username),
+        first_name = COALESCE(excluded.first_name, users.first_name),
+        is_active = 1
+"""
 
 
 class UserRepository:
     """Репозиторий для работы с пользователями."""
 
     @staticmethod
-    async def get_or_create(
+    async def upsert(
         telegram_id: int,
         username: Optional[str] = None,
         first_name: Optional[str] = None
     ) -> Dict[str, Any]:
-        """Получить или создать пользователя."""
-        conn = await get_connection()
+        """
+        Создать пользователя или обновить его username/first_name.
 
-        cursor = await conn.execute(
-            "SELECT * FROM users WHERE telegram_id = ?",
-            (telegram_id,)
+        Один запрос INSERT ... ON CONFLICT DO UPDATE ... RETURNING.
+        Переданный None не затирает сохранённое значение.
+        """
+        rows = await write_buffer.execute(
+            _UPSERT_SQL.format(values="(?, ?, ?)") + " RETURNING *",
+            (telegram_id, username, first_name),
+            fetch=True
         )
-        row = await cursor.fetchone()
+        return dict(rows[0])
 
-        if row:
-            return dict(row)
+    @staticmethod
+    async def get_or_create(
+        telegram_id: int,
+        username: Optional[str] = None,
+        first_name: Optional[str] = None
+    ) -> Dict[str, Any]:
+        """Получить или создать пользователя (см. upsert)."""
+        return await UserRepository.upsert(telegram_id, username, first_name)
 
-        await conn.execute(
-            "INSERT INTO users (telegram_id, username, first_name) VALUES (?, ?, ?)",
-            (telegram_id, username, first_name)
-        )
-        await conn.commit()
+    @staticmethod
+    async def upsert_many(users: Iterable[Any], wait: bool = True) -> int:
+        """
+        Массово создать/обновить пользователей.
 
-        cursor = await conn.execute(
-            "SELECT * FROM users WHERE telegram_id = ?",
-            (telegram_id,)
-        )
-        row = await cursor.fetchone()
-        return dict(row)
+        Args:
+            users: Объекты с атрибутами id, username, first_name
+                (например, aiogram.types.User)
+            wait: Дождаться COMMIT
+
+        Returns:
+            Количество уникальных пользователей в пачке
+        """
+        # Последняя версия пользователя в пачке побеждает
+        unique = {user.id: user for user in users}
+        if not unique:
+            return 0
+
+        rows = list(unique.values())
+        for start in range(0, len(rows), UPSERT_CHUNK_SIZE):
+            chunk = rows[start:start + UPSERT_CHUNK_SIZE]
+            params: List[Any] = []
+            for user in chunk:
+                params.extend((user.id, user.username, user.first_name))
+            await write_buffer.execute(
+                _UPSERT_SQL.format(values=", ".join(["(?, ?, ?)"] * len(chunk))),
+                params,
+                wait=wait
+            )
+        return len(rows)
 
     @staticmethod
     async def get_by_telegram_id(telegram_id: int) -> Optional[Dict[str, Any]]:
         """Получить пользователя по Telegram ID."""
-        conn = await get_connection()
+        conn = await get_connection(readonly=True)
         cursor = await conn.execute(
             "SELECT * FROM users WHERE telegram_id = ?",
             (telegram_id,)
@@ -56,29 +99,149 @@ class UserRepository:
 
     @staticmethod
     async def count_all() -> int:
-        """Получить общее количество пользователей."""
-        conn = await get_connection()
-        cursor = await conn.execute("SELECT COUNT(*) as cnt FROM users")
-        row = await cursor.fetchone()
-        return row["cnt"] if row else 0
+        """Получить общее количество пользователей (счётчик, без скана таблицы)."""
+        return await StatsRepository.counter("users")
+
+    @staticmethod
+    async def iter_ids(
+        batch_size: int = 1000,
+        after: int = 0,
+        active_only: bool = False
+    ) -> AsyncIterator[List[int]]:
+        """
+        Постранично перебрать ID пользователей (для рассылки и выгрузок).
+
+        Keyset-пагинация по telegram_id: каждая страница — отдельный
+        короткий запрос, память не зависит от размера таблицы.
+
+        Args:
+            batch_size: Размер страницы
+            after: Начать с ID строго больше указанного
+            active_only: Пропускать пользователей, заблокировавших бота
+
+        Yields:
+            Списки telegram_id по возрастанию
+        """
+        active_filter = "AND is_active = 1" if active_only else ""
+        last_id = after
+        while True:
+            conn = await get_connection(readonly=True)
+            cursor = await conn.execute(
+                f"""SELECT telegram_id FROM users
+                    WHERE telegram_id > ? {active_filter}
+                    ORDER BY telegram_id
+                    LIMIT ?""",
+                (last_id, batch_size)
+            )
+            rows = await cursor.fetchall()
+            if not rows:
+                return
+
+            ids = [row["telegram_id"] for row in rows]
+            yield ids
+
+            if len(ids) < batch_size:
+                return
+            last_id = ids[-1]
+
+    @staticmethod
+    async def iter_expiring(
+        start: int,
+        end: int,
+        batch_size: int = 1000
+    ) -> AsyncIterator[List[Tuple[int, int, Optional[int], Optional[int]]]]:
+        """
+        Постранично перебрать подписки, истекающие в интервале (start, end].
+
+        Диапазонный запрос по индексу idx_users_subscription_end с
+        keyset-пагинацией по (subscription_end_date, telegram_id).
+
+        Yields:
+            Списки кортежей (telegram_id, subscription_end_date,
+            expiry_reminded_for, expiry_notified_for)
+        """
+        last_end, last_id = start, 0
+        while True:
+            conn = await get_connection(readonly=True)
+            cursor = await conn.execute(
+                """SELECT telegram_id, subscription_end_date, expiry_reminded_for, expiry_notified_for
+                   FROM users
+                   WHERE (subscription_end_date > ?
+                          OR (subscription_end_date = ? AND telegram_id > ?))
+                     AND subscription_end_date <= ?
+                   ORDER BY subscription_end_date, telegram_id
+                   LIMIT ?""",
+                (last_end, last_end, last_id, end, batch_size)
+            )
+            rows = [
+                (
+                    row["telegram_id"],
+                    row["subscription_end_date"],
+                    row["expiry_reminded_for"],
+                    row["expiry_notified_for"],
+                )
+                for row in await cursor.fetchall()
+            ]
+            if not rows:
+                return
+
+            yield rows
+
+            if len(rows) < batch_size:
+                return
+            last_id, last_end = rows[-1][:2]
 
     @staticmethod
     async def get_all_ids() -> List[int]:
-        """Получить ID всех пользователей (для рассылки)."""
-        conn = await get_connection()
-        cursor = await conn.execute("SELECT telegram_id FROM users")
-        rows = await cursor.fetchall()
-        return [row["telegram_id"] for row in rows]
+        """Получить ID всех пользователей списком (см. iter_ids)."""
+        return [
+            user_id
+            async for batch in UserRepository.iter_ids()
+            for user_id in batch
+        ]
+
+    @staticmethod
+    async def count_active() -> int:
+        """Количество пользователей, не заблокировавших бота (счётчик)."""
+        return await StatsRepository.counter("active_users")
+
+    @staticmethod
+    async def set_inactive(user_ids: List[int]) -> None:
+        """Пометить пользователей неактивными (бот заблокирован)."""
+        if not user_ids:
+            return
+        placeholders = ", ".join("?" * len(user_ids))
+        await write_buffer.execute(
+            f"UPDATE users SET is_active = 0 WHERE telegram_id IN ({placeholders})",
+            user_ids
+        )
+
+    @staticmethod
+    async def mark_expiry_event(user_id: int, expires_at: int, expired: bool) -> None:
+        """
+        Запомнить, что о подписке с этим окончанием уже сообщили (в фоне).
+
+        Args:
+            expired: True — об окончании (EXPIRED), False — напоминание
+        """
+        column = "expiry_notified_for" if expired else "expiry_reminded_for"
+        await write_buffer.execute(
+            f"UPDATE users SET {column} = ? WHERE telegram_id = ?",
+            (expires_at, user_id),
+            wait=False
+        )
 
     @staticmethod
     async def update_subscription(user_id: int, end_date: datetime) -> None:
-        """Обновить дату окончания подписки."""
-        conn = await get_connection()
-        await conn.execute(
+        """Обновить дату окончания подписки (дожидается COMMIT)."""
+        await write_buffer.execute(
             "UPDATE users SET subscription_end_date = ? WHERE telegram_id = ?",
-            (end_date, user_id)
+            (int(end_date.timestamp()), user_id)
         )
-        await conn.commit()
+
+
+# Колонки превью в /history: без plan_content и шаблонов
+PLAN_PREVIEW_COLUMNS = "id, niche, target_audience, platform, created_at"
 
 
 class ContentPlanRepository:
@@ -89,37 +252,187 @@ class ContentPlanRepository:
         user_id: int,
         niche: str,
         target_audience: str,
-        plan_content: str
-    ) -> int:
-        """Создать новый контент-план."""
-        conn = await get_connection()
-        cursor = await conn.execute(
+        plan_content: str,
+        wait: bool = True
+    ) -> Optional[int]:
+        """
+        Создать новый контент-план.
+
+        Args:
+            wait: Дождаться COMMIT (False — запись в фоне, без ID)
+        """
+        return await write_buffer.execute(
             """INSERT INTO content_plans
-               (user_id, niche, target_audience, plan_content)
-               VALUES (?, ?, ?, ?)""",
-            (user_id, niche, target_audience, plan_content)
+               (user_id, niche, target_audience, plan_content, search_terms)
+               VALUES (?, ?, ?, ?, ?)""",
+            (user_id, niche, target_audience, plan_content,
+             search_terms(user_id, niche, target_audience, plan_content)),
+            wait=wait
+        )
+
+    @staticmethod
+    async def create_compact(
+        user_id: int,
+        niche: str,
+        target_audience: str,
+        start_date: str,
+        seed: int,
+        templates: str,
+        platform: Optional[str] = None,
+        plan_text: Optional[str] = None,
+        wait: bool = True
+    ) -> Optional[int]:
+        """
+        Сохранить план компактно — без отрисованного текста.
+
+        Args:
+            start_date: Первый день плана (YYYY-MM-DD)
+            seed: Seed генерации
+            templates: Индексы шаблонов дней (см. planner.encode_templates)
+            platform: Площадка плана (см. planner.PLATFORMS)
+            plan_text: Отрисованный план — только для поискового индекса
+            wait: Дождаться COMMIT (False — запись в фоне, без ID)
+        """
+        return await write_buffer.execute(
+            """INSERT INTO content_plans
+               (user_id, niche, target_audience, plan_content, start_date, seed, templates, platform,
+                search_terms)
+               VALUES (?, ?, ?, '', ?, ?, ?, ?, ?)""",
+            (user_id, niche, target_audience, start_date, seed, templates, platform,
+             search_terms(user_id, niche, target_audience, plan_text)),
+            wait=wait
         )
-        await conn.commit()
-        return cursor.lastrowid
 
     @staticmethod
     async def get_by_user(user_id: int, limit: int = 10) -> List[Dict[str, Any]]:
         """Получить контент-планы пользователя."""
-        conn = await get_connection()
+        conn = await get_connection(readonly=True)
         cursor = await conn.execute(
             """SELECT * FROM content_plans
                WHERE user_id = ?
-               ORDER BY created_at DESC
+               ORDER BY created_at DESC, id DESC
                LIMIT ?""",
             (user_id, limit)
         )
         rows = await cursor.fetchall()
         return [dict(row) for row in rows]
 
+    @staticmethod
+    async def iter_by_user(
+        user_id: int,
+        batch_size: int = 500
+    ) -> AsyncIterator[List[Dict[str, Any]]]:
+        """
+        Постранично перебрать все планы пользователя (для выгрузок).
+
+        Keyset-пагинация по индексу (user_id, created_at, id): память
+        и время страницы не зависят от размера истории.
+
+        Yields:
+            Списки планов от старых к новым
+        """
+        last_created, last_id = -1, 0
+        while True:
+            conn = await get_connection(readonly=True)
+            cursor = await conn.execute(
+                """SELECT * FROM content_plans
+                   WHERE user_id = ? AND (created_at, id) > (?, ?)
+                   ORDER BY created_at, id
+                   LIMIT ?""",
+                (user_id, last_created, last_id, batch_size)
+            )
+            rows = [dict(row) for row in await cursor.fetchall()]
+            if not rows:
+                return
+
+            yield rows
+
+            if len(rows) < batch_size:
+                return
+            last_created, last_id = rows[-1]["created_at"], rows[-1]["id"]
+
+    @staticmethod
+    async def get_for_user(plan_id: int, user_id: int) -> Optional[Dict[str, Any]]:
+        """План по ID, только если он принадлежит пользователю."""
+        conn = await get_connection(readonly=True)
+        cursor = await conn.execute(
+            "SELECT * FROM content_plans WHERE id = ? AND user_id = ?",
+            (plan_id, user_id)
+        )
+        row = await cursor.fetchone()
+        return dict(row) if row else None
+
+    @staticmethod
+    async def get_by_seed(user_id: int, seed: int) -> List[Dict[str, Any]]:
+        """
+        Компактные планы пользователя с этим seed (планы площадок одного запроса).
+
+        Ищется по индексу idx_plans_user_seed.
+        """
+        conn = await get_connection(readonly=True)
+        cursor = await conn.execute(
+            """SELECT * FROM content_plans
+               WHERE user_id = ? AND seed = ?
+               ORDER BY id""",
+            (user_id, seed)
+        )
+        return [dict(row) for row in await cursor.fetchall()]
+
+    @staticmethod
+    async def get_page(
+        user_id: int,
+        limit: int,
+        before: Optional[Tuple[int, int]] = None,
+        after: Optional[Tuple[int, int]] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        Страница истории планов — только колонки для превью.
+
+        Keyset-пагинация по индексу (user_id, created_at, id): страница
+        читается за O(limit) независимо от её номера, без OFFSET.
+
+        Args:
+            limit: Размер страницы
+            before: (created_at, id) — планы старше этой позиции
+            after: (created_at, id) — планы новее этой позиции
+
+        Returns:
+            Планы от новых к старым
+        """
+        conn = await get_connection(readonly=True)
+        if after is not None:
+            cursor = await conn.execute(
+                f"""SELECT {PLAN_PREVIEW_COLUMNS} FROM content_plans
+                    WHERE user_id = ? AND (created_at, id) > (?, ?)
+                    ORDER BY created_at ASC, id ASC
+                    LIMIT ?""",
+                (user_id, *after, limit)
+            )
+            rows = await cursor.fetchall()
+            return [dict(row) for row in reversed(rows)]
+
+        if before is not None:
+            cursor = await conn.execute(
+                f"""SELECT {PLAN_PREVIEW_COLUMNS} FROM content_plans
+                    WHERE user_id = ? AND (created_at, id) < (?, ?)
+                    ORDER BY created_at DESC, id DESC
+                    LIMIT ?""",
+                (user_id, *before, limit)
+            )
+        else:
+            cursor = await conn.execute(
+                f"""SELECT {PLAN_PREVIEW_COLUMNS} FROM content_plans
+                    WHERE user_id = ?
+                    ORDER BY created_at DESC, id DESC
+                    LIMIT ?""",
+                (user_id, limit)
+            )
+        return [dict(row) for row in await cursor.fetchall()]
+
     @staticmethod
     async def count_by_user(user_id: int) -> int:
         """Подсчитать количество планов пользователя."""
-        conn = await get_connection()
+        conn = await get_connection(readonly=True)
         cursor = await conn.execute(
             "SELECT COUNT(*) as cnt FROM content_plans WHERE user_id = ?",
             (user_id,)
@@ -129,8 +442,499 @@ class ContentPlanRepository:
 
     @staticmethod
     async def count_all() -> int:
-        """Получить общее количество созданных планов."""
+        """Получить общее количество сохранённых планов (счётчик)."""
+        return await StatsRepository.counter("plans")
+
+
+class PlanSearchRepository:
+    """Полнотекстовый поиск по планам (content_plans_fts, см. fts.py)."""
+
+    @staticmethod
+    async def search(
+        user_id: int,
+        query: str,
+        limit: int,
+        offset: int = 0
+    ) -> List[Dict[str, Any]]:
+        """
+        Планы пользователя по запросу, от самых релевантных (bm25).
+
+        Args:
+            user_id: Telegram ID пользователя
+            query: Текст запроса
+            limit: Размер страницы
+            offset: Сколько результатов пропустить
+
+        Returns:
+            Колонки превью и текст плана для сниппета (plan_content или
+            поля компактной записи, см. planner.render_stored_plan)
+        """
+        match = build_match(user_id, query)
+        if match is None:
+            return []
+        conn = await get_connection(readonly=True)
+        # Сначала ранжируем только по индексу, строки читаем для страницы
+        cursor = await conn.execute(
+            f"""SELECT {PLAN_PREVIEW_COLUMNS}, plan_content, start_date, seed, templates FROM (
+                    SELECT rowid, rank FROM content_plans_fts
+                    WHERE content_plans_fts MATCH ?
+                    ORDER BY rank
+                    LIMIT ? OFFSET ?
+                ) AS hits
+                JOIN content_plans ON content_plans.id = hits.rowid
+                WHERE content_plans.user_id = ?
+                ORDER BY hits.rank""",
+            (match, limit, offset, user_id)
+        )
+        return [dict(row) for row in await cursor.fetchall()]
+
+    @staticmethod
+    async def unindexed(batch_size: int) -> List[Dict[str, Any]]:
+        """
+        Следующая пачка планов, ещё не попавших в индекс (по возрастанию id).
+
+        Returns:
+            Строки планов без search_terms (пусто — индекс построен)
+        """
+        conn = await get_connection(readonly=True)
+        cursor = await conn.execute(
+            """SELECT content_plans.id, user_id, niche, target_audience, plan_content,
+                      start_date, seed, templates, platform
+               FROM content_plans_fts_backfill AS state
+               JOIN content_plans ON content_plans.id > state.position AND content_plans.id <= state.last_id
+               WHERE state.id = 1
+               ORDER BY content_plans.id
+               LIMIT ?""",
+            (batch_size,)
+        )
+        return [dict(row) for row in await cursor.fetchall()]
+
+    @staticmethod
+    async def index_batch(terms: Sequence[Tuple[int, str]]) -> None:
+        """
+        Записать термы пачки из unindexed() и добавить её в индекс.
+
+        Термы, пачка и её позиция коммитятся вместе, поэтому после
+        перезапуска индексация продолжается без пропусков и повторов.
+
+        Args:
+            terms: Пары (id плана, термы) по возрастанию id; пустой
+                список — индекс построен, состояние фоновой индексации
+                удаляется
+        """
+        async with write_buffer.transaction() as conn:
+            if not terms:
+                await conn.execute("DELETE FROM content_plans_fts_backfill")
+                return
+            cursor = await conn.execute(
+                "SELECT position FROM content_plans_fts_backfill WHERE id = 1"
+            )
+            state = await cursor.fetchone()
+            if state is None:
+                return
+            upper = terms[-1][0]
+            await conn.executemany(
+                "UPDATE content_plans SET search_terms = ? WHERE id = ?",
+                [(text, plan_id) for plan_id, text in terms]
+            )
+            # Удалённые за это время планы сюда уже не попадут
+            await conn.execute(
+                """INSERT INTO content_plans_fts (rowid, terms)
+                   SELECT id, search_terms FROM content_plans WHERE id > ? AND id <= ?""",
+                (state["position"], upper)
+            )
+            await conn.execute(
+                "UPDATE content_plans_fts_backfill SET position = ? WHERE id = 1",
+                (upper,)
+            )
+
+
+class BroadcastRepository:
+    """Репозиторий заданий рассылки."""
+
+    @staticmethod
+    async def create(
+        text: str,
+        admin_chat_id: int,
+        progress_message_id: int,
+        total: int
+    ) -> int:
+        """Создать задание рассылки."""
+        return await write_buffer.execute(
+            """INSERT INTO broadcast_jobs
+               (text, admin_chat_id, progress_message_id, total)
+               VALUES (?, ?, ?, ?)""",
+            (text, admin_chat_id, progress_message_id, total)
+        )
+
+    @staticmethod
+    async def get(job_id: int) -> Optional[Dict[str, Any]]:
+        """Получить задание по ID."""
         conn = await get_connection()
-        cursor = await conn.execute("SELECT COUNT(*) as cnt FROM content_plans")
+        cursor = await conn.execute(
+            "SELECT * FROM broadcast_jobs WHERE id = ?",
+            (job_id,)
+        )
+        row = await cursor.fetchone()
+        return dict(row) if row else None
+
+    @staticmethod
+    async def get_running() -> List[Dict[str, Any]]:
+        """Незавершённые задания (для продолжения после перезапуска)."""
+        conn = await get_connection()
+        cursor = await conn.execute(
+            "SELECT * FROM broadcast_jobs WHERE status = 'running' ORDER BY id"
+        )
+        rows = await cursor.fetchall()
+        return [dict(row) for row in rows]
+
+    @staticmethod
+    async def ack_batch(
+        job_id: int,
+        last_user_id: int,
+        sent: int,
+        failed: int,
+        blocked: int
+    ) -> None:
+        """Зафиксировать обработанную пачку пользователей (дожидается COMMIT)."""
+        await write_buffer.execute(
+            """UPDATE broadcast_jobs
+               SET last_user_id = ?,
+                   sent = sent + ?,
+                   failed = failed + ?,
+                   blocked = blocked + ?,
+                   updated_at = CAST(strftime('%s', 'now') AS INTEGER)
+               WHERE id = ?""",
+            (last_user_id, sent, failed, blocked, job_id)
+        )
+
+    @staticmethod
+    async def set_status(job_id: int, status: str) -> None:
+        """Изменить статус задания."""
+        await write_buffer.execute(
+            """UPDATE broadcast_jobs
+               SET status = ?, updated_at = CAST(strftime('%s', 'now') AS INTEGER)
+               WHERE id = ?""",
+            (status, job_id)
+        )
+
+
+class GenerationJobRepository:
+    """Репозиторий очереди заданий генерации."""
+
+    @staticmethod
+    async def enqueue(
+        user_id: int,
+        chat_id: int,
+        request_text: str,
+        dedup_key: str,
+        priority: int,
+        message_id: Optional[int] = None,
+        seed: Optional[int] = None
+    ) -> Optional[int]:
+        """
+        Поставить задание в очередь.
+
+        Args:
+            message_id: Сообщение, в которое выводить план по мере генерации
+            seed: Seed генерации (перезапуск задания даст тот же план)
+
+        Returns:
+            ID задания или None, если такой же запрос пользователя
+            уже ждёт или выполняется
+        """
+        rows = await write_buffer.execute(
+            """INSERT OR IGNORE INTO generation_jobs
+               (user_id, chat_id, request_text, dedup_key, priority, message_id, seed, created_at)
+               VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+               RETURNING id""",
+            (user_id, chat_id, request_text, dedup_key, priority, message_id, seed, time.time()),
+            fetch=True
+        )
+        return rows[0]["id"] if rows else None
+
+    @staticmethod
+    async def claim() -> Optional[Dict[str, Any]]:
+        """Забрать следующее задание (высший приоритет, затем FIFO)."""
+        rows = await write_buffer.execute(
+            """UPDATE generation_jobs
+               SET status = 'running', started_at = ?, attempts = attempts + 1
+               WHERE id = (
+                   SELECT id FROM generation_jobs
+                   WHERE status = 'pending'
+                   ORDER BY priority, id
+                   LIMIT 1
+               )
+               RETURNING *""",
+            (time.time(),),
+            fetch=True
+        )
+        return dict(rows[0]) if rows else None
+
+    @staticmethod
+    async def finish(job_id: int, error: Optional[str] = None) -> None:
+        """Отметить задание выполненным (или упавшим, если передана ошибка)."""
+        await write_buffer.execute(
+            """UPDATE generation_jobs
+               SET status = ?, error = ?, finished_at = ?
+               WHERE id = ?""",
+            ("failed" if error else "done", error, time.time(), job_id)
+        )
+
+    @staticmethod
+    async def requeue_running() -> int:
+        """Вернуть в очередь задания, прерванные перезапуском."""
+        rows = await write_buffer.execute(
+            "UPDATE generation_jobs SET status = 'pending' WHERE status = 'running' RETURNING id",
+            fetch=True
+        )
+        return len(rows)
+
+    @staticmethod
+    async def position(job_id: int) -> int:
+        """Позиция ожидающего задания в очереди (1 — следующее)."""
+        conn = await get_connection(readonly=True)
+        cursor = await conn.execute(
+            """SELECT COUNT(*) AS cnt FROM generation_jobs AS j, (
+                   SELECT priority, id FROM generation_jobs WHERE id = ?
+               ) AS target
+               WHERE j.status = 'pending'
+                 AND (j.priority < target.priority
+                      OR (j.priority = target.priority AND j.id <= target.id))""",
+            (job_id,)
+        )
+        row = await cursor.fetchone()
+        return row["cnt"] if row else 0
+
+    @staticmethod
+    async def count_pending() -> int:
+        """Количество ожидающих заданий."""
+        conn = await get_connection(readonly=True)
+        cursor = await conn.execute(
+            "SELECT COUNT(*) AS cnt FROM generation_jobs WHERE status = 'pending'"
+        )
         row = await cursor.fetchone()
         return row["cnt"] if row else 0
+
+    @staticmethod
+    async def latency_stats(since: float) -> Dict[str, Any]:
+        """Ожидание в очереди и время генерации для заданий, завершённых после since."""
+        conn = await get_connection(readonly=True)
+        cursor = await conn.execute(
+            """SELECT COUNT(*) AS jobs,
+                      AVG(started_at - created_at) AS avg_wait,
+                      MAX(started_at - created_at) AS max_wait,
+                      AVG(finished_at - started_at) AS avg_run
+               FROM generation_jobs
+               WHERE finished_at >= ?""",
+            (since,)
+        )
+        row = await cursor.fetchone()
+        return dict(row)
+
+    @staticmethod
+    async def purge_finished(older_than: float) -> None:
+        """Удалить завершённые задания старше указанного момента."""
+        await write_buffer.execute(
+            "DELETE FROM generation_jobs WHERE finished_at < ?",
+            (older_than,)
+        )
+
+
+class StatsRepository:
+    """
+    Счётчики и дневные агрегаты для /admin (миграция 10).
+
+    stats_counters и stats_daily поддерживают триггеры на users и
+    content_plans, поэтому чтение не зависит от размера этих таблиц.
+    """
+
+    @staticmethod
+    async def counter(name: str) -> int:
+        """Значение счётчика: users, active_users или plans."""
+        conn = await get_connection(readonly=True)
+        cursor = await conn.execute(
+            "SELECT value FROM stats_counters WHERE name = ?",
+            (name,)
+        )
+        row = await cursor.fetchone()
+        return row["value"] if row else 0
+
+    @staticmethod
+    async def counters() -> Dict[str, int]:
+        """Все счётчики одним запросом."""
+        conn = await get_connection(readonly=True)
+        cursor = await conn.execute("SELECT name, value FROM stats_counters")
+        return {row["name"]: row["value"] for row in await cursor.fetchall()}
+
+    @staticmethod
+    async def daily(since: str) -> List[Dict[str, Any]]:
+        """
+        Дневные агрегаты начиная с дня since (YYYY-MM-DD), по возрастанию.
+
+        Дни без событий в таблице отсутствуют.
+        """
+        conn = await get_connection(readonly=True)
+        cursor = await conn.execute(
+            "SELECT * FROM stats_daily WHERE day >= ? ORDER BY day",
+            (since,)
+        )
+        return [dict(row) for row in await cursor.fetchall()]
+
+    @staticmethod
+    async def record_subscribers(day: str, now: int) -> None:
+        """
+        Записать число активных подписчиков за день.
+
+        Диапазонный COUNT по частичному индексу idx_users_subscription_end:
+        читаются только действующие подписки, а не вся таблица users.
+        """
+        await write_buffer.execute(
+            """INSERT INTO stats_daily (day, subscribers)
+               SELECT ?, COUNT(*) FROM users WHERE subscription_end_date > ?
+               ON CONFLICT (day) DO UPDATE SET subscribers = excluded.subscribers""",
+            (day, now)
+        )
+
+    @staticmethod
+    async def prune_active_users(before: str) -> None:
+        """Удалить отметки активности за дни раньше before (DAU уже посчитан)."""
+        await write_buffer.execute(
+            "DELETE FROM stats_active_users WHERE day < ?",
+            (before,)
+        )
+
+
+class TrendRepository:
+    """Почасовые top-K ниш и ЦА (niche_trends)."""
+
+    @staticmethod
+    async def save(rows: List[Tuple[str, int, str, str, int]]) -> None:
+        """
+        Записать счётчики часов (оценка за час заменяет прежнюю).
+
+        Оценки текущего часа после перезапуска не теряются: трекер
+        продолжает счёт с записанных (см. hour).
+
+        Args:
+            rows: Кортежи (kind, bucket, key, label, count)
+        """
+        for start in range(0, len(rows), UPSERT_CHUNK_SIZE):
+            chunk = rows[start:start + UPSERT_CHUNK_SIZE]
+            await write_buffer.execute(
+                "INSERT OR REPLACE INTO niche_trends (kind, bucket, key, label, count) VALUES "
+                + ", ".join(["(?, ?, ?, ?, ?)"] * len(chunk)),
+                [value for row in chunk for value in row]
+            )
+
+    @staticmethod
+    async def hour(bucket: int) -> List[Tuple[str, str, Optional[str], int]]:
+        """
+        Записанные счётчики одного часа.
+
+        Returns:
+            Кортежи (kind, key, label, count)
+        """
+        conn = await get_connection(readonly=True)
+        cursor = await conn.execute(
+            "SELECT kind, key, label, count FROM niche_trends WHERE bucket = ?",
+            (bucket,)
+        )
+        return [tuple(row) for row in await cursor.fetchall()]
+
+    @staticmethod
+    async def top(kind: str, since: int, limit: int) -> List[Tuple[str, int]]:
+        """
+        Самые частые ключи за часы начиная с since (сумма по часам).
+
+        Returns:
+            Пары (написание, сумма); написание — из самого частого часа ключа
+        """
+        conn = await get_connection(readonly=True)
+        # label при MAX(count) берётся из той же строки, что и максимум (SQLite)
+        cursor = await conn.execute(
+            """SELECT COALESCE(label, key) AS label, MAX(count), SUM(count) AS total
+               FROM niche_trends
+               WHERE kind = ? AND bucket >= ?
+               GROUP BY key
+               ORDER BY total DESC, key
+               LIMIT ?""",
+            (kind, since, limit)
+        )
+        return [(row["label"], row["total"]) for row in await cursor.fetchall()]
+
+    @staticmethod
+    async def purge(before: int) -> None:
+        """Удалить часы раньше before."""
+        await write_buffer.execute(
+            "DELETE FROM niche_trends WHERE bucket < ?",
+            (before,)
+        )
+
+
+class FeedbackRepository:
+    """Оценки планов (plan_feedback) и их сумма по шаблонам (template_feedback)."""
+
+    @staticmethod
+    async def save_batch(events: Sequence[Any]) -> None:
+        """
+        Записать пачку оценок одной транзакцией.
+
+        Повторная оценка того же плана заменяет прежнюю, а счётчики
+        шаблонов сдвигаются на разницу.
+
+        Args:
+            events: Объекты с атрибутами user_id, seed, useful и templates
+                (пары (тип контента, индекс шаблона)); не больше одной
+                оценки на (user_id, seed)
+        """
+        if not events:
+            return
+        async with write_buffer.transaction() as conn:
+            previous: Dict[Tuple[int, int], int] = {}
+            for start in range(0, len(events), UPSERT_CHUNK_SIZE):
+                chunk = events[start:start + UPSERT_CHUNK_SIZE]
+                cursor = await conn.execute(
+                    "SELECT user_id, seed, useful FROM plan_feedback WHERE (user_id, seed) IN (VALUES "
+                    + ", ".join(["(?, ?)"] * len(chunk)) + ")",
+                    [value for event in chunk for value in (event.user_id, event.seed)]
+                )
+                previous.update(
+                    ((row["user_id"], row["seed"]), row["useful"]) for row in await cursor.fetchall()
+                )
+
+            # (тип, индекс) -> [Δ полезно, Δ не полезно]
+            deltas: Dict[Tuple[str, int], List[int]] = {}
+            for event in events:
+                old = previous.get((event.user_id, event.seed))
+                if old == int(event.useful):
+                    continue
+                for template in event.templates:
+                    delta = deltas.setdefault(template, [0, 0])
+                    delta[0 if event.useful else 1] += 1
+                    if old is not None:
+                        delta[0 if old else 1] -= 1
+
+            await conn.executemany(
+                """INSERT INTO plan_feedback (user_id, seed, useful) VALUES (?, ?, ?)
+                   ON CONFLICT (user_id, seed) DO UPDATE SET
+                       useful = excluded.useful,
+                       created_at = excluded.created_at""",
+                [(event.user_id, event.seed, int(event.useful)) for event in events]
+            )
+            await conn.executemany(
+                """INSERT INTO template_feedback (content_type, template_index, useful, not_useful)
+                   VALUES (?, ?, ?, ?)
+                   ON CONFLICT (content_type, template_index) DO UPDATE SET
+                       useful = useful + excluded.useful,
+                       not_useful = not_useful + excluded.not_useful""",
+                [(content_type, index, useful, not_useful)
+                 for (content_type, index), (useful, not_useful) in deltas.items()]
+            )
+
+    @staticmethod
+    async def template_stats() -> List[Dict[str, Any]]:
+        """Сумма оценок по шаблонам: content_type, template_index, useful, not_useful."""
+        conn = await get_connection(readonly=True)
+        cursor = await conn.execute("SELECT * FROM template_feedback")
+        return [dict(row) for row in await cursor.fetchall()]
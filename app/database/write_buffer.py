@@ -0,0 +1,190 @@
+"""
+Буфер отложенной записи (group commit).
+
+Записи репозиториев складываются в очередь и выполняются пачкой в одной
+транзакции на подключении-писателе: раз в ``db_flush_interval_ms``
+миллисекунд или как только набралось ``db_flush_max_rows`` операций.
+Один COMMIT (и один fsync) приходится на всю пачку.
+
+Вызывающий код, которому нужна гарантия записи (оплата), просто
+дожидается ``execute()`` — корутина завершится после COMMIT пачки.
+"""
+
+import asyncio
+import logging
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, List, Optional, Sequence, Tuple
+
+import aiosqlite
+
+from app.config import settings
+from app.database.connection import get_connection
+
+logger = logging.getLogger(__name__)
+
+_PendingWrite = Tuple[str, Sequence[Any], bool, asyncio.Future]
+
+
+class WriteBuffer:
+    """Очередь записей с пакетным коммитом."""
+
+    def __init__(self, flush_interval_ms: int, max_rows: int):
+        self.flush_interval = flush_interval_ms / 1000
+        self.max_rows = max_rows
+        self._pending: List[_PendingWrite] = []
+        self._has_items = asyncio.Event()
+        self._full = asyncio.Event()
+        self._lock = asyncio.Lock()
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    async def start(self) -> None:
+        """Запустить фоновый цикл сброса."""
+        if self.running:
+            return
+        self._task = asyncio.create_task(self._run(), name="db-write-buffer")
+        logger.info(
+            f"Write buffer started (interval={self.flush_interval * 1000:.0f}ms, "
+            f"max_rows={self.max_rows})"
+        )
+
+    async def stop(self) -> None:
+        """Остановить цикл и записать всё, что осталось в очереди."""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await self.flush()
+        logger.info("Write buffer drained")
+
+    async def execute(
+        self,
+        sql: str,
+        params: Sequence[Any] = (),
+        *,
+        wait: bool = True,
+        fetch: bool = False
+    ) -> Any:
+        """
+        Поставить запись в очередь.
+
+        Args:
+            sql: SQL-запрос на изменение данных
+            params: Параметры запроса
+            wait: Дождаться COMMIT пачки (по умолчанию). При False запись
+                выполняется в фоне, ошибки только логируются.
+            fetch: Вернуть строки RETURNING вместо lastrowid
+
+        Returns:
+            lastrowid или список строк RETURNING (None при wait=False)
+        """
+        if not self.running:
+            # Буфер не запущен (тесты, утилиты) — пишем сразу
+            # Под тем же замком, что и пачки: COMMIT чужой корутины не должен
+            # попасть между execute и чтением RETURNING
+            async with self._lock:
+                conn = await get_connection()
+                cursor = await conn.execute(sql, params)
+                result = await cursor.fetchall() if fetch else cursor.lastrowid
+                await conn.commit()
+                return result
+
+        future = asyncio.get_running_loop().create_future()
+        self._pending.append((sql, params, fetch, future))
+        self._has_items.set()
+        if len(self._pending) >= self.max_rows:
+            self._full.set()
+
+        if not wait:
+            future.add_done_callback(_log_failure)
+            return None
+        return await future
+
+    @asynccontextmanager
+    async def transaction(self) -> AsyncIterator[aiosqlite.Connection]:
+        """
+        Своя транзакция на подключении-писателе, вне очереди.
+
+        Для фоновых задач, которым нужно несколько связанных операторов
+        в одной транзакции (например, пачка индексации и её позиция).
+        Пачки буфера ждут её завершения, поэтому транзакция должна быть
+        короткой. Внутри нельзя вызывать execute() — он ждёт тот же замок.
+        """
+        async with self._lock:
+            conn = await get_connection()
+            try:
+                yield conn
+            except BaseException:
+                await conn.rollback()
+                raise
+            await conn.commit()
+
+    async def flush(self) -> None:
+        """Немедленно выполнить и закоммитить все ожидающие записи."""
+        async with self._lock:
+            while self._pending:
+                batch = self._pending[:self.max_rows]
+                del self._pending[:len(batch)]
+                await self._commit_batch(batch)
+            self._has_items.clear()
+            self._full.clear()
+
+    async def _run(self) -> None:
+        while True:
+            await self._has_items.wait()
+            try:
+                await asyncio.wait_for(self._full.wait(), timeout=self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            try:
+                # shield: отмена цикла в stop() не должна прерывать пачку
+                await asyncio.shield(self.flush())
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.exception("Write buffer flush failed")
+
+    @staticmethod
+    async def _commit_batch(batch: List[_PendingWrite]) -> None:
+        conn = await get_connection()
+        results = []
+        for sql, params, fetch, future in batch:
+            try:
+                cursor = await conn.execute(sql, params)
+                result = await cursor.fetchall() if fetch else cursor.lastrowid
+                results.append((future, result, None))
+            except Exception as e:
+                # Ошибка откатывает только этот оператор, остальная пачка живёт
+                results.append((future, None, e))
+
+        try:
+            await conn.commit()
+        except Exception as e:
+            logger.error(f"Batch commit failed ({len(batch)} writes): {e}")
+            await conn.rollback()
+            results = [(future, None, e) for future, _, _ in results]
+
+        for future, result, error in results:
+            if future.done():
+                continue
+            if error is not None:
+                future.set_exception(error)
+            else:
+                future.set_result(result)
+
+
+def _log_failure(future: asyncio.Future) -> None:
+    if not future.cancelled() and future.exception() is not None:
+        logger.error(f"Background write failed: {future.exception()}")
+
+
+write_buffer = WriteBuffer(
+    flush_interval_ms=settings.db_flush_interval_ms,
+    max_rows=settings.db_flush_max_rows,
+)
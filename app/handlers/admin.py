@@ -2,12 +2,21 @@
 Административные функции бота.
 """
 
+import html
+from typing import List, Tuple
+
 from aiogram import Router
 from aiogram.types import Message
 from aiogram.filters import Command
 
 from app.config import settings
-from app.database.repository import UserRepository, ContentPlanRepository
+from app.database.repository import UserRepository
+from app.services.broadcast import BroadcastService
+from app.services.jobs import generation_queue
+from app.services.planner import plan_cache_stats
+from app.services.stats import StatsService, format_summary
+from app.services.subscription import SubscriptionService
+from app.services.trends import AUDIENCE, NICHE, niche_trends
 
 router = Router(name=__name__)
 
@@ -18,17 +27,48 @@ async def cmd_admin_stats(message: Message) -> None:
     if not settings.is_admin(message.from_user.id):
         return
 
-    users_count = await UserRepository.count_all()
-    plans_count = await ContentPlanRepository.count_all()
+    summary = await StatsService.summary()
+    cache = SubscriptionService.cache_stats()
+    plans_cache = plan_cache_stats()
+    queue = await generation_queue.stats()
 
     texto = (
         f"📊 <b>Статистика бота</b>\n\n"
-        f"👥 Пользователей: <b>{users_count}</b>\n"
-        f"📝 Создано планов: <b>{plans_count}</b>"
+        f"{format_summary(summary)}\n\n"
+        f"🗄 Кэш подписок: {cache['size']} записей, "
+        f"попаданий {cache['hit_rate']:.0%} ({cache['hits']}/{cache['hits'] + cache['misses']})\n"
+        f"🗂 Кэш планов: {plans_cache['size']}/{plans_cache['max_size']} записей, "
+        f"попаданий {plans_cache['hit_rate']:.0%}, вытеснено {plans_cache['evictions']}\n"
+        f"⏱ Очередь генерации: {queue['pending']} ждут, "
+        f"за час {queue['jobs']} готово, "
+        f"ожидание ср. {queue['avg_wait'] or 0:.2f}с / макс. {queue['max_wait'] or 0:.2f}с"
     )
     await message.answer(texto)
 
 
+def _format_top(title: str, items: List[Tuple[str, int]]) -> List[str]:
+    lines = [f"<b>{title}</b>"]
+    if not items:
+        return lines + ["— пока нет запросов", ""]
+    for number, (key, count) in enumerate(items, start=1):
+        lines.append(f"{number}. {html.escape(key)} — ~{count}")
+    return lines + [""]
+
+
+@router.message(Command("top"))
+async def cmd_top(message: Message) -> None:
+    """Популярные ниши и ЦА за час и за сутки (только для админов)."""
+    if not settings.is_admin(message.from_user.id):
+        return
+
+    lines = ["🔥 <b>Популярные запросы</b>", ""]
+    lines += _format_top("Ниши за текущий час", niche_trends.hourly(NICHE))
+    lines += _format_top("Ниши за сутки", await niche_trends.daily(NICHE))
+    lines += _format_top("ЦА за сутки", await niche_trends.daily(AUDIENCE))
+    lines.append("<i>Оценки приблизительные (count-min sketch): могут быть немного завышены.</i>")
+    await message.answer("\n".join(lines))
+
+
 @router.message(Command("broadcast"))
 async def cmd_broadcast(message: Message) -> None:
     """Рассылка сообщения всем пользователям (только для админов)."""
@@ -43,22 +83,13 @@ async def cmd_broadcast(message: Message) -> None:
         return
 
     text_to_send = parts[1]
-    user_ids = await UserRepository.get_all_ids()
-
-    sent_count = 0
-    errors_count = 0
-
-    await message.answer(f"⏳ Начинаю рассылку на {len(user_ids)} пользователей...")
+    # Счётчик active_users из stats_counters, без COUNT по таблице users
+    users_count = await UserRepository.count_active()
 
-    for user_id in user_ids:
-        try:
-            await message.bot.send_message(chat_id=user_id, text=text_to_send)
-            sent_count += 1
-        except Exception:
-            errors_count += 1
+    progress = await message.answer(f"⏳ Начинаю рассылку на {users_count} пользователей...")
 
-    await message.answer(
-        f"✅ Рассылка завершена!\n\n"
-        f"Отправлено: {sent_count}\n"
-        f"Ошибок: {errors_count}"
+    # Рассылка идёт в фоне; прогресс обновляется в сообщении выше
+    job_id = await BroadcastService.create_job(
+        text_to_send, message.chat.id, progress.message_id, users_count
     )
+    BroadcastService.start(message.bot, job_id)
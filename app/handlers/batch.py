@@ -0,0 +1,106 @@
+"""
+Пакетная генерация планов (для агентств).
+
+/batch со списком запросов по одному на строку или .txt-файл с таким
+списком — в ответ один документ со всеми планами.
+"""
+
+import io
+import logging
+from datetime import datetime
+from typing import List, Optional
+
+from aiogram import F, Router
+from aiogram.filters import Command, CommandObject
+from aiogram.types import BufferedInputFile, Message
+
+from app.config import settings
+from app.services.executor import ExecutorBusyError, plan_executor
+from app.services.planner import generate_content_plans, plan_to_text
+from app.services.trends import niche_trends
+
+logger = logging.getLogger(__name__)
+
+router = Router(name=__name__)
+
+USAGE = (
+    "📦 <b>Пакетная генерация</b>\n\n"
+    "Отправьте запросы по одному на строку:\n"
+    "<code>/batch\n"
+    "ниша: фитнес, ЦА: мамы\n"
+    "ниша: кофейня, ЦА: студенты на 14 дней</code>\n\n"
+    "или .txt-файл с таким списком.\n"
+    f"До {settings.batch_max_plans} планов за раз."
+)
+
+
+def split_batch(text: str) -> List[str]:
+    """Запросы пакета: непустые строки, «#» — комментарий."""
+    lines = (line.strip() for line in text.splitlines())
+    return [line for line in lines if line and not line.startswith("#")]
+
+
+def build_document(requests: List[str], plans: List[str]) -> str:
+    """Один текстовый документ со всеми планами пакета."""
+    parts = []
+    for number, (request, plan) in enumerate(zip(requests, plans), start=1):
+        parts.append(f"#{number}. {request}\n{'=' * 40}\n\n{plan_to_text(plan)}\n")
+    return "\n\n".join(parts)
+
+
+async def _generate_batch(message: Message, requests: List[str]) -> None:
+    if not requests:
+        await message.answer(USAGE)
+        return
+    if len(requests) > settings.batch_max_plans:
+        await message.answer(
+            f"⚠️ Слишком много запросов: {len(requests)}. "
+            f"За раз — не больше {settings.batch_max_plans}."
+        )
+        return
+
+    status = await message.answer(f"⏳ Генерирую планы: {len(requests)}...")
+    try:
+        plans = await plan_executor.run(generate_content_plans, requests)
+    except ExecutorBusyError:
+        await status.edit_text("😔 Бот сейчас перегружен запросами. Попробуйте через минуту.")
+        return
+
+    for request in requests:
+        niche_trends.record(request)
+    document = build_document(requests, plans)
+    filename = f"plans_{datetime.now():%Y%m%d_%H%M}.txt"
+    await message.answer_document(
+        BufferedInputFile(document.encode("utf-8"), filename=filename),
+        caption=f"📦 Готово, планов: {len(plans)}"
+    )
+    await status.delete()
+
+
+@router.message(Command("batch"))
+async def cmd_batch(message: Message, command: CommandObject) -> None:
+    """Пакет запросов в тексте команды."""
+    await _generate_batch(message, split_batch(command.args or ""))
+
+
+def _is_text_file(message: Message) -> bool:
+    document = message.document
+    return document.mime_type == "text/plain" or (document.file_name or "").lower().endswith(".txt")
+
+
+@router.message(F.document)
+async def handle_batch_file(message: Message) -> None:
+    """Пакет запросов в .txt-файле."""
+    if not _is_text_file(message):
+        await message.answer("⚠️ Для пакетной генерации пришлите .txt-файл: один запрос на строку.")
+        return
+    if message.document.file_size and message.document.file_size > settings.batch_max_file_size:
+        await message.answer(
+            f"⚠️ Файл слишком большой. Максимум — {settings.batch_max_file_size // 1024} КБ."
+        )
+        return
+
+    buffer: Optional[io.BytesIO] = await message.bot.download(message.document)
+    # utf-8-sig убирает BOM, который добавляет Блокнот
+    text = buffer.getvalue().decode("utf-8-sig", errors="replace") if buffer else ""
+    await _generate_batch(message, split_batch(text))
@@ -0,0 +1,72 @@
+"""
+Выгрузка истории планов: /export [csv|md|ics].
+"""
+
+import logging
+
+from aiogram import Bot, F, Router
+from aiogram.filters import Command, CommandObject
+from aiogram.types import CallbackQuery, Message
+
+from app.keyboards.main import get_export_keyboard
+from app.services.export import (
+    EXPORT_FORMATS,
+    TELEGRAM_FILE_LIMIT,
+    ExportTooLargeError,
+    SpooledInputFile,
+    export_filename,
+    export_history,
+)
+
+logger = logging.getLogger(__name__)
+
+router = Router(name=__name__)
+
+
+async def send_export(bot: Bot, chat_id: int, user_id: int, fmt: str) -> None:
+    """Собрать выгрузку и отправить её документом."""
+    status = await bot.send_message(chat_id=chat_id, text="⏳ Готовлю выгрузку...")
+    try:
+        file, count = await export_history(user_id, fmt)
+    except ExportTooLargeError:
+        await status.edit_text(
+            f"😔 История больше {TELEGRAM_FILE_LIMIT // (1024 * 1024)} МБ — "
+            f"Telegram не примет такой файл. Попробуйте формат CSV."
+        )
+        return
+
+    try:
+        if not count:
+            await status.edit_text("📭 У вас пока нет сохранённых планов.")
+            return
+        await bot.send_document(
+            chat_id=chat_id,
+            document=SpooledInputFile(file, filename=export_filename(fmt)),
+            caption=f"📦 Планов в выгрузке: {count}"
+        )
+        await status.delete()
+    finally:
+        file.close()
+
+
+@router.message(Command("export"))
+async def cmd_export(message: Message, command: CommandObject) -> None:
+    """Выгрузка в формате из аргумента или выбор формата кнопками."""
+    fmt = (command.args or "").strip().lower().lstrip(".")
+    if fmt == "markdown":
+        fmt = "md"
+    if fmt not in EXPORT_FORMATS:
+        await message.answer("📦 В каком формате выгрузить историю планов?", reply_markup=get_export_keyboard())
+        return
+    await send_export(message.bot, message.chat.id, message.from_user.id, fmt)
+
+
+@router.callback_query(F.data.startswith("export:"))
+async def export_format_chosen(callback: CallbackQuery) -> None:
+    """Формат выбран кнопкой."""
+    fmt = callback.data.removeprefix("export:")
+    if fmt not in EXPORT_FORMATS:
+        await callback.answer()
+        return
+    await callback.answer()
+    await send_export(callback.bot, callback.message.chat.id, callback.from_user.id, fmt)
@@ -2,13 +2,16 @@
 Обработчики команд бота.
 """
 
-from aiogram import Router
-from aiogram.types import Message
+from aiogram import F, Router
+from aiogram.types import CallbackQuery, Message
 from aiogram.filters import CommandStart, Command
 
+from app.config import settings
 from app.handlers.help_text import get_help
-from app.services.planner import generate_content_plan
-from app.keyboards.main import get_main_keyboard
+from app.services.jobs import PRIORITY_LOW, PRIORITY_PAID, QueueFullError, generation_queue
+from app.services.prewarm import NICHE_PRESETS
+from app.services.subscription import SubscriptionService
+from app.keyboards.main import get_inline_examples, get_main_keyboard
 
 router = Router(name=__name__)
 
@@ -24,6 +27,7 @@ async def cmd_start(message: Message) -> None:
         "Используй /help для справки.",
         reply_markup=get_main_keyboard()
     )
+    await message.answer("Или выбери готовый пример:", reply_markup=get_inline_examples())
 
 
 @router.message(Command("help"))
@@ -47,7 +51,67 @@ async def handle_plan_request(message: Message) -> None:
         )
         return
 
-    await message.answer("⏳ Генерирую контент-план...")
+    await submit_plan_request(message, message.from_user.id, user_input)
 
-    plan = generate_content_plan(user_input)
-    await message.answer(plan)
+
+async def submit_plan_request(message: Message, user_id: int, user_input: str) -> None:
+    """
+    Поставить запрос в очередь генерации и показать статус в чате message.
+
+    Args:
+        message: Сообщение в чате пользователя (его или бота — для кнопок)
+        user_id: Telegram ID автора запроса
+        user_input: Текст запроса
+    """
+    # Служебный трафик админов не должен задерживать платных подписчиков
+    if not settings.is_admin(user_id) and await SubscriptionService.check_access(user_id):
+        priority = PRIORITY_PAID
+    else:
+        priority = PRIORITY_LOW
+
+    # Статус отправляем сразу: в это же сообщение потом выводится план
+    status = await message.answer("⏳ Генерирую контент-план...")
+
+    try:
+        job_id = await generation_queue.submit(
+            user_id, message.chat.id, user_input, priority, message_id=status.message_id
+        )
+    except QueueFullError:
+        await status.edit_text(
+            "😔 Бот сейчас перегружен запросами. Попробуйте через минуту."
+        )
+        return
+
+    if job_id is None:
+        await status.edit_text("⏳ Этот запрос уже в работе — план скоро придёт.")
+        return
+
+    position = await generation_queue.position(job_id)
+    if position:
+        # Отдельным сообщением: правка статуса могла бы затереть уже готовый план
+        await message.answer(
+            f"⏳ Сейчас много запросов — вы <b>#{position}</b> в очереди.\n"
+            f"План появится в сообщении выше."
+        )
+
+
+@router.callback_query(F.data.startswith("niche:"))
+async def niche_example(callback: CallbackQuery) -> None:
+    """План по кнопке-примеру ниши (планы этих ниш прогреты заранее)."""
+    user_input = NICHE_PRESETS.get(callback.data.split(":", 1)[1])
+    if user_input is None:
+        await callback.answer("Пример устарел", show_alert=True)
+        return
+    await callback.answer()
+    await submit_plan_request(callback.message, callback.from_user.id, user_input)
+
+
+@router.callback_query(F.data == "new_plan")
+async def new_plan(callback: CallbackQuery) -> None:
+    """Подсказка для нового запроса."""
+    await callback.answer()
+    await callback.message.answer(
+        "📝 Напиши нишу и ЦА, например: <code>ниша: кулинария, ЦА: молодые мамы</code>\n\n"
+        "Или выбери готовый пример:",
+        reply_markup=get_inline_examples()
+    )
@@ -0,0 +1,40 @@
+"""
+Оценка плана кнопками «👍 Полезно» / «👎 Не полезно».
+"""
+
+from typing import Optional, Tuple
+
+from aiogram import F, Router
+from aiogram.types import CallbackQuery
+
+from app.services.feedback import USEFUL, VERDICTS, FeedbackService
+
+router = Router(name=__name__)
+
+
+def parse_feedback_callback(data: str) -> Optional[Tuple[bool, Optional[int]]]:
+    """«feedback:useful:<seed>» -> (True, seed); seed может отсутствовать."""
+    parts = data.split(":")
+    if len(parts) not in (2, 3) or parts[1] not in VERDICTS:
+        return None
+    seed = None
+    if len(parts) == 3:
+        if not parts[2].isdigit():
+            return None
+        seed = int(parts[2])
+    return parts[1] == USEFUL, seed
+
+
+@router.callback_query(F.data.startswith("feedback:"))
+async def plan_feedback(callback: CallbackQuery) -> None:
+    """Записать оценку плана (в буфер, см. services/feedback.py)."""
+    parsed = parse_feedback_callback(callback.data)
+    if parsed is None:
+        await callback.answer()
+        return
+
+    useful, seed = parsed
+    # Старые кнопки без seed не указывают, какой план оценён
+    if seed is not None:
+        await FeedbackService.record(callback.from_user.id, seed, useful)
+    await callback.answer("Спасибо за оценку! 🙌" if useful else "Спасибо, учтём! Попробуйте новый план.")
@@ -14,10 +14,15 @@ HELP_TEXT = """
 • <code>ниша: фитнес, ЦА: женщины 25-35</code>
 • <code>ниша: программирование, ЦА: начинающие разработчики</code>
 • <code>ниша: кулинария, ЦА: молодые мамы</code>
+• <code>ниша: фитнес, площадки: telegram, instagram, вк</code> — план для каждой площадки
 
 ⌨️ <b>Команды:</b>
 /start — запуск бота
 /help — эта справка
+/history — ваши прошлые планы
+/search — поиск по вашим планам
+/export — выгрузка планов в CSV, Markdown или календарь (.ics)
+/batch — планы для нескольких ниш одним файлом (список или .txt)
 
 💬 Поддержка: @TkAs007bot
 🌐 Сайт: https://1vetoshkin.ru
@@ -0,0 +1,80 @@
+"""
+История планов: /history и просмотр сохранённого плана.
+"""
+
+import logging
+from typing import Optional, Tuple
+
+from aiogram import F, Router
+from aiogram.filters import Command
+from aiogram.types import CallbackQuery, Message
+
+from app.database.repository import ContentPlanRepository
+from app.keyboards.main import get_feedback_keyboard, get_history_keyboard
+from app.services.history import HistoryPage, HistoryService, format_history
+from app.services.planner import iter_stored_plan
+from app.services.streaming import MessageStream
+
+logger = logging.getLogger(__name__)
+
+router = Router(name=__name__)
+
+
+def _keyboard(page: HistoryPage):
+    return get_history_keyboard([plan["id"] for plan in page.plans], page.older, page.newer)
+
+
+def parse_history_callback(data: str) -> Optional[Tuple[str, Tuple[int, int]]]:
+    """«history:older:<created_at>:<id>» -> ("older", (created_at, id))."""
+    parts = data.split(":")
+    if len(parts) != 4 or parts[1] not in ("older", "newer"):
+        return None
+    try:
+        return parts[1], (int(parts[2]), int(parts[3]))
+    except ValueError:
+        return None
+
+
+@router.message(Command("history"))
+async def cmd_history(message: Message) -> None:
+    """Последние планы пользователя."""
+    page = await HistoryService.page(message.from_user.id)
+    await message.answer(format_history(page), reply_markup=_keyboard(page))
+
+
+@router.callback_query(F.data.startswith("history:"))
+async def history_page(callback: CallbackQuery) -> None:
+    """Листание истории."""
+    parsed = parse_history_callback(callback.data)
+    if parsed is None:
+        await callback.answer()
+        return
+
+    direction, cursor = parsed
+    if direction == "older":
+        page = await HistoryService.page(callback.from_user.id, before=cursor)
+    else:
+        page = await HistoryService.page(callback.from_user.id, after=cursor)
+
+    await callback.message.edit_text(format_history(page), reply_markup=_keyboard(page))
+    await callback.answer()
+
+
+@router.callback_query(F.data.startswith("plan:"))
+async def open_plan(callback: CallbackQuery) -> None:
+    """Открыть сохранённый план (длинный — несколькими сообщениями)."""
+    plan_id = callback.data.removeprefix("plan:")
+    row = None
+    if plan_id.isdigit():
+        row = await ContentPlanRepository.get_for_user(int(plan_id), callback.from_user.id)
+    if row is None:
+        await callback.answer("План не найден", show_alert=True)
+        return
+
+    await callback.answer()
+    stream = MessageStream(callback.bot, callback.message.chat.id, min_interval=0)
+    for chunk in iter_stored_plan(row):
+        await stream.write(chunk)
+    await stream.close()
+    if row.get("seed") is not None:
+        await stream.attach_markup(get_feedback_keyboard(row["seed"]))
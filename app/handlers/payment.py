@@ -2,12 +2,18 @@
 Обработчики оплаты и подписки.
 """
 
-from aiogram import Router, F
+import logging
+
+from aiogram import Bot, Router, F
 from aiogram.types import Message, CallbackQuery
 from aiogram.filters import Command
 
+from app.config import settings
+from app.services.expiry import EXPIRED, EXPIRING_SOON, ExpiryEvent
 from app.services.subscription import SubscriptionService
 
+logger = logging.getLogger(__name__)
+
 router = Router(name=__name__)
 
 
@@ -53,3 +59,35 @@ async def process_test_payment(callback: CallbackQuery) -> None:
         f"Теперь вы можете генерировать контент-планы.\n"
         f"Напишите нишу и ЦА 👇"
     )
+
+
+def _days_genitive(days: float) -> str:
+    """«меньше N дня/дней»: 1 дня, 3 дней, 21 дня, 0,5 дня."""
+    if days != int(days):
+        return f"{days:g} дня".replace(".", ",")
+    days = int(days)
+    word = "дня" if days % 10 == 1 and days % 100 != 11 else "дней"
+    return f"{days} {word}"
+
+
+async def send_expiry_reminder(bot: Bot, event: ExpiryEvent) -> None:
+    """Напомнить пользователю о скором или наступившем окончании подписки."""
+    if event.kind == EXPIRING_SOON:
+        text = (
+            "⏰ <b>Подписка скоро закончится</b>\n\n"
+            f"Осталось меньше {_days_genitive(settings.expiry_reminder_days)} "
+            "доступа к генератору контент-планов.\n"
+            "👉 Продлите подписку: /buy"
+        )
+    elif event.kind == EXPIRED:
+        text = (
+            "⛔ <b>Подписка закончилась</b>\n\n"
+            "Чтобы снова генерировать контент-планы, оформите доступ: /buy"
+        )
+    else:
+        return
+
+    try:
+        await bot.send_message(chat_id=event.user_id, text=text)
+    except Exception as e:
+        logger.info(f"Expiry reminder to {event.user_id} not delivered: {e}")
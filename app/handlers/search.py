@@ -0,0 +1,49 @@
+"""
+Поиск по сохранённым планам: /search <запрос>.
+"""
+
+from aiogram import F, Router
+from aiogram.filters import Command, CommandObject
+from aiogram.types import CallbackQuery, Message
+
+from app.keyboards.main import get_search_keyboard
+from app.services.cache import MISSING
+from app.services.search import SearchResults, SearchService, format_results, search_queries
+
+router = Router(name=__name__)
+
+USAGE = (
+    "🔎 <b>Поиск по вашим планам</b>\n\n"
+    "Напишите, что искать:\n"
+    "<code>/search подготовка к марафону</code>"
+)
+
+
+def _keyboard(results: SearchResults):
+    return get_search_keyboard([plan["id"] for plan in results.plans], results.page, results.has_next)
+
+
+@router.message(Command("search"))
+async def cmd_search(message: Message, command: CommandObject) -> None:
+    """Первая страница результатов."""
+    query = (command.args or "").strip()
+    if not query:
+        await message.answer(USAGE)
+        return
+
+    results = await SearchService.search(message.from_user.id, query)
+    await message.answer(format_results(results), reply_markup=_keyboard(results))
+
+
+@router.callback_query(F.data.startswith("search:"))
+async def search_page(callback: CallbackQuery) -> None:
+    """Листание результатов последнего запроса."""
+    page = callback.data.removeprefix("search:")
+    query = search_queries.get(callback.from_user.id)
+    if not page.isdigit() or query is MISSING:
+        await callback.answer("Поиск устарел — повторите /search", show_alert=True)
+        return
+
+    results = await SearchService.search(callback.from_user.id, query, int(page))
+    await callback.message.edit_text(format_results(results), reply_markup=_keyboard(results))
+    await callback.answer()
@@ -3,6 +3,8 @@
 Reply и Inline клавиатуры для взаимодействия с пользователем.
 """
 
+from typing import Optional, Sequence, Tuple
+
 from aiogram.types import (
     ReplyKeyboardMarkup,
     KeyboardButton,
@@ -41,13 +43,19 @@ def get_inline_examples() -> InlineKeyboardMarkup:
     return keyboard
 
 
-def get_feedback_keyboard() -> InlineKeyboardMarkup:
-    """Клавиатура для обратной связи."""
+def get_feedback_keyboard(seed: Optional[int] = None) -> InlineKeyboardMarkup:
+    """
+    Клавиатура для обратной связи.
+
+    Args:
+        seed: Seed оцениваемого плана (callback_data "feedback:useful:<seed>")
+    """
+    suffix = f":{seed}" if seed is not None else ""
     keyboard = InlineKeyboardMarkup(
         inline_keyboard=[
             [
-                InlineKeyboardButton(text="👍 Полезно", callback_data="feedback:useful"),
-                InlineKeyboardButton(text="👎 Не полезно", callback_data="feedback:not_useful")
+                InlineKeyboardButton(text="👍 Полезно", callback_data=f"feedback:useful{suffix}"),
+                InlineKeyboardButton(text="👎 Не полезно", callback_data=f"feedback:not_useful{suffix}")
             ],
             [
                 InlineKeyboardButton(text="🔄 Новый план", callback_data="new_plan")
@@ -55,3 +63,74 @@ def get_feedback_keyboard() -> InlineKeyboardMarkup:
         ]
     )
     return keyboard
+
+
+def get_history_keyboard(
+    plan_ids: Sequence[int],
+    older: Optional[Tuple[int, int]] = None,
+    newer: Optional[Tuple[int, int]] = None
+) -> InlineKeyboardMarkup:
+    """
+    Клавиатура страницы истории: номера планов и листание.
+
+    Args:
+        plan_ids: ID планов на странице (кнопки «1», «2», ...)
+        older: Курсор (created_at, id) для кнопки «Старше»
+        newer: Курсор (created_at, id) для кнопки «Новее»
+    """
+    rows = []
+    if plan_ids:
+        rows.append([
+            InlineKeyboardButton(text=str(number), callback_data=f"plan:{plan_id}")
+            for number, plan_id in enumerate(plan_ids, start=1)
+        ])
+    navigation = []
+    if newer is not None:
+        navigation.append(
+            InlineKeyboardButton(text="◀️ Новее", callback_data=f"history:newer:{newer[0]}:{newer[1]}")
+        )
+    if older is not None:
+        navigation.append(
+            InlineKeyboardButton(text="Старше ▶️", callback_data=f"history:older:{older[0]}:{older[1]}")
+        )
+    if navigation:
+        rows.append(navigation)
+    return InlineKeyboardMarkup(inline_keyboard=rows)
+
+
+def get_search_keyboard(plan_ids: Sequence[int], page: int, has_next: bool) -> InlineKeyboardMarkup:
+    """
+    Клавиатура результатов поиска: номера планов и листание.
+
+    Args:
+        plan_ids: ID найденных планов на странице
+        page: Номер страницы с нуля
+        has_next: Есть ли следующая страница
+    """
+    rows = []
+    if plan_ids:
+        rows.append([
+            InlineKeyboardButton(text=str(number), callback_data=f"plan:{plan_id}")
+            for number, plan_id in enumerate(plan_ids, start=1)
+        ])
+    navigation = []
+    if page > 0:
+        navigation.append(InlineKeyboardButton(text="◀️ Назад", callback_data=f"search:{page - 1}"))
+    if has_next:
+        navigation.append(InlineKeyboardButton(text="Дальше ▶️", callback_data=f"search:{page + 1}"))
+    if navigation:
+        rows.append(navigation)
+    return InlineKeyboardMarkup(inline_keyboard=rows)
+
+
+def get_export_keyboard() -> InlineKeyboardMarkup:
+    """Выбор формата выгрузки истории."""
+    return InlineKeyboardMarkup(
+        inline_keyboard=[
+            [
+                InlineKeyboardButton(text="📊 CSV", callback_data="export:csv"),
+                InlineKeyboardButton(text="📝 Markdown", callback_data="export:md"),
+                InlineKeyboardButton(text="📅 Календарь", callback_data="export:ics")
+            ]
+        ]
+    )
@@ -10,6 +10,7 @@ Telegram: https://t.me/TkAs007bot
 import asyncio
 import logging
 import sys
+from functools import partial
 
 from aiogram import Bot, Dispatcher
 from aiogram.enums import ParseMode
@@ -17,6 +18,19 @@ from aiogram.client.default import DefaultBotProperties
 
 from app.config import settings
 from app.database.connection import init_db, close_db
+from app.database.write_buffer import write_buffer
+from app.middlewares.users import UserTrackingMiddleware
+from app.handlers.payment import send_expiry_reminder
+from app.services.broadcast import BroadcastService
+from app.services.executor import plan_executor
+from app.services.expiry import expiry_scheduler
+from app.services.feedback import feedback_buffer
+from app.services.generators import plan_generator
+from app.services.jobs import generation_queue
+from app.services.prewarm import plan_prewarmer
+from app.services.search import search_indexer
+from app.services.stats import stats_recorder
+from app.services.trends import niche_trends
 
 
 logging.basicConfig(
@@ -27,14 +41,41 @@ logging.basicConfig(
 logger = logging.getLogger(__name__)
 
 
-async def on_startup(bot: Bot) -> None:
+async def on_startup(bot: Bot, user_tracker: UserTrackingMiddleware) -> None:
     """Действия при запуске бота."""
     await init_db()
+    await write_buffer.start()
+    user_tracker.start()
+    await BroadcastService.resume_all(bot)
+    expiry_scheduler.subscribe(partial(send_expiry_reminder, bot))
+    await expiry_scheduler.start()
+    # До воркеров очереди: счёт часа продолжается с записанного в БД
+    await niche_trends.start()
+    await generation_queue.start(bot)
+    # Планы, сохранённые до появления поиска, индексируются в фоне
+    search_indexer.start()
+    stats_recorder.start()
+    # Планы популярных ниш — заранее, в фоне
+    plan_prewarmer.start()
+    feedback_buffer.start()
     logger.info("Bot started successfully")
 
 
-async def on_shutdown(bot: Bot) -> None:
+async def on_shutdown(bot: Bot, user_tracker: UserTrackingMiddleware) -> None:
     """Действия при остановке бота."""
+    # Сначала дописываем буфер, потом закрываем подключения
+    await generation_queue.stop()
+    await plan_prewarmer.stop()
+    await search_indexer.stop()
+    await stats_recorder.stop()
+    await niche_trends.stop()
+    await expiry_scheduler.stop()
+    await BroadcastService.shutdown()
+    await plan_generator.close()
+    plan_executor.shutdown()
+    await user_tracker.stop()
+    await feedback_buffer.stop()
+    await write_buffer.stop()
     await close_db()
     logger.info("Bot stopped")
 
@@ -55,16 +96,24 @@ async def main() -> None:
     dp.startup.register(on_startup)
     dp.shutdown.register(on_shutdown)
 
-    from app.handlers import feature, admin, payment
+    from app.handlers import feature, admin, payment, batch, history, search, export, feedback
     from app.middlewares.subscription import SubscriptionMiddleware
 
     # Регистрация middleware
+    user_tracker = UserTrackingMiddleware()
+    dp["user_tracker"] = user_tracker
+    dp.update.outer_middleware(user_tracker)
     dp.message.middleware(SubscriptionMiddleware())
     dp.callback_query.middleware(SubscriptionMiddleware())
 
     # Подключение роутеров
     dp.include_router(admin.router)  # Admin router first
     dp.include_router(payment.router)  # Payment router second
+    dp.include_router(batch.router)  # /batch и .txt-файлы раньше общего обработчика текста
+    dp.include_router(history.router)
+    dp.include_router(search.router)
+    dp.include_router(export.router)
+    dp.include_router(feedback.router)
     dp.include_router(feature.router)
 
     logger.info("Starting bot polling...")
@@ -2,9 +2,9 @@
 Middleware для проверки подписки.
 """
 
-from typing import Callable, Dict, Any, Awaitable
+from typing import Callable, Dict, Any, Awaitable, Union
 from aiogram import BaseMiddleware
-from aiogram.types import Message
+from aiogram.types import CallbackQuery, Message
 
 from app.services.subscription import SubscriptionService
 from app.config import settings
@@ -18,12 +18,16 @@ class SubscriptionMiddleware(BaseMiddleware):
 
     async def __call__(
         self,
-        handler: Callable[[Message, Dict[str, Any]], Awaitable[Any]],
-        event: Message,
+        handler: Callable[[Union[Message, CallbackQuery], Dict[str, Any]], Awaitable[Any]],
+        event: Union[Message, CallbackQuery],
         data: Dict[str, Any]
     ) -> Any:
         # Пропускаем команды /start, /help, /buy, /admin для всех
-        if event.text and event.text.startswith(("/start", "/help", "/buy", "/admin")):
+        if isinstance(event, Message):
+            if event.text and event.text.startswith(("/start", "/help", "/buy", "/admin")):
+                return await handler(event, data)
+        # Кнопка оплаты из /buy доступна и без подписки
+        elif event.data and event.data.startswith("pay:"):
             return await handler(event, data)
 
         user = event.from_user
@@ -39,6 +43,9 @@ class SubscriptionMiddleware(BaseMiddleware):
 
         if has_access:
             return await handler(event, data)
+        elif isinstance(event, CallbackQuery):
+            await event.answer("⛔ Подписка неактивна. Оформите доступ: /buy", show_alert=True)
+            return None
         else:
             await event.answer(
                 "⛔ <b>Доступ закрыт</b>\n\n"
@@ -0,0 +1,87 @@
+"""
+Middleware для учёта пользователей.
+"""
+
+import asyncio
+import logging
+import time
+from typing import Callable, Dict, Any, Awaitable, Optional
+
+from aiogram import BaseMiddleware
+from aiogram.types import TelegramObject, User
+
+from app.config import settings
+from app.database.repository import UserRepository
+
+logger = logging.getLogger(__name__)
+
+
+class UserTrackingMiddleware(BaseMiddleware):
+    """
+    Собирает пользователей из входящих событий и сохраняет их пачками.
+
+    Вместо записи на каждое сообщение пользователи копятся в словаре
+    и раз в ``user_sync_interval`` секунд (или по ``user_sync_batch_size``
+    штук) уходят в БД одним upsert_many. Фоновая задача (start/stop)
+    сбрасывает остаток, даже если новых событий больше нет.
+    """
+
+    def __init__(self) -> None:
+        self._pending: Dict[int, User] = {}
+        self._last_flush = time.monotonic()
+        self._task: Optional[asyncio.Task] = None
+
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
+        event: TelegramObject,
+        data: Dict[str, Any]
+    ) -> Any:
+        user = data.get("event_from_user")
+        if user and not user.is_bot:
+            self._pending[user.id] = user
+            if (
+                len(self._pending) >= settings.user_sync_batch_size
+                or time.monotonic() - self._last_flush >= settings.user_sync_interval
+            ):
+                await self.flush()
+
+        return await handler(event, data)
+
+    async def flush(self) -> None:
+        """Отправить накопленных пользователей в буфер записи."""
+        self._last_flush = time.monotonic()
+        if not self._pending:
+            return
+        batch, self._pending = self._pending, {}
+        await UserRepository.upsert_many(batch.values(), wait=False)
+
+    def start(self) -> None:
+        """Запустить периодический сброс в БД."""
+        if self._task is not None and not self._task.done():
+            return
+        self._task = asyncio.create_task(self._run(), name="user-tracker-flusher")
+
+    async def stop(self) -> None:
+        """Остановить сброс и записать накопленное."""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await self.flush()
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(settings.user_sync_interval)
+            if time.monotonic() - self._last_flush < settings.user_sync_interval:
+                # Недавно сбросили из __call__
+                continue
+            try:
+                await self.flush()
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.exception("User tracking flush failed")
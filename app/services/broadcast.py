@@ -0,0 +1,252 @@
+"""
+Сервис массовых рассылок.
+
+Задание рассылки хранится в таблице broadcast_jobs. Пользователи читаются
+страницами по возрастанию telegram_id, каждая страница отправляется
+пулом конкурентных отправителей под общим token bucket, после чего
+позиция (last_user_id) и счётчики фиксируются в БД. После перезапуска
+незавершённые задания продолжаются с последней зафиксированной страницы.
+"""
+
+import asyncio
+import logging
+import time
+from typing import Dict, List
+
+from aiogram import Bot
+from aiogram.exceptions import (
+    TelegramBadRequest,
+    TelegramForbiddenError,
+    TelegramRetryAfter,
+)
+
+from app.config import settings
+from app.database.repository import BroadcastRepository, UserRepository
+from app.services.ratelimit import ChatRateLimiter, TokenBucket
+
+logger = logging.getLogger(__name__)
+
+# Результаты отправки одному пользователю
+SENT = "sent"
+FAILED = "failed"
+BLOCKED = "blocked"
+
+# Ошибки BadRequest, после которых писать пользователю бессмысленно
+_DEAD_CHAT_ERRORS = ("chat not found", "user is deactivated", "bot was blocked")
+
+_bucket = TokenBucket(rate=settings.broadcast_rate)
+_chat_limiter = ChatRateLimiter(interval=settings.broadcast_chat_interval)
+_tasks: Dict[int, asyncio.Task] = {}
+
+
+class BroadcastService:
+    """Сервис рассылок."""
+
+    @staticmethod
+    async def create_job(
+        text: str,
+        admin_chat_id: int,
+        progress_message_id: int,
+        total: int
+    ) -> int:
+        """
+        Создать задание рассылки.
+
+        Args:
+            text: Текст рассылки
+            admin_chat_id: Чат админа для отчёта о прогрессе
+            progress_message_id: Сообщение, которое редактируется с прогрессом
+            total: Ожидаемое число получателей (для отчёта)
+
+        Returns:
+            ID задания
+        """
+        return await BroadcastRepository.create(
+            text, admin_chat_id, progress_message_id, total
+        )
+
+    @staticmethod
+    def start(bot: Bot, job_id: int) -> asyncio.Task:
+        """Запустить (или продолжить) задание в фоне."""
+        task = _tasks.get(job_id)
+        if task is None or task.done():
+            task = asyncio.create_task(
+                BroadcastService._run(bot, job_id), name=f"broadcast-{job_id}"
+            )
+            _tasks[job_id] = task
+            task.add_done_callback(lambda _: _tasks.pop(job_id, None))
+        return task
+
+    @staticmethod
+    async def resume_all(bot: Bot) -> int:
+        """Продолжить задания, прерванные перезапуском. Возвращает их число."""
+        jobs = await BroadcastRepository.get_running()
+        for job in jobs:
+            logger.info(f"Resuming broadcast {job['id']} after user {job['last_user_id']}")
+            BroadcastService.start(bot, job["id"])
+        return len(jobs)
+
+    @staticmethod
+    async def wait_all() -> None:
+        """Дождаться завершения всех запущенных рассылок."""
+        if _tasks:
+            await asyncio.gather(*list(_tasks.values()), return_exceptions=True)
+
+    @staticmethod
+    async def shutdown() -> None:
+        """
+        Остановить рассылки при выключении бота.
+
+        Статус заданий остаётся running — при следующем запуске они
+        продолжатся с последней зафиксированной страницы.
+        """
+        tasks = list(_tasks.values())
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    @staticmethod
+    async def _run(bot: Bot, job_id: int) -> None:
+        job = await BroadcastRepository.get(job_id)
+        if not job or job["status"] != "running":
+            return
+
+        stats = {SENT: job["sent"], FAILED: job["failed"], BLOCKED: job["blocked"]}
+        try:
+            await BroadcastService._deliver_all(bot, job, stats)
+            await BroadcastRepository.set_status(job_id, "done")
+        except asyncio.CancelledError:
+            # Выключение бота: задание продолжится после перезапуска
+            raise
+        except Exception:
+            # Статус остаётся running — после перезапуска рассылка продолжится
+            # с последней зафиксированной страницы
+            logger.exception(f"Broadcast {job_id} interrupted")
+            await BroadcastService._report(bot, job, stats, finished=True, failed=True)
+            return
+        await BroadcastService._report(bot, job, stats, finished=True)
+        logger.info(f"Broadcast {job_id} finished: {stats}")
+
+    @staticmethod
+    async def _deliver_all(bot: Bot, job: Dict, stats: Dict[str, int]) -> None:
+        """Разослать страницы пользователей, начиная после last_user_id задания."""
+        semaphore = asyncio.Semaphore(settings.broadcast_workers)
+        last_edit = 0.0
+        # Счётчики страниц, ещё не зафиксированные в БД (ack_batch не удался)
+        unacked = {SENT: 0, FAILED: 0, BLOCKED: 0}
+        last_user_id = job["last_user_id"]
+
+        async def deliver(user_id: int) -> str:
+            async with semaphore:
+                return await BroadcastService._send(bot, user_id, job["text"])
+
+        async for user_ids in UserRepository.iter_ids(
+            batch_size=settings.broadcast_batch_size,
+            after=job["last_user_id"],
+            active_only=True
+        ):
+            results = await asyncio.gather(*(deliver(uid) for uid in user_ids))
+
+            last_user_id = user_ids[-1]
+            blocked_ids: List[int] = []
+            for user_id, result in zip(user_ids, results):
+                stats[result] += 1
+                unacked[result] += 1
+                if result == BLOCKED:
+                    blocked_ids.append(user_id)
+
+            try:
+                await UserRepository.set_inactive(blocked_ids)
+            except Exception:
+                # Не страшно: при следующей рассылке они снова окажутся заблокированными
+                logger.exception(f"Broadcast {job['id']}: failed to mark {len(blocked_ids)} users inactive")
+            try:
+                await BroadcastRepository.ack_batch(
+                    job["id"], last_user_id, unacked[SENT], unacked[FAILED], unacked[BLOCKED]
+                )
+                unacked = {SENT: 0, FAILED: 0, BLOCKED: 0}
+            except Exception:
+                # Счётчики уйдут со следующей страницей; при перезапуске до
+                # неё страница будет отправлена повторно
+                logger.exception(f"Broadcast {job['id']}: failed to save progress after user {last_user_id}")
+
+            if time.monotonic() - last_edit >= settings.broadcast_progress_interval:
+                last_edit = time.monotonic()
+                await BroadcastService._report(bot, job, stats, finished=False)
+
+        if any(unacked.values()):
+            # Последняя страница должна быть зафиксирована до статуса done
+            await BroadcastRepository.ack_batch(
+                job["id"], last_user_id, unacked[SENT], unacked[FAILED], unacked[BLOCKED]
+            )
+
+    @staticmethod
+    async def _send(bot: Bot, user_id: int, text: str) -> str:
+        """Отправить сообщение одному пользователю с учётом лимитов."""
+        for _ in range(settings.broadcast_max_attempts):
+            await _chat_limiter.acquire(user_id)
+            await _bucket.acquire()
+            try:
+                await bot.send_message(chat_id=user_id, text=text)
+                return SENT
+            except TelegramRetryAfter as e:
+                # Флуд-контроль касается всего бота — притормаживаем всех
+                logger.warning(f"Broadcast flood control: retry after {e.retry_after}s")
+                _bucket.pause(e.retry_after)
+            except TelegramForbiddenError:
+                return BLOCKED
+            except TelegramBadRequest as e:
+                if any(marker in e.message.lower() for marker in _DEAD_CHAT_ERRORS):
+                    return BLOCKED
+                logger.warning(f"Broadcast to {user_id} failed: {e.message}")
+                return FAILED
+            except Exception as e:
+                logger.warning(f"Broadcast to {user_id} failed: {e}")
+                return FAILED
+        return FAILED
+
+    @staticmethod
+    async def _report(
+        bot: Bot,
+        job: Dict,
+        stats: Dict[str, int],
+        finished: bool,
+        failed: bool = False
+    ) -> None:
+        """
+        Обновить сообщение админа с прогрессом рассылки.
+
+        Итоговый отчёт (finished) приходит новым сообщением, если сообщения
+        прогресса нет или его не удалось изменить.
+        """
+        processed = stats[SENT] + stats[FAILED] + stats[BLOCKED]
+        if failed:
+            header = "⚠️ Рассылка прервана ошибкой — продолжится после перезапуска бота."
+        elif finished:
+            header = "✅ Рассылка завершена!"
+        else:
+            header = "⏳ Идёт рассылка..."
+        text = (
+            f"{header}\n\n"
+            f"Обработано: {processed} из {job['total']}\n"
+            f"Отправлено: {stats[SENT]}\n"
+            f"Ошибок: {stats[FAILED]}\n"
+            f"Заблокировали бота: {stats[BLOCKED]}"
+        )
+        if job.get("progress_message_id"):
+            try:
+                await bot.edit_message_text(
+                    text=text,
+                    chat_id=job["admin_chat_id"],
+                    message_id=job["progress_message_id"]
+                )
+                return
+            except Exception as e:
+                # Прогресс — косметика, рассылку из-за него не прерываем
+                logger.debug(f"Broadcast progress edit failed: {e}")
+        if not finished:
+            return
+        try:
+            await bot.send_message(chat_id=job["admin_chat_id"], text=text)
+        except Exception:
+            logger.exception(f"Broadcast {job['id']}: final report not delivered")
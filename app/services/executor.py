@@ -0,0 +1,107 @@
+"""
+Пул исполнителей для генерации контент-планов.
+
+Генерация — синхронный CPU-код, поэтому она выполняется в пуле потоков
+или процессов, а не в event loop. Очередь ограничена: при переполнении
+запрос сразу отклоняется, а пользователь в очереди узнаёт свою позицию.
+"""
+
+import asyncio
+import logging
+import os
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from functools import partial
+from typing import Any, Awaitable, Callable, Optional
+
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+class ExecutorBusyError(Exception):
+    """Очередь генерации заполнена."""
+
+
+class PlanExecutor:
+    """Пул потоков/процессов с ограниченной очередью."""
+
+    def __init__(self, kind: str, workers: int, max_queue: int):
+        """
+        Args:
+            kind: "thread" или "process"
+            workers: Количество исполнителей
+            max_queue: Сколько задач может ждать свободного исполнителя
+        """
+        if kind not in ("thread", "process"):
+            raise ValueError(f"Unknown executor kind: {kind}")
+        self.kind = kind
+        self.workers = workers
+        self.max_queue = max_queue
+        self._pool: Optional[Executor] = None
+        self._in_flight = 0
+
+    @property
+    def in_flight(self) -> int:
+        """Задачи в работе и в очереди."""
+        return self._in_flight
+
+    @property
+    def queued(self) -> int:
+        """Задачи, ожидающие свободного исполнителя."""
+        return max(0, self._in_flight - self.workers)
+
+    def _get_pool(self) -> Executor:
+        if self._pool is None:
+            if self.kind == "process":
+                self._pool = ProcessPoolExecutor(max_workers=self.workers)
+            else:
+                self._pool = ThreadPoolExecutor(
+                    max_workers=self.workers, thread_name_prefix="planner"
+                )
+            logger.info(f"Planner executor started: {self.kind} x{self.workers}")
+        return self._pool
+
+    async def run(
+        self,
+        fn: Callable[..., Any],
+        *args: Any,
+        on_accepted: Optional[Callable[[int], Awaitable[None]]] = None,
+        **kwargs: Any
+    ) -> Any:
+        """
+        Выполнить функцию в пуле.
+
+        Args:
+            fn: Синхронная функция (для пула процессов — импортируемая
+                на уровне модуля)
+            on_accepted: Корутина, получающая позицию в очереди
+                (0 — исполнитель свободен, задача стартует сразу)
+
+        Raises:
+            ExecutorBusyError: Очередь заполнена
+        """
+        if self._in_flight >= self.workers + self.max_queue:
+            raise ExecutorBusyError(f"Planner queue is full ({self.queued} waiting)")
+
+        position = max(0, self._in_flight - self.workers + 1)
+        self._in_flight += 1
+        try:
+            if on_accepted is not None:
+                await on_accepted(position)
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self._get_pool(), partial(fn, *args, **kwargs))
+        finally:
+            self._in_flight -= 1
+
+    def shutdown(self) -> None:
+        """Остановить пул (ожидающие задачи отменяются)."""
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
+
+
+plan_executor = PlanExecutor(
+    kind=settings.planner_executor,
+    workers=settings.planner_workers or min(4, os.cpu_count() or 1),
+    max_queue=settings.planner_max_queue,
+)
@@ -0,0 +1,206 @@
+"""
+Планировщик событий окончания подписки.
+
+Ближайшие сроки окончания подписок лежат в min-heap. Одна фоновая задача
+спит до ближайшего события и будит подписчиков: за
+``expiry_reminder_days`` дней до окончания (EXPIRING_SOON) и в момент
+окончания (EXPIRED).
+
+В памяти держатся только подписки, истекающие в скользящем окне
+``expiry_window_days``: окно подгружается диапазонным запросом по индексу
+subscription_end_date, а не периодическим сканированием таблицы.
+Продление подписки не удаляет старые записи из кучи — они считаются
+устаревшими и пропускаются при извлечении.
+
+Отправленные события запоминаются в users (expiry_reminded_for,
+expiry_notified_for): после перезапуска напоминание не повторяется, а
+подписки, истёкшие, пока бот не работал (не раньше чем окно назад),
+получают EXPIRED один раз сразу после запуска.
+"""
+
+import asyncio
+import heapq
+import logging
+import time
+from dataclasses import dataclass
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple
+
+from app.config import settings
+from app.database.repository import UserRepository
+
+logger = logging.getLogger(__name__)
+
+EXPIRING_SOON = "expiring_soon"
+EXPIRED = "expired"
+
+DAY = 24 * 60 * 60
+
+
+@dataclass(frozen=True)
+class ExpiryEvent:
+    """Событие жизненного цикла подписки."""
+
+    kind: str
+    user_id: int
+    expires_at: int
+
+
+Listener = Callable[[ExpiryEvent], Awaitable[None]]
+
+
+class ExpiryScheduler:
+    """Min-heap планировщик событий окончания подписок."""
+
+    def __init__(self, reminder_before: float, window: float):
+        """
+        Args:
+            reminder_before: За сколько секунд до окончания напоминать
+            window: Горизонт (в секундах), который держится в памяти
+        """
+        self.reminder_before = reminder_before
+        self.window = window
+        # (время срабатывания, telegram_id, окончание подписки)
+        self._heap: List[Tuple[float, int, int]] = []
+        # Актуальное окончание подписки для каждого пользователя в куче
+        self._expiry: Dict[int, int] = {}
+        self._listeners: List[Listener] = []
+        self._window_end = 0.0
+        self._wakeup = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    def subscribe(self, listener: Listener) -> None:
+        """Подписаться на события EXPIRING_SOON / EXPIRED."""
+        self._listeners.append(listener)
+
+    def schedule(self, user_id: int, expires_at: int) -> None:
+        """
+        Запланировать (или перепланировать) события для подписки.
+
+        Подписки за пределами текущего окна будут подгружены позже.
+        """
+        if not self.running or expires_at > self._window_end:
+            self._expiry.pop(user_id, None)
+            return
+        if self._expiry.get(user_id) == expires_at:
+            return
+        self._push(user_id, expires_at, time.time())
+        self._wakeup.set()
+
+    def __len__(self) -> int:
+        return len(self._expiry)
+
+    async def start(self) -> None:
+        """Загрузить ближайшие окончания подписок и запустить цикл."""
+        if self.running:
+            return
+        now = time.time()
+        self._heap = []
+        self._expiry = {}
+        # Окно начинается в прошлом: подписки, истёкшие за время простоя
+        self._window_end = now - self.window
+        await self._extend_window(now)
+        self._task = asyncio.create_task(self._run(), name="expiry-scheduler")
+        logger.info(f"Expiry scheduler started: {len(self._expiry)} subscriptions in window")
+
+    async def stop(self) -> None:
+        """Остановить цикл."""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def _push(
+        self,
+        user_id: int,
+        expires_at: int,
+        now: float,
+        reminded: bool = False,
+        notified: bool = False
+    ) -> None:
+        """
+        Положить ближайшее событие подписки в кучу.
+
+        Args:
+            reminded: Напоминание для этого окончания уже отправлено
+            notified: Об окончании уже сообщили — событий не будет
+        """
+        if notified:
+            self._expiry.pop(user_id, None)
+            return
+        self._expiry[user_id] = expires_at
+        if reminded or expires_at <= now:
+            fire_at = max(expires_at, now)
+        else:
+            # Если время напоминания уже прошло (подписка попала в окно
+            # напоминания, пока бот не работал), напоминаем сразу
+            fire_at = max(expires_at - self.reminder_before, now)
+        heapq.heappush(self._heap, (fire_at, user_id, expires_at))
+
+    async def _extend_window(self, now: float) -> None:
+        """Подгрузить подписки, истекающие до now + reminder_before + window."""
+        start = self._window_end
+        end = now + self.reminder_before + self.window
+        async for rows in UserRepository.iter_expiring(int(start), int(end)):
+            for user_id, expires_at, reminded_for, notified_for in rows:
+                # Уже в куче с актуальной датой (например, через schedule)
+                if self._expiry.get(user_id) != expires_at:
+                    self._push(
+                        user_id, expires_at, now,
+                        reminded=reminded_for == expires_at,
+                        notified=notified_for == expires_at,
+                    )
+        self._window_end = end
+
+    async def _run(self) -> None:
+        while True:
+            now = time.time()
+            # Окно нужно продлить заранее, чтобы успеть к напоминаниям
+            next_extend = self._window_end - self.reminder_before
+            if now >= next_extend:
+                await self._extend_window(now)
+                continue
+
+            deadline = min(next_extend, self._heap[0][0] if self._heap else next_extend)
+            if deadline > now:
+                self._wakeup.clear()
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=deadline - now)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+
+            fire_at, user_id, expires_at = heapq.heappop(self._heap)
+            if self._expiry.get(user_id) != expires_at:
+                continue  # подписку продлили — запись устарела
+
+            if fire_at < expires_at:
+                heapq.heappush(self._heap, (expires_at, user_id, expires_at))
+                await self._emit(ExpiryEvent(EXPIRING_SOON, user_id, expires_at))
+            else:
+                del self._expiry[user_id]
+                await self._emit(ExpiryEvent(EXPIRED, user_id, expires_at))
+            try:
+                # После перезапуска это событие не повторится
+                await UserRepository.mark_expiry_event(user_id, expires_at, expired=fire_at >= expires_at)
+            except Exception:
+                logger.exception(f"Failed to mark expiry event of user {user_id}")
+
+    async def _emit(self, event: ExpiryEvent) -> None:
+        for listener in self._listeners:
+            try:
+                await listener(event)
+            except Exception:
+                logger.exception(f"Expiry listener failed for {event}")
+
+
+expiry_scheduler = ExpiryScheduler(
+    reminder_before=settings.expiry_reminder_days * DAY,
+    window=settings.expiry_window_days * DAY,
+)
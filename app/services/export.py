@@ -0,0 +1,292 @@
+"""
+Выгрузка истории планов (/export): CSV, Markdown и iCalendar.
+
+Планы читаются из БД постранично (ContentPlanRepository.iter_by_user) и
+сразу пишутся в SpooledTemporaryFile: небольшая выгрузка остаётся в
+памяти, большая уходит на диск — память не растёт с размером истории.
+Между страницами управление возвращается циклу событий, а одновременных
+выгрузок не больше export_max_concurrency, поэтому большие выгрузки не
+задерживают обработку сообщений других пользователей.
+"""
+
+import asyncio
+import csv
+import io
+import tempfile
+from datetime import date, datetime, timedelta, timezone
+from typing import IO, Any, AsyncGenerator, Dict, List, Mapping, Optional, Tuple
+
+from aiogram import Bot
+from aiogram.types.input_file import DEFAULT_CHUNK_SIZE, InputFile
+
+from app.config import settings
+from app.database.repository import ContentPlanRepository
+from app.services.planner import (
+    PLATFORMS,
+    WEEKDAYS_RU,
+    iter_plan_entries,
+    plan_to_text,
+    stored_plan,
+)
+
+EXPORT_FORMATS = ("csv", "md", "ics")
+
+# Лимит Telegram на документ от бота
+TELEGRAM_FILE_LIMIT = 50 * 1024 * 1024
+
+_export_slots = asyncio.Semaphore(settings.export_max_concurrency)
+
+
+class ExportTooLargeError(Exception):
+    """Выгрузка больше лимита Telegram на документ."""
+
+
+class SpooledInputFile(InputFile):
+    """Документ для отправки из временного файла — по частям, без чтения целиком."""
+
+    def __init__(self, file: IO[bytes], filename: str, chunk_size: int = DEFAULT_CHUNK_SIZE):
+        super().__init__(filename=filename, chunk_size=chunk_size)
+        self.file = file
+
+    async def read(self, bot: Bot) -> AsyncGenerator[bytes, None]:
+        self.file.seek(0)
+        while chunk := self.file.read(self.chunk_size):
+            yield chunk
+
+
+def _plan_days(row: Mapping[str, Any]) -> Optional[List[Tuple[date, str]]]:
+    """Дни компактного плана; None — план хранится текстом (например, от LLM)."""
+    plan = stored_plan(row)
+    return list(iter_plan_entries(plan)) if plan is not None else None
+
+
+def _platform_title(row: Mapping[str, Any]) -> str:
+    platform = row.get("platform")
+    return PLATFORMS[platform].title if platform in PLATFORMS else ""
+
+
+def _created(row: Mapping[str, Any]) -> datetime:
+    return datetime.fromtimestamp(row["created_at"])
+
+
+class CsvExport:
+    """CSV: строка на день плана (Excel открывает UTF-8 с BOM)."""
+
+    extension = "csv"
+    encoding = "utf-8-sig"
+
+    def __init__(self, out: IO[str]):
+        self.writer = csv.writer(out)
+
+    def begin(self) -> None:
+        self.writer.writerow(
+            ["plan_id", "created_at", "niche", "target_audience", "platform", "day", "date", "post"]
+        )
+
+    def write_plan(self, row: Mapping[str, Any]) -> None:
+        prefix = [
+            row["id"],
+            _created(row).isoformat(sep=" "),
+            row["niche"],
+            row["target_audience"] or "",
+            _platform_title(row),
+        ]
+        days = _plan_days(row)
+        if days is None:
+            self.writer.writerow(prefix + ["", "", plan_to_text(row["plan_content"])])
+            return
+        for number, (day_date, post) in enumerate(days, start=1):
+            self.writer.writerow(prefix + [number, day_date.isoformat(), post])
+
+    def end(self) -> None:
+        pass
+
+
+class MarkdownExport:
+    """Markdown: раздел на план, пункт на день."""
+
+    extension = "md"
+    encoding = "utf-8"
+
+    def __init__(self, out: IO[str]):
+        self.out = out
+
+    def begin(self) -> None:
+        self.out.write("# Контент-планы\n")
+
+    def write_plan(self, row: Mapping[str, Any]) -> None:
+        details = [f"ЦА: {row['target_audience']}"] if row["target_audience"] else []
+        if _platform_title(row):
+            details.append(f"Площадка: {_platform_title(row)}")
+        lines = ["", f"## {row['niche']} — {_created(row):%d.%m.%Y}", ""]
+        if details:
+            lines += [" · ".join(details), ""]
+
+        days = _plan_days(row)
+        if days is None:
+            lines.append(plan_to_text(row["plan_content"]).strip())
+        else:
+            for number, (day_date, post) in enumerate(days, start=1):
+                lines.append(
+                    f"{number}. **{WEEKDAYS_RU[day_date.weekday()]}, {day_date:%d.%m.%Y}** — {post}"
+                )
+        self.out.write("\n".join(lines) + "\n")
+
+    def end(self) -> None:
+        pass
+
+
+def ics_escape(text: str) -> str:
+    """Экранирование TEXT-значений по RFC 5545."""
+    return (
+        text.replace("\\", "\\\\")
+        .replace(";", "\\;")
+        .replace(",", "\\,")
+        .replace("\r\n", "\\n")
+        .replace("\n", "\\n")
+    )
+
+
+def ics_fold(line: str) -> str:
+    """Перенос строки длиннее 75 байт (RFC 5545, 3.1) без разрыва символов UTF-8."""
+    if len(line.encode("utf-8")) <= 75:
+        return line + "\r\n"
+    parts = []
+    current = ""
+    size = 0
+    limit = 75
+    for char in line:
+        char_size = len(char.encode("utf-8"))
+        if size + char_size > limit:
+            parts.append(current)
+            # Строки продолжения начинаются с пробела, он входит в 75 байт
+            current, size, limit = "", 0, 74
+        current += char
+        size += char_size
+    parts.append(current)
+    return "\r\n ".join(parts) + "\r\n"
+
+
+class IcsExport:
+    """iCalendar: событие на весь день для каждого дня плана."""
+
+    extension = "ics"
+    encoding = "utf-8"
+
+    def __init__(self, out: IO[str]):
+        self.out = out
+
+    def _write(self, *lines: str) -> None:
+        self.out.write("".join(ics_fold(line) for line in lines))
+
+    def begin(self) -> None:
+        self._write(
+            "BEGIN:VCALENDAR",
+            "VERSION:2.0",
+            "PRODID:-//AI Content Planner Bot//RU",
+            "CALSCALE:GREGORIAN",
+            "X-WR-CALNAME:Контент-план",
+        )
+
+    def _event(self, uid: str, stamp: str, day: date, summary: str, description: str) -> None:
+        self._write(
+            "BEGIN:VEVENT",
+            f"UID:{uid}",
+            f"DTSTAMP:{stamp}",
+            f"DTSTART;VALUE=DATE:{day:%Y%m%d}",
+            f"DTEND;VALUE=DATE:{day + timedelta(days=1):%Y%m%d}",
+            f"SUMMARY:{ics_escape(summary)}",
+            f"DESCRIPTION:{ics_escape(description)}",
+            "END:VEVENT",
+        )
+
+    def write_plan(self, row: Mapping[str, Any]) -> None:
+        stamp = datetime.fromtimestamp(row["created_at"], tz=timezone.utc).strftime("%Y%m%dT%H%M%SZ")
+        details = [f"Ниша: {row['niche']}"]
+        if row["target_audience"]:
+            details.append(f"ЦА: {row['target_audience']}")
+        if _platform_title(row):
+            details.append(f"Площадка: {_platform_title(row)}")
+
+        days = _plan_days(row)
+        if days is None:
+            # Текстовый план без дат по дням — одно событие в день создания
+            self._event(
+                f"plan-{row['id']}@content-planner-bot",
+                stamp,
+                _created(row).date(),
+                f"Контент-план: {row['niche']}",
+                "\n".join(details) + "\n\n" + plan_to_text(row["plan_content"]).strip(),
+            )
+            return
+        for number, (day_date, post) in enumerate(days, start=1):
+            self._event(
+                f"plan-{row['id']}-day-{number}@content-planner-bot",
+                stamp,
+                day_date,
+                post,
+                "\n".join(details + [f"День {number} из {len(days)}"]),
+            )
+
+    def end(self) -> None:
+        self._write("END:VCALENDAR")
+
+
+_WRITERS: Dict[str, Any] = {
+    "csv": CsvExport,
+    "md": MarkdownExport,
+    "ics": IcsExport,
+}
+
+
+async def export_history(user_id: int, fmt: str) -> Tuple[IO[bytes], int]:
+    """
+    Выгрузить всю историю планов пользователя во временный файл.
+
+    Args:
+        user_id: Telegram ID пользователя
+        fmt: Формат из EXPORT_FORMATS
+
+    Returns:
+        (файл, готовый к чтению с начала; количество планов).
+        Файл закрывает вызывающий код.
+
+    Raises:
+        ValueError: Неизвестный формат
+        ExportTooLargeError: Выгрузка больше лимита Telegram
+    """
+    if fmt not in _WRITERS:
+        raise ValueError(f"Unknown export format: {fmt}")
+    writer_class = _WRITERS[fmt]
+
+    async with _export_slots:
+        spool = tempfile.SpooledTemporaryFile(max_size=settings.export_spool_size)
+        out = io.TextIOWrapper(spool, encoding=writer_class.encoding, newline="")
+        try:
+            writer = writer_class(out)
+            writer.begin()
+            count = 0
+            async for rows in ContentPlanRepository.iter_by_user(user_id):
+                for row in rows:
+                    writer.write_plan(row)
+                count += len(rows)
+                # Форматирование страницы — работа на CPU: даём обработать другие апдейты
+                await asyncio.sleep(0)
+            writer.end()
+            out.flush()
+        except BaseException:
+            out.close()
+            raise
+        out.detach()
+
+    size = spool.tell()
+    if size > TELEGRAM_FILE_LIMIT:
+        spool.close()
+        raise ExportTooLargeError(f"Export is {size} bytes")
+    spool.seek(0)
+    return spool, count
+
+
+def export_filename(fmt: str) -> str:
+    """Имя файла выгрузки: plans_20241018_1530.csv."""
+    return f"plans_{datetime.now():%Y%m%d_%H%M}.{_WRITERS[fmt].extension}"
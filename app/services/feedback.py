@@ -0,0 +1,140 @@
+"""
+Оценки планов («👍 Полезно» / «👎 Не полезно»).
+
+Нажатия копятся в памяти и раз в ``feedback_flush_interval`` секунд (или
+по ``feedback_batch_size`` штук) записываются одной транзакцией — без
+коммита на каждое нажатие. Повторное нажатие того же пользователя по
+тому же плану до записи просто заменяет оценку в буфере.
+
+Оценка плана из шаблонов засчитывается каждому шаблону CONTENT_TEMPLATES,
+из которого он собран; template_scores() отдаёт сглаженную долю
+положительных оценок по шаблонам — её может учитывать генерация.
+"""
+
+import asyncio
+import logging
+from dataclasses import dataclass
+from typing import Dict, Optional, Tuple
+
+from app.config import settings
+from app.database.repository import ContentPlanRepository, FeedbackRepository
+from app.services.planner import plan_template_ids, stored_plan
+
+logger = logging.getLogger(__name__)
+
+USEFUL = "useful"
+NOT_USEFUL = "not_useful"
+VERDICTS = (USEFUL, NOT_USEFUL)
+
+
+@dataclass(frozen=True, slots=True)
+class FeedbackEvent:
+    """Оценка плана пользователем."""
+
+    user_id: int
+    seed: int
+    useful: bool
+    # Шаблоны плана: (тип контента, индекс в CONTENT_TEMPLATES)
+    templates: Tuple[Tuple[str, int], ...] = ()
+
+
+class FeedbackBuffer:
+    """Буфер оценок с пакетной записью в plan_feedback."""
+
+    def __init__(self, batch_size: int, flush_interval: float):
+        """
+        Args:
+            batch_size: Записать сразу, когда накопится столько оценок
+            flush_interval: Пауза между записями, сек
+        """
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._pending: Dict[Tuple[int, int], FeedbackEvent] = {}
+        self._task: Optional[asyncio.Task] = None
+
+    def __len__(self) -> int:
+        return len(self._pending)
+
+    async def add(self, event: FeedbackEvent) -> None:
+        """Добавить оценку (последняя оценка плана в буфере побеждает)."""
+        self._pending[(event.user_id, event.seed)] = event
+        if len(self._pending) >= self.batch_size:
+            await self.flush()
+
+    async def flush(self) -> None:
+        """Записать накопленные оценки."""
+        if not self._pending:
+            return
+        batch, self._pending = self._pending, {}
+        try:
+            await FeedbackRepository.save_batch(list(batch.values()))
+        except Exception:
+            # Вернём пачку: новые оценки тех же планов важнее старых
+            self._pending = {**batch, **self._pending}
+            raise
+
+    def start(self) -> None:
+        """Запустить периодическую запись."""
+        if self._task is not None and not self._task.done():
+            return
+        self._task = asyncio.create_task(self._run(), name="feedback-flusher")
+
+    async def stop(self) -> None:
+        """Остановить запись и сохранить накопленное."""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await self.flush()
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            try:
+                await self.flush()
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.exception("Feedback flush failed")
+
+
+feedback_buffer = FeedbackBuffer(
+    batch_size=settings.feedback_batch_size,
+    flush_interval=settings.feedback_flush_interval,
+)
+
+
+class FeedbackService:
+    """Оценки планов и их сумма по шаблонам."""
+
+    @staticmethod
+    async def record(user_id: int, seed: int, useful: bool) -> None:
+        """
+        Учесть оценку плана с этим seed.
+
+        Шаблоны берутся из компактных записей истории; у плана от LLM
+        (или ещё не записанного в историю) их нет — сохраняется только
+        сама оценка.
+        """
+        templates = []
+        for row in await ContentPlanRepository.get_by_seed(user_id, seed):
+            plan = stored_plan(row)
+            if plan is not None:
+                templates += plan_template_ids(plan)
+        await feedback_buffer.add(FeedbackEvent(user_id, seed, useful, tuple(templates)))
+
+    @staticmethod
+    async def template_scores() -> Dict[Tuple[str, int], float]:
+        """
+        Доля полезных оценок по шаблонам со сглаживанием Лапласа.
+
+        Шаблон без оценок — 0.5; (тип контента, индекс) -> (👍 + 1) / (все + 2).
+        """
+        return {
+            (row["content_type"], row["template_index"]):
+                (row["useful"] + 1) / (row["useful"] + row["not_useful"] + 2)
+            for row in await FeedbackRepository.template_stats()
+        }
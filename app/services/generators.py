@@ -0,0 +1,418 @@
+"""
+Бэкенды генерации контент-планов.
+
+- TemplateGenerator — шаблонный генератор из planner.py (в пуле исполнителей)
+- LLMGenerator — HTTP-клиент GigaChat-совместимого API (/chat/completions)
+  с общим keep-alive пулом соединений, семафором и таймаутами
+- FallbackGenerator — основной бэкенд с бюджетом времени и запасным
+
+Одинаковые одновременные запросы (ниша, ЦА) к LLM объединяются в один
+вызов (single-flight).
+
+Кроме generate() каждый бэкенд умеет stream() — асинхронный генератор
+фрагментов плана, чтобы пользователь видел первые дни, пока готовятся
+остальные.
+"""
+
+import asyncio
+import html
+import json
+import logging
+import re
+from abc import ABC, abstractmethod
+from datetime import date
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, Hashable, Optional
+
+import aiohttp
+
+from app.config import settings
+from app.services.executor import plan_executor
+from app.services.planner import (
+    cached_plan_chunks,
+    generate_content_plan,
+    generate_content_plan_chunks,
+    parse_user_input,
+    split_plans,
+)
+
+logger = logging.getLogger(__name__)
+
+_WHITESPACE_RE = re.compile(r"\s+")
+
+
+class GenerationError(Exception):
+    """Бэкенд не смог сгенерировать план."""
+
+
+class PlanGenerator(ABC):
+    """Интерфейс бэкенда генерации."""
+
+    name: str = "base"
+
+    @abstractmethod
+    async def generate(self, user_input: str, seed: Optional[int] = None) -> str:
+        """
+        Сгенерировать контент-план (HTML для Telegram) по запросу пользователя.
+
+        Args:
+            user_input: Текст запроса
+            seed: Seed генерации; бэкенды, которые не умеют воспроизводить
+                результат, его игнорируют
+        """
+
+    async def stream(
+        self,
+        user_input: str,
+        seed: Optional[int] = None,
+        start_date: Optional[date] = None
+    ) -> AsyncIterator[str]:
+        """
+        Сгенерировать план по частям.
+
+        По умолчанию — весь план одним фрагментом.
+
+        Args:
+            start_date: Первый день плана (по умолчанию — завтра); бэкенды
+                без дат в плане его игнорируют
+        """
+        yield await self.generate(user_input, seed)
+
+    async def close(self) -> None:
+        """Освободить ресурсы бэкенда."""
+
+
+class TemplateGenerator(PlanGenerator):
+    """Шаблонный генератор из planner.py."""
+
+    name = "templates"
+
+    async def generate(self, user_input: str, seed: Optional[int] = None) -> str:
+        chunks = cached_plan_chunks(user_input, seed) if seed is not None else None
+        if chunks is not None:
+            return "\n\n".join(split_plans(chunks))
+        return await plan_executor.run(generate_content_plan, user_input, seed)
+
+    async def stream(
+        self,
+        user_input: str,
+        seed: Optional[int] = None,
+        start_date: Optional[date] = None
+    ) -> AsyncIterator[str]:
+        # Заранее прогретый план (см. prewarm.py) отдаётся без пула исполнителей
+        chunks = cached_plan_chunks(user_input, seed, start_date) if seed is not None else None
+        if chunks is None:
+            chunks = await plan_executor.run(generate_content_plan_chunks, user_input, seed, None, start_date)
+        for chunk in chunks:
+            yield chunk
+
+
+class SingleFlight:
+    """Объединение одновременных вызовов с одинаковым ключом."""
+
+    def __init__(self) -> None:
+        self._calls: Dict[Hashable, asyncio.Future] = {}
+
+    def __len__(self) -> int:
+        return len(self._calls)
+
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable[Any]]) -> Any:
+        """
+        Выполнить fn() или дождаться уже идущего вызова с тем же ключом.
+
+        Отмена одного ожидающего не прерывает общий вызов.
+        """
+        future = self._calls.get(key)
+        if future is None:
+            future = asyncio.ensure_future(fn())
+            self._register(key, future)
+        return await asyncio.shield(future)
+
+    def join(self, key: Hashable) -> Optional[asyncio.Future]:
+        """Идущий вызов с этим ключом, если он есть."""
+        return self._calls.get(key)
+
+    def lead(self, key: Hashable) -> asyncio.Future:
+        """
+        Объявить вызов, результат которого вызывающий выставит сам.
+
+        Нужно, когда ведущий потребляет результат по частям (stream), а
+        остальные ждут его целиком.
+        """
+        future = asyncio.get_running_loop().create_future()
+        self._register(key, future)
+        return future
+
+    def _register(self, key: Hashable, future: asyncio.Future) -> None:
+        self._calls[key] = future
+        future.add_done_callback(lambda f: self._forget(key, f))
+
+    def _forget(self, key: Hashable, future: asyncio.Future) -> None:
+        self._calls.pop(key, None)
+        # Ошибку могли не забрать, если все ожидающие уже отменены
+        if not future.cancelled():
+            future.exception()
+
+
+class LLMGenerator(PlanGenerator):
+    """GigaChat-совместимый бэкенд (OpenAI-подобный /chat/completions)."""
+
+    name = "llm"
+
+    SYSTEM_PROMPT = (
+        "Ты — SMM-стратег. Составь контент-план на 7 дней для Telegram-канала. "
+        "Для каждого дня: строка «День N», затем одна-две строки с идеей поста. "
+        "Пиши по-русски, без вступлений и заключений."
+    )
+
+    def __init__(
+        self,
+        base_url: str,
+        token: str,
+        model: str,
+        timeout: float,
+        max_concurrency: int,
+        verify_ssl: bool = True
+    ):
+        self.base_url = base_url.rstrip("/")
+        self.token = token
+        self.model = model
+        self.timeout = aiohttp.ClientTimeout(total=timeout)
+        self.max_concurrency = max_concurrency
+        self.verify_ssl = verify_ssl
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self._session: Optional[aiohttp.ClientSession] = None
+        self._flights = SingleFlight()
+
+    def _get_session(self) -> aiohttp.ClientSession:
+        if self._session is None or self._session.closed:
+            # Один keep-alive пул на весь процесс
+            connector = aiohttp.TCPConnector(
+                limit=self.max_concurrency,
+                keepalive_timeout=60,
+                ssl=None if self.verify_ssl else False,
+            )
+            headers = {"Accept": "application/json"}
+            if self.token:
+                headers["Authorization"] = f"Bearer {self.token}"
+            self._session = aiohttp.ClientSession(connector=connector, headers=headers)
+        return self._session
+
+    @staticmethod
+    def _flight_key(niche: str, target_audience: str) -> tuple:
+        return (
+            _WHITESPACE_RE.sub(" ", niche.casefold()).strip(),
+            _WHITESPACE_RE.sub(" ", target_audience.casefold()).strip(),
+        )
+
+    async def generate(self, user_input: str, seed: Optional[int] = None) -> str:
+        niche, target_audience = parse_user_input(user_input)
+        content = await self._flights.do(
+            self._flight_key(niche, target_audience),
+            lambda: self._complete(niche, target_audience)
+        )
+        return self._format(niche, target_audience, content)
+
+    async def stream(
+        self,
+        user_input: str,
+        seed: Optional[int] = None,
+        start_date: Optional[date] = None
+    ) -> AsyncIterator[str]:
+        """
+        Потоковая генерация (SSE).
+
+        Шапка отдаётся вместе с первым фрагментом ответа, поэтому время до
+        первого фрагмента — это задержка самого API. Если такой же запрос
+        уже выполняется, ждём его результат целиком.
+        """
+        niche, target_audience = parse_user_input(user_input)
+        key = self._flight_key(niche, target_audience)
+
+        running = self._flights.join(key)
+        if running is not None:
+            yield self._format(niche, target_audience, await asyncio.shield(running))
+            return
+
+        flight = self._flights.lead(key)
+        parts = []
+        try:
+            header_sent = False
+            async for delta in self._complete_stream(niche, target_audience):
+                if not header_sent:
+                    # Ведущие пробелы ответа отбрасываем, как и strip() в generate()
+                    delta = delta.lstrip()
+                    if not delta:
+                        continue
+                parts.append(delta)
+                chunk = html.escape(delta)
+                if not header_sent:
+                    chunk = self._header(niche, target_audience) + chunk
+                    header_sent = True
+                yield chunk
+            if not header_sent:
+                raise GenerationError("Empty LLM response")
+            yield self._FOOTER
+        except BaseException as e:
+            if not flight.done():
+                # Ожидающие получают ошибку и сами уходят на запасной бэкенд
+                flight.set_exception(
+                    e if isinstance(e, Exception) else GenerationError("LLM stream aborted")
+                )
+            raise
+        flight.set_result("".join(parts).strip())
+
+    def _payload(self, niche: str, target_audience: str) -> Dict[str, Any]:
+        return {
+            "model": self.model,
+            "messages": [
+                {"role": "system", "content": self.SYSTEM_PROMPT},
+                {"role": "user", "content": f"Ниша: {niche}. Целевая аудитория: {target_audience}."},
+            ],
+        }
+
+    async def _complete(self, niche: str, target_audience: str) -> str:
+        async with self._semaphore:
+            try:
+                async with self._get_session().post(
+                    f"{self.base_url}/chat/completions",
+                    json=self._payload(niche, target_audience),
+                    timeout=self.timeout,
+                ) as response:
+                    if response.status != 200:
+                        raise GenerationError(f"LLM HTTP {response.status}")
+                    data = await response.json()
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                raise GenerationError(f"LLM request failed: {e!r}") from e
+
+        try:
+            return data["choices"][0]["message"]["content"].strip()
+        except (KeyError, IndexError, TypeError, AttributeError) as e:
+            raise GenerationError("Unexpected LLM response format") from e
+
+    async def _complete_stream(self, niche: str, target_audience: str) -> AsyncIterator[str]:
+        """Фрагменты ответа из server-sent events (stream=true)."""
+        payload = self._payload(niche, target_audience)
+        payload["stream"] = True
+        async with self._semaphore:
+            try:
+                async with self._get_session().post(
+                    f"{self.base_url}/chat/completions",
+                    json=payload,
+                    timeout=self.timeout,
+                ) as response:
+                    if response.status != 200:
+                        raise GenerationError(f"LLM HTTP {response.status}")
+                    async for raw in response.content:
+                        line = raw.decode("utf-8").strip()
+                        if not line.startswith("data:"):
+                            continue
+                        data = line[len("data:"):].strip()
+                        if data == "[DONE]":
+                            return
+                        try:
+                            delta = json.loads(data)["choices"][0]["delta"].get("content")
+                        except (ValueError, KeyError, IndexError, TypeError, AttributeError) as e:
+                            raise GenerationError("Unexpected LLM stream format") from e
+                        if delta:
+                            yield delta
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                raise GenerationError(f"LLM request failed: {e!r}") from e
+
+    _FOOTER = "\n\n" + "─" * 25
+
+    @staticmethod
+    def _header(niche: str, target_audience: str) -> str:
+        return "\n".join([
+            "📋 <b>Контент-план на 7 дней</b>",
+            f"🎯 Ниша: <b>{html.escape(niche)}</b>",
+            f"👥 ЦА: <b>{html.escape(target_audience)}</b>",
+            "",
+            "─" * 25,
+            "",
+            "",
+        ])
+
+    @classmethod
+    def _format(cls, niche: str, target_audience: str, content: str) -> str:
+        return cls._header(niche, target_audience) + html.escape(content) + cls._FOOTER
+
+    async def close(self) -> None:
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+
+
+class FallbackGenerator(PlanGenerator):
+    """Основной бэкенд с бюджетом времени; при превышении или ошибке — запасной."""
+
+    name = "fallback"
+
+    def __init__(self, primary: PlanGenerator, fallback: PlanGenerator, budget: float):
+        self.primary = primary
+        self.fallback = fallback
+        self.budget = budget
+
+    async def generate(self, user_input: str, seed: Optional[int] = None) -> str:
+        try:
+            return await asyncio.wait_for(self.primary.generate(user_input, seed), self.budget)
+        except asyncio.TimeoutError:
+            logger.warning(f"{self.primary.name} exceeded {self.budget}s budget, using {self.fallback.name}")
+        except GenerationError as e:
+            logger.warning(f"{self.primary.name} failed ({e}), using {self.fallback.name}")
+        return await self.fallback.generate(user_input, seed)
+
+    async def stream(
+        self,
+        user_input: str,
+        seed: Optional[int] = None,
+        start_date: Optional[date] = None
+    ) -> AsyncIterator[str]:
+        """
+        Бюджет времени — до первого фрагмента основного бэкенда.
+
+        После начала вывода ошибка основного бэкенда пробрасывается:
+        смешивать его частичный ответ с запасным планом нельзя.
+        """
+        chunks = self.primary.stream(user_input, seed, start_date)
+        try:
+            first = await asyncio.wait_for(chunks.__anext__(), self.budget)
+        except StopAsyncIteration:
+            return
+        except (asyncio.TimeoutError, GenerationError) as e:
+            reason = f"exceeded {self.budget}s budget" if isinstance(e, asyncio.TimeoutError) else f"failed ({e})"
+            logger.warning(f"{self.primary.name} {reason}, using {self.fallback.name}")
+            await chunks.aclose()
+            async for chunk in self.fallback.stream(user_input, seed, start_date):
+                yield chunk
+            return
+
+        try:
+            yield first
+            async for chunk in chunks:
+                yield chunk
+        finally:
+            await chunks.aclose()
+
+    async def close(self) -> None:
+        await self.primary.close()
+        await self.fallback.close()
+
+
+def create_generator() -> PlanGenerator:
+    """Собрать бэкенд по настройкам: LLM с фолбэком на шаблоны или только шаблоны."""
+    templates = TemplateGenerator()
+    if not settings.llm_api_url:
+        return templates
+
+    llm = LLMGenerator(
+        base_url=settings.llm_api_url,
+        token=settings.llm_api_token,
+        model=settings.llm_model,
+        timeout=settings.llm_timeout,
+        max_concurrency=settings.llm_max_concurrency,
+        verify_ssl=settings.llm_verify_ssl,
+    )
+    return FallbackGenerator(llm, templates, budget=settings.llm_latency_budget)
+
+
+plan_generator = create_generator()
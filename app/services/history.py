@@ -0,0 +1,149 @@
+"""
+История сгенерированных планов.
+
+Планы сохраняются после доставки пользователю — в фоне, через буфер
+записи, не задерживая воркер очереди. Шаблонные планы хранятся
+компактно (см. planner.plan_records, сверка идёт в пуле исполнителей),
+ответы LLM — текстом.
+
+/history листает планы страницами по keyset-курсору (created_at, id):
+читаются только колонки превью, а стоимость страницы не зависит от
+того, сколько планов у пользователя.
+"""
+
+import html
+import logging
+from dataclasses import dataclass
+from datetime import date, datetime
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from app.config import settings
+from app.database.repository import ContentPlanRepository
+from app.services.executor import ExecutorBusyError, plan_executor
+from app.services.planner import PLATFORMS, encode_templates, parse_request, plan_records
+
+logger = logging.getLogger(__name__)
+
+# Позиция в истории: (created_at, id) плана
+Cursor = Tuple[int, int]
+
+
+@dataclass(slots=True)
+class HistoryPage:
+    """Страница истории: планы от новых к старым."""
+
+    plans: List[Dict[str, Any]]
+    has_older: bool
+    has_newer: bool
+
+    @property
+    def older(self) -> Optional[Cursor]:
+        """Курсор следующей (более старой) страницы."""
+        if not self.has_older or not self.plans:
+            return None
+        return self.plans[-1]["created_at"], self.plans[-1]["id"]
+
+    @property
+    def newer(self) -> Optional[Cursor]:
+        """Курсор предыдущей (более новой) страницы."""
+        if not self.has_newer or not self.plans:
+            return None
+        return self.plans[0]["created_at"], self.plans[0]["id"]
+
+
+class HistoryService:
+    """Сохранение и просмотр истории планов."""
+
+    @staticmethod
+    async def save(
+        user_id: int,
+        request_text: str,
+        seed: int,
+        texts: Sequence[str],
+        start_date: Optional[date] = None
+    ) -> None:
+        """
+        Сохранить доставленные планы (не дожидаясь записи в БД).
+
+        Args:
+            user_id: Telegram ID пользователя
+            request_text: Текст запроса
+            seed: Seed задания генерации
+            texts: Планы, по одному на сообщение
+            start_date: Дата начала, с которой планы генерировались
+                (по умолчанию — завтра)
+        """
+        try:
+            records = await plan_executor.run(plan_records, request_text, seed, texts, start_date)
+        except ExecutorBusyError:
+            # Пул занят генерацией — сохраняем без сверки, план не теряется
+            logger.warning(f"Planner executor busy, saving plans of user {user_id} as text")
+            records = [(None, "\n\n".join(texts))]
+        for plan, text in records:
+            if plan is not None:
+                await ContentPlanRepository.create_compact(
+                    user_id,
+                    plan.niche,
+                    plan.target_audience,
+                    plan.start_date.isoformat(),
+                    plan.seed,
+                    encode_templates(plan.templates),
+                    plan.platform,
+                    plan_text=text,
+                    wait=False
+                )
+            else:
+                request = parse_request(request_text)
+                await ContentPlanRepository.create(
+                    user_id, request.niche, request.target_audience, text, wait=False
+                )
+
+    @staticmethod
+    async def page(
+        user_id: int,
+        before: Optional[Cursor] = None,
+        after: Optional[Cursor] = None
+    ) -> HistoryPage:
+        """
+        Страница истории.
+
+        Args:
+            user_id: Telegram ID пользователя
+            before: Курсор — показать планы старше него
+            after: Курсор — показать планы новее него
+
+        Returns:
+            HistoryPage (без курсоров — самые новые планы)
+        """
+        size = settings.history_page_size
+        # Лишняя строка показывает, есть ли что-то дальше
+        plans = await ContentPlanRepository.get_page(user_id, size + 1, before=before, after=after)
+
+        if after is not None:
+            if len(plans) <= size:
+                # Дошли до начала истории — это первая страница
+                return await HistoryService.page(user_id)
+            return HistoryPage(plans[1:], has_older=True, has_newer=True)
+
+        return HistoryPage(plans[:size], has_older=len(plans) > size, has_newer=before is not None)
+
+
+def format_history(page: HistoryPage) -> str:
+    """Текст страницы истории: по строке на план."""
+    if not page.plans:
+        return (
+            "📭 У вас пока нет сохранённых планов.\n\n"
+            "Напишите нишу и ЦА — и первый план появится здесь."
+        )
+
+    lines = ["📚 <b>Ваши контент-планы</b>", ""]
+    for number, plan in enumerate(page.plans, start=1):
+        created = datetime.fromtimestamp(plan["created_at"]).strftime("%d.%m.%Y")
+        line = f"{number}. {created} • <b>{html.escape(plan['niche'])}</b>"
+        if plan["target_audience"]:
+            line += f" — {html.escape(plan['target_audience'])}"
+        if plan["platform"] in PLATFORMS:
+            line += f" ({PLATFORMS[plan['platform']].title})"
+        lines.append(line)
+    lines += ["", "Нажмите номер, чтобы открыть план."]
+    return "\n".join(lines)
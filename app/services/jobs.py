@@ -0,0 +1,219 @@
+"""
+Персистентная очередь генерации контент-планов.
+
+Запросы пользователей сохраняются в таблицу generation_jobs и разбираются
+пулом асинхронных воркеров. Платные подписчики обслуживаются раньше
+служебного (админского) трафика, задания переживают перезапуск, а
+повторная отправка того же запроса, пока он в работе, отбрасывается.
+
+План выводится по мере генерации — правками сообщения задания
+(см. streaming.py); планы нескольких площадок — отдельными сообщениями.
+Доставленные планы сохраняются в историю (см. history.py), а их ниши
+учитываются в статистике популярности (см. trends.py).
+"""
+
+import asyncio
+import hashlib
+import logging
+import re
+import time
+from typing import Any, Dict, List, Optional
+
+from aiogram import Bot
+
+from app.config import settings
+from app.database.repository import GenerationJobRepository
+from app.keyboards.main import get_feedback_keyboard
+from app.services.generators import plan_generator
+from app.services.history import HistoryService
+from app.services.planner import PLAN_BREAK, default_start_date, new_seed
+from app.services.prewarm import plan_prewarmer
+from app.services.streaming import MessageStream
+from app.services.trends import niche_trends
+
+logger = logging.getLogger(__name__)
+
+# Меньше — важнее
+PRIORITY_PAID = 0
+PRIORITY_LOW = 10
+
+# Пауза воркера после ошибки (например, «database is locked»), сек
+WORKER_ERROR_PAUSE = 1.0
+
+_WHITESPACE_RE = re.compile(r"\s+")
+
+
+class QueueFullError(Exception):
+    """В очереди слишком много ожидающих заданий."""
+
+
+def make_dedup_key(text: str) -> str:
+    """Ключ дедупликации: запрос без учёта регистра и пробелов."""
+    normalized = _WHITESPACE_RE.sub(" ", text.casefold()).strip()
+    return hashlib.sha1(normalized.encode("utf-8")).hexdigest()
+
+
+class GenerationQueue:
+    """Очередь заданий генерации и её воркеры."""
+
+    def __init__(self, workers: int, max_pending: int):
+        self.workers = workers
+        self.max_pending = max_pending
+        self._bot: Optional[Bot] = None
+        self._tasks: List[asyncio.Task] = []
+        self._busy = 0
+        self._wakeup = asyncio.Event()
+
+    async def submit(
+        self,
+        user_id: int,
+        chat_id: int,
+        text: str,
+        priority: int,
+        message_id: Optional[int] = None
+    ) -> Optional[int]:
+        """
+        Поставить запрос в очередь.
+
+        Args:
+            message_id: Сообщение-статус, которое заменится планом
+
+        Returns:
+            ID задания или None, если такой же запрос уже в очереди
+
+        Raises:
+            QueueFullError: Превышен лимит ожидающих заданий
+        """
+        if await GenerationJobRepository.count_pending() >= self.max_pending:
+            raise QueueFullError()
+
+        # Для прогретой популярной ниши — seed готового плана в кэше
+        seed = plan_prewarmer.seed_for(text)
+        job_id = await GenerationJobRepository.enqueue(
+            user_id, chat_id, text, make_dedup_key(text), priority, message_id,
+            seed=new_seed() if seed is None else seed
+        )
+        if job_id is not None:
+            self._wakeup.set()
+        return job_id
+
+    async def position(self, job_id: int) -> int:
+        """Позиция задания в очереди (0 — будет взято сразу)."""
+        ahead = await GenerationJobRepository.position(job_id)
+        idle = len(self._tasks) - self._busy
+        return max(0, ahead - idle)
+
+    async def start(self, bot: Bot) -> None:
+        """Вернуть прерванные задания в очередь и запустить воркеры."""
+        self._bot = bot
+        requeued = await GenerationJobRepository.requeue_running()
+        if requeued:
+            logger.info(f"Requeued {requeued} interrupted generation jobs")
+        await GenerationJobRepository.purge_finished(
+            time.time() - settings.job_retention_days * 24 * 60 * 60
+        )
+        for i in range(self.workers):
+            self._tasks.append(
+                asyncio.create_task(self._worker(), name=f"generation-worker-{i}")
+            )
+        self._wakeup.set()
+        logger.info(f"Generation queue started with {self.workers} workers")
+
+    async def stop(self) -> None:
+        """Остановить воркеры. Незавершённые задания продолжатся после перезапуска."""
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        self._busy = 0
+
+    async def stats(self) -> Dict[str, Any]:
+        """Глубина очереди и задержки за последний час."""
+        stats = await GenerationJobRepository.latency_stats(time.time() - 60 * 60)
+        stats["pending"] = await GenerationJobRepository.count_pending()
+        return stats
+
+    async def _worker(self) -> None:
+        while True:
+            try:
+                await self._work_once()
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                # Ошибка БД или доставки не должна уменьшать пул воркеров
+                logger.exception("Generation worker failed, retrying")
+                await asyncio.sleep(WORKER_ERROR_PAUSE)
+
+    async def _work_once(self) -> None:
+        """Взять одно задание и выполнить его (или подождать новых)."""
+        # Сбрасываем до claim(), чтобы не потерять submit() между ними
+        self._wakeup.clear()
+        job = await GenerationJobRepository.claim()
+        if job is None:
+            try:
+                # Таймаут страхует от потерянного пробуждения
+                await asyncio.wait_for(self._wakeup.wait(), timeout=5)
+            except asyncio.TimeoutError:
+                pass
+            return
+
+        self._busy += 1
+        try:
+            await self._process(job)
+        finally:
+            self._busy -= 1
+
+    async def _process(self, job: Dict[str, Any]) -> None:
+        stream = MessageStream(self._bot, job["chat_id"], job.get("message_id"))
+        # Доставленные планы (по одному на сообщение) — для истории
+        plans: List[List[str]] = [[]]
+        # Одна дата на задание: с ней план генерируется и сверяется при сохранении
+        start_date = default_start_date()
+        try:
+            async for chunk in plan_generator.stream(job["request_text"], seed=job["seed"], start_date=start_date):
+                if chunk == PLAN_BREAK:
+                    # План следующей площадки — отдельным сообщением
+                    await stream.close()
+                    stream = MessageStream(self._bot, job["chat_id"])
+                    plans.append([])
+                    continue
+                await stream.write(chunk)
+                plans[-1].append(chunk)
+            await stream.close()
+        except asyncio.CancelledError:
+            # Выключение бота: задание останется running и будет перезапущено
+            stream.abort()
+            raise
+        except Exception as e:
+            logger.exception(f"Generation job {job['id']} failed")
+            await GenerationJobRepository.finish(job["id"], error=str(e))
+            try:
+                await stream.replace("😔 Не удалось сгенерировать план. Попробуйте ещё раз.")
+            except Exception:
+                pass
+            return
+
+        await GenerationJobRepository.finish(job["id"])
+        try:
+            niche_trends.record(job["request_text"])
+        except Exception:
+            logger.exception(f"Failed to record trends of generation job {job['id']}")
+        try:
+            await HistoryService.save(
+                job["user_id"], job["request_text"], job["seed"], ["".join(parts) for parts in plans],
+                start_date=start_date
+            )
+        except Exception:
+            # План уже доставлен — сбой истории не должен ронять воркер
+            logger.exception(f"Failed to save plans of generation job {job['id']}")
+        try:
+            # Оценка плана — кнопками под последним сообщением
+            await stream.attach_markup(get_feedback_keyboard(job["seed"]))
+        except Exception as e:
+            logger.debug(f"Feedback keyboard not attached to job {job['id']}: {e}")
+
+
+generation_queue = GenerationQueue(
+    workers=settings.job_workers,
+    max_pending=settings.job_max_pending,
+)
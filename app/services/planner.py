@@ -1,11 +1,31 @@
 """
 Сервис генерации контент-плана.
-Бизнес-логика создания недельного плана контента.
+Бизнес-логика создания плана контента на 7, 14, 30, 90... дней.
+
+Запрос разбирается за один проход (parse_request): ниша, ЦА, тон,
+площадки, частота публикаций и горизонт плана. Для нескольких площадок
+(PLATFORMS) планы строятся по одному разбору и общему календарю, у
+каждой площадки свои форматы постов и чередование типов контента.
+
+Генерация управляется seed: по нему выбираются шаблоны дней, поэтому
+план воспроизводим. Планы хранятся компактно (ниша, ЦА, дата начала,
+seed, индексы шаблонов) и отрисовываются заново при чтении, а запросы
+с заданным seed кэшируются в LRU-кэше по нормализованным нише и ЦА,
+дате начала и seed.
 """
 
+import html
+import random
 import re
-from typing import Tuple
-from datetime import datetime, timedelta
+import secrets
+import string
+from dataclasses import dataclass, replace
+from functools import lru_cache
+from typing import Any, Dict, Hashable, Iterable, Iterator, List, Mapping, Optional, Sequence, Tuple
+from datetime import date, datetime, timedelta
+
+from app.config import settings
+from app.services.cache import MISSING, LRUCache
 
 # Шаблоны контента по типам постов
 CONTENT_TEMPLATES = {
@@ -41,100 +61,686 @@ WEEKDAYS_RU = [
     "Пятница", "Суббота", "Воскресенье"
 ]
 
+# Шаблон, заранее разобранный на фрагменты: (литерал, имя подстановки или None)
+CompiledTemplate = Tuple[Tuple[str, Optional[str]], ...]
+
+_FORMATTER = string.Formatter()
+
+
+def compile_template(template: str) -> CompiledTemplate:
+    """
+    Разобрать шаблон формата str.format на литералы и подстановки.
+
+    Поддерживаются только именованные подстановки без спецификаторов
+    формата — других в CONTENT_TEMPLATES нет.
+    """
+    fragments = []
+    for literal, field, format_spec, conversion in _FORMATTER.parse(template):
+        if format_spec or conversion or field == "":
+            raise ValueError(f"Unsupported placeholder in template: {template!r}")
+        fragments.append((literal, field))
+    return tuple(fragments)
+
+
+def render_template(template: CompiledTemplate, values: Mapping[str, str]) -> str:
+    """Собрать текст из фрагментов скомпилированного шаблона."""
+    parts = []
+    for literal, field in template:
+        parts.append(literal)
+        if field is not None:
+            parts.append(values[field])
+    return "".join(parts)
+
+
+# Шаблоны компилируются один раз при импорте
+_CONTENT_TYPES = tuple(CONTENT_TEMPLATES)
+_COMPILED_TEMPLATES: Dict[str, Tuple[CompiledTemplate, ...]] = {
+    content_type: tuple(compile_template(t) for t in templates)
+    for content_type, templates in CONTENT_TEMPLATES.items()
+}
+
+
+@dataclass(frozen=True)
+class Platform:
+    """
+    Площадка для мультиплатформенного плана.
+
+    Свои форматы постов дописываются к общим CONTENT_TEMPLATES того же
+    типа, а rotation задаёт, какой тип контента идёт в какой день.
+    """
+
+    title: str
+    rotation: Tuple[str, ...]
+    templates: Mapping[str, Sequence[str]]
+
+
+PLATFORMS: Dict[str, Platform] = {
+    "telegram": Platform(
+        title="Telegram",
+        rotation=_CONTENT_TYPES,
+        templates={},
+    ),
+    "instagram": Platform(
+        title="Instagram",
+        rotation=("engaging", "storytelling", "educational", "entertainment",
+                  "promotional", "storytelling", "engaging"),
+        templates={
+            "educational": ["🎠 Карусель: 5 шагов к {topic} — сохраняйте себе"],
+            "engaging": ["📲 Stories-опрос: «{topic}: да или нет?»"],
+            "storytelling": ["🎬 Reels: закулисье {niche} за 30 секунд"],
+            "promotional": ["🛍 Reels с отзывом: результат клиента в {niche}"],
+            "entertainment": ["😂 Reels-тренд: {niche} в одном меме"],
+        },
+    ),
+    "vk": Platform(
+        title="ВКонтакте",
+        rotation=("educational", "engaging", "promotional", "storytelling", "entertainment"),
+        templates={
+            "educational": ["📝 Статья: подробный гайд по {topic} для {target_audience}"],
+            "engaging": ["📊 Опрос в сообществе: что вы думаете о {topic}?"],
+            "storytelling": ["🎥 VK Клип: день из жизни {niche}-эксперта"],
+            "promotional": ["🛒 Товар недели в витрине сообщества: {niche}"],
+            "entertainment": ["🎮 Конкурс репостов для {target_audience}"],
+        },
+    ),
+    "youtube": Platform(
+        title="YouTube Shorts",
+        rotation=("entertainment", "educational", "storytelling", "engaging",
+                  "educational", "entertainment", "promotional"),
+        templates={
+            "educational": ["⚡ Shorts: 3 факта о {topic} за 60 секунд"],
+            "engaging": ["💬 Shorts с вопросом в конце: «А вы пробовали {topic}?»"],
+            "storytelling": ["⏱ Shorts: до/после в {niche}"],
+            "promotional": ["📌 Shorts-анонс: новинка в {niche}"],
+            "entertainment": ["🎵 Shorts-тренд: {niche} под популярный звук"],
+        },
+    ),
+}
+
+# Шаблоны площадок: общие + свои, тоже компилируются один раз
+_PLATFORM_TEMPLATES: Dict[str, Dict[str, Tuple[CompiledTemplate, ...]]] = {
+    name: {
+        content_type: compiled + tuple(
+            compile_template(t) for t in platform.templates.get(content_type, ())
+        )
+        for content_type, compiled in _COMPILED_TEMPLATES.items()
+    }
+    for name, platform in PLATFORMS.items()
+}
+
+# Фрагмент-разделитель в потоке iter_content_plan: следующий план — новым сообщением
+PLAN_BREAK = "\f"
+
+# Горизонт плана по умолчанию и допустимый максимум, дней
+PLAN_DAYS = 7
+MAX_PLAN_DAYS = 366
+SUPPORTED_HORIZONS = (7, 14, 30, 90)
+
+SEED_BITS = 31
+
+DEFAULT_AUDIENCE = "широкая аудитория"
+
+# Синонимы полей запроса (в нижнем регистре)
+_FIELD_ALIASES = {
+    "ниша": "niche",
+    "тема": "niche",
+    "ца": "audience",
+    "аудитория": "audience",
+    "целевая аудитория": "audience",
+    "тон": "tone",
+    "стиль": "tone",
+    "платформа": "platform",
+    "площадка": "platform",
+    "соцсеть": "platform",
+    "платформы": "platform",
+    "площадки": "platform",
+    "соцсети": "platform",
+    "частота": "frequency",
+    "горизонт": "horizon",
+    "срок": "horizon",
+    "период": "horizon",
+}
+
+# Площадки: основа слова -> каноническое имя
+_PLATFORM_ALIASES = {
+    "telegram": "telegram",
+    "телеграм": "telegram",
+    "тг": "telegram",
+    "instagram": "instagram",
+    "инстаграм": "instagram",
+    "инста": "instagram",
+    "vk": "vk",
+    "вк": "vk",
+    "вконтакте": "vk",
+    "tiktok": "tiktok",
+    "тикток": "tiktok",
+    "youtube": "youtube",
+    "ютуб": "youtube",
+    "shorts": "youtube",
+    "шортс": "youtube",
+    "reels": "instagram",
+    "рилс": "instagram",
+    "dzen": "dzen",
+    "дзен": "dzen",
+    "threads": "threads",
+}
+
+_HTML_TAG_RE = re.compile(r"<[^>]+>")
+_PUNCTUATION_RE = re.compile(r"[^\w\s]+")
+_WHITESPACE_RE = re.compile(r"\s+")
+
+# Готовые планы: ключ -> фрагменты с местами для ниши и ЦА (см. _plan_skeleton)
+plan_cache = LRUCache(
+    max_size=settings.plan_cache_size,
+    ttl=settings.plan_cache_ttl,
+)
+
+
+@dataclass(slots=True)
+class PlanRequest:
+    """Разобранный запрос пользователя."""
+
+    niche: str
+    target_audience: str = DEFAULT_AUDIENCE
+    tone: Optional[str] = None
+    # Каноническое имя площадки (см. _PLATFORM_ALIASES) или текст как есть
+    platform: Optional[str] = None
+    # Все упомянутые площадки (канонические имена) в порядке упоминания
+    platforms: Tuple[str, ...] = ()
+    posts_per_week: Optional[int] = None
+    horizon: int = PLAN_DAYS
+
+
+# Один проход по тексту: слова, числа и знаки, разделяющие значения полей
+_TOKEN_RE = re.compile(r"[^\W\d_]+|\d+|[\n;,:=—–-]")
+
+_SEPARATORS = frozenset("\n;,")
+_ASSIGN = frozenset(":=—–-")
+# Ключи, которые распознаются и без двоеточия в середине строки («моя ниша йога»)
+_LOOSE_KEYS = frozenset({"ниша", "ца"})
+
+# Формы названий площадок: «в инстаграме», «в телеграм-канале», «на ютубе»
+_PLATFORM_FORMS = {
+    stem + suffix: name
+    for stem, name in _PLATFORM_ALIASES.items()
+    for suffix in ("", "е", "а", "у", "ом", "ой", "ах", "ы")
+}
+
+_HORIZON_WORDS = {"неделю": 7, "месяц": 30, "квартал": 90, "год": 365}
+_FREQUENCY_NOUNS = ("раз", "пост", "публикаци")
+
+# Слова, с которых может начинаться что-то значимое; остальные пропускаются сразу
+_TRIGGERS = frozenset(
+    set(_FIELD_ALIASES) | set(_PLATFORM_FORMS) | _SEPARATORS
+    | {"целевая", "на", "ежедневно", "каждый", "через"}
+)
+
+
+# parse_user_input: только ниша и ЦА, как до появления parse_request
+_NICHE_RE = re.compile(r"ниша[:\s]+([^,]+)", re.IGNORECASE)
+_AUDIENCE_RE = re.compile(r"ЦА[:\s]+(.+)", re.IGNORECASE)
+
+
+def _clean(value: str) -> str:
+    return " ".join(value.split()).strip(" ,;.")
+
+
+def _horizon_unit(word: str) -> int:
+    """Дней в единице горизонта («дней», «недели», «месяца»), 0 — не единица."""
+    if word.startswith("дн") or word == "день":
+        return 1
+    if word.startswith("недел"):
+        return 7
+    if word.startswith("месяц"):
+        return 30
+    return 0
+
+
+def parse_request(text: str) -> PlanRequest:
+    """
+    Разбирает запрос пользователя за один проход.
+
+    Понимает поля «ниша:», «ЦА:», «тон:», «платформа:», «частота:»,
+    «горизонт:» (и их синонимы) в любом порядке, через запятую, точку
+    с запятой или с новой строки, а также свободный текст: «на 30 дней»,
+    «3 поста в неделю», упоминания площадок (можно несколько:
+    «площадки: telegram, instagram, вк»). Без поля ниши нишей
+    считается текст до первого распознанного поля.
+
+    Args:
+        text: Текст от пользователя
+
+    Returns:
+        PlanRequest
+    """
+    lowered = text.lower()
+    if len(lowered) != len(text):
+        # Редкие символы меняют длину при lower(): позиции должны совпадать
+        lowered = text
+    tokens = list(_TOKEN_RE.finditer(lowered))
+    words = [m.group() for m in tokens]
+    count = len(words)
+
+    fields: Dict[str, str] = {}
+    platforms: List[str] = []
+    horizon = posts_per_week = None
+    free_text_end = len(text)
+
+    field = None
+    value_start = 0
+    segment_start = True
+    i = 0
+
+    while i < count:
+        word = words[i]
+        if word not in _TRIGGERS and not word.isdigit():
+            segment_start = False
+            i += 1
+            continue
+
+        start = tokens[i].start()
+        at_segment_start = segment_start
+        segment_start = False
+
+        if word in _SEPARATORS:
+            segment_start = True
+            # ЦА может перечисляться через запятую: «мамы, папы»
+            if field is not None and not (field == "audience" and word == ","):
+                fields.setdefault(field, _clean(text[value_start:start]))
+                field = None
+            i += 1
+            continue
+
+        # Распознаём ключ поля, фразу горизонта или частоты: (поле, конец, горизонт, частота)
+        key = None
+        end = i + 1
+        found_horizon = found_frequency = 0
+
+        alias = word
+        if word == "целевая" and end < count and words[end] == "аудитория":
+            alias = "целевая аудитория"
+            end += 1
+        if alias in _FIELD_ALIASES:
+            if end < count and words[end] in _ASSIGN:
+                key = _FIELD_ALIASES[alias]
+                end += 1
+            elif alias in _LOOSE_KEYS or at_segment_start:
+                key = _FIELD_ALIASES[alias]
+        elif word.isdigit() and end < count:
+            unit = words[end]
+            if _horizon_unit(unit):
+                found_horizon = int(word) * _horizon_unit(unit)
+                end += 1
+            elif (
+                unit.startswith(_FREQUENCY_NOUNS)
+                and end + 2 < count
+                and words[end + 1] == "в"
+                and words[end + 2] in ("день", "неделю")
+            ):
+                found_frequency = int(word) * (7 if words[end + 2] == "день" else 1)
+                end += 3
+        elif word == "на" and end < count:
+            if words[end].isdigit() and end + 1 < count and _horizon_unit(words[end + 1]):
+                found_horizon = int(words[end]) * _horizon_unit(words[end + 1])
+                end += 2
+            elif words[end] in _HORIZON_WORDS:
+                found_horizon = _HORIZON_WORDS[words[end]]
+                end += 1
+            elif words[end] == "две" and end + 1 < count and words[end + 1] == "недели":
+                found_horizon = 14
+                end += 2
+        elif word == "ежедневно":
+            found_frequency = 7
+        elif word in ("каждый", "через") and end < count and words[end] == "день":
+            found_frequency = 7 if word == "каждый" else 4
+            end += 1
+        elif word in _PLATFORM_FORMS:
+            platform = _PLATFORM_FORMS[word]
+            if field == "platform":
+                fields.setdefault("platform", platform)
+            if platform not in platforms:
+                platforms.append(platform)
+
+        if key is None and not found_horizon and not found_frequency:
+            i += 1
+            continue
+
+        # Ключ, горизонт или частота завершают текущее значение
+        if field is not None:
+            fields.setdefault(field, _clean(text[value_start:start]))
+            field = None
+        free_text_end = min(free_text_end, start)
+
+        if key is not None:
+            field = key
+            value_start = tokens[end - 1].end()
+        horizon = horizon or found_horizon
+        posts_per_week = posts_per_week or found_frequency
+        i = end
+
+    if field is not None:
+        fields.setdefault(field, _clean(text[value_start:]))
+
+    niche = fields.get("niche") or _clean(text[:free_text_end]) or text.strip()
+    request = PlanRequest(niche=niche)
+    if fields.get("audience"):
+        request.target_audience = fields["audience"]
+    request.tone = fields.get("tone") or None
+    request.platform = fields.get("platform") or (platforms[0] if platforms else None)
+    request.platforms = tuple(platforms)
+
+    # «горизонт: 30», «частота: 3» — число без единиц
+    if not horizon and fields.get("horizon", "").isdigit():
+        horizon = int(fields["horizon"])
+    if not posts_per_week and fields.get("frequency", "").isdigit():
+        posts_per_week = int(fields["frequency"])
+    if horizon:
+        request.horizon = min(horizon, MAX_PLAN_DAYS)
+    request.posts_per_week = posts_per_week or None
+
+    return request
+
 
 def parse_user_input(text: str) -> Tuple[str, str]:
     """
     Парсит ввод пользователя для извлечения ниши и ЦА.
 
+    Горячий путь для тех, кому нужны только ниша и ЦА (LLM-генератор,
+    статистика ниш): два заранее скомпилированных выражения, в несколько
+    раз быстрее parse_request (см. benchmarks/bench_parser.py). Понимает
+    только «ниша:» и «ЦА:»; тон, площадки, частоту, горизонт, синонимы
+    полей и многострочные запросы разбирает parse_request — ради них он
+    и нужен, а не ради скорости.
+
     Args:
         text: Текст от пользователя
 
     Returns:
         Tuple[niche, target_audience]
     """
-    niche = ""
-    target_audience = ""
+    niche_match = _NICHE_RE.search(text)
+    ta_match = _AUDIENCE_RE.search(text)
+    niche = niche_match.group(1).strip() if niche_match else ""
+    target_audience = ta_match.group(1).strip() if ta_match else ""
+    return niche or text.strip(), target_audience or DEFAULT_AUDIENCE
 
-    # Пробуем найти паттерны "ниша: X" и "ЦА: Y"
-    niche_match = re.search(r'ниша[:\s]+([^,]+)', text, re.IGNORECASE)
-    ta_match = re.search(r'ЦА[:\s]+(.+)', text, re.IGNORECASE)
 
-    if niche_match:
-        niche = niche_match.group(1).strip()
-    if ta_match:
-        target_audience = ta_match.group(1).strip()
+def normalize_text(text: str) -> str:
+    """Нормализация для ключей: регистр, пунктуация и лишние пробелы."""
+    text = _PUNCTUATION_RE.sub(" ", text.casefold())
+    return _WHITESPACE_RE.sub(" ", text).strip()
 
-    # Если паттерны не найдены, используем весь текст как нишу
-    if not niche:
-        niche = text.strip()
 
-    if not target_audience:
-        target_audience = "широкая аудитория"
+def plan_cache_key(
+    niche: str,
+    target_audience: str,
+    start_date: date,
+    seed: int,
+    days: int = PLAN_DAYS,
+    platform: Optional[str] = None
+) -> Hashable:
+    """Ключ кэша планов: «Фитнес!» и «  фитнес» дают один и тот же план."""
+    return (normalize_text(niche), normalize_text(target_audience), start_date, seed, days, platform)
 
-    return niche, target_audience
 
+def new_seed() -> int:
+    """Seed для нового запроса: с ним план воспроизводим."""
+    return secrets.randbits(SEED_BITS)
 
-def generate_day_content(
+
+@dataclass(frozen=True)
+class CompactPlan:
+    """
+    Компактная запись плана.
+
+    Вместо готового HTML хранятся только входные данные и выбранные
+    шаблоны — по ним план отрисовывается заново без потерь.
+    """
+
+    niche: str
+    target_audience: str
+    start_date: date
+    seed: int
+    # Индекс шаблона в CONTENT_TEMPLATES (или шаблонах площадки) для каждого дня
+    templates: Tuple[int, ...]
+    # Площадка из PLATFORMS; None — общий план без привязки к площадке
+    platform: Optional[str] = None
+
+
+def _content_type(day_num: int, platform: Optional[str] = None) -> str:
+    # Чередуем типы контента по дням; у площадки своё чередование
+    rotation = PLATFORMS[platform].rotation if platform else _CONTENT_TYPES
+    return rotation[day_num % len(rotation)]
+
+
+def _templates(content_type: str, platform: Optional[str] = None) -> Tuple[CompiledTemplate, ...]:
+    if platform:
+        return _PLATFORM_TEMPLATES[platform][content_type]
+    return _COMPILED_TEMPLATES[content_type]
+
+
+def plural_days(n: int) -> str:
+    """«день», «дня» или «дней» для числа n."""
+    if n % 10 == 1 and n % 100 != 11:
+        return "день"
+    if 2 <= n % 10 <= 4 and not 12 <= n % 100 <= 14:
+        return "дня"
+    return "дней"
+
+
+def choose_templates(
+    seed: int,
+    days: int = PLAN_DAYS,
+    platform: Optional[str] = None
+) -> Tuple[int, ...]:
+    """
+    Выбрать шаблоны на каждый день; один seed — один и тот же выбор.
+
+    Первые N дней не зависят от горизонта: 7-дневный план — начало
+    14-дневного с тем же seed. У каждой площадки свой поток случайных
+    чисел, поэтому планы площадок с общим seed не повторяют друг друга.
+    """
+    if not 1 <= days <= MAX_PLAN_DAYS:
+        raise ValueError(f"Plan horizon must be 1..{MAX_PLAN_DAYS} days, got {days}")
+    rng = random.Random(f"{seed}:{platform}" if platform else seed)
+    return tuple(
+        rng.randrange(len(_templates(_content_type(i, platform), platform))) for i in range(days)
+    )
+
+
+def render_day_content(
     day_num: int,
+    template_index: int,
     niche: str,
-    target_audience: str
+    target_audience: str,
+    platform: Optional[str] = None
 ) -> str:
-    """Генерирует контент для одного дня."""
-    import random
+    """Подставить нишу и ЦА в выбранный шаблон дня."""
+    template = _templates(_content_type(day_num, platform), platform)[template_index]
+    return render_template(template, {
+        "niche": niche,
+        "topic": niche,
+        "target_audience": target_audience,
+    })
 
-    # Чередуем типы контента по дням
-    content_types = list(CONTENT_TEMPLATES.keys())
-    content_type = content_types[day_num % len(content_types)]
 
-    templates = CONTENT_TEMPLATES[content_type]
-    template = random.choice(templates)
+def generate_day_content(
+    day_num: int,
+    niche: str,
+    target_audience: str,
+    rng: Optional[random.Random] = None
+) -> str:
+    """Генерирует контент для одного дня."""
+    templates = _COMPILED_TEMPLATES[_content_type(day_num)]
+    template_index = (rng or random.Random()).randrange(len(templates))
+    return render_day_content(day_num, template_index, niche, target_audience)
 
-    # Подставляем переменные
-    content = template.format(
-        niche=niche,
-        topic=niche,
-        target_audience=target_audience
-    )
 
-    return content
+def default_start_date() -> date:
+    """Планы начинаются с завтрашнего дня."""
+    return (datetime.now() + timedelta(days=1)).date()
 
 
-def generate_content_plan(user_input: str) -> str:
+def build_plan(
+    user_input: str,
+    seed: int,
+    start_date: Optional[date] = None,
+    days: Optional[int] = None
+) -> CompactPlan:
     """
-    Генерирует недельный контент-план.
+    Составить план (без отрисовки) — для первой из запрошенных площадок.
 
     Args:
         user_input: Текст запроса пользователя
+        seed: Seed генерации
+        start_date: Первый день плана (по умолчанию — завтра)
+        days: Горизонт плана в днях (по умолчанию — из запроса)
+    """
+    return build_platform_plans(user_input, seed, start_date, days)[0]
 
-    Returns:
-        Отформатированный контент-план на 7 дней
+
+def request_platforms(request: PlanRequest) -> Tuple[Optional[str], ...]:
+    """Площадки, под которые строятся планы запроса; (None,) — общий план."""
+    return tuple(p for p in request.platforms if p in PLATFORMS) or (None,)
+
+
+def build_platform_plans(
+    user_input: str,
+    seed: int,
+    start_date: Optional[date] = None,
+    days: Optional[int] = None
+) -> List[CompactPlan]:
     """
-    niche, target_audience = parse_user_input(user_input)
+    Составить планы для всех площадок запроса за один разбор.
 
-    # Начинаем с завтрашнего дня
-    start_date = datetime.now() + timedelta(days=1)
+    Запрос разбирается один раз, дата начала общая; «площадки: telegram,
+    instagram, вк» дают по плану на каждую площадку, запрос без известных
+    площадок — один общий план.
 
-    lines = [
-        "📋 <b>Контент-план на 7 дней</b>",
-        f"🎯 Ниша: <b>{niche}</b>",
-        f"👥 ЦА: <b>{target_audience}</b>",
-        "",
-        "─" * 25,
-        ""
+    Args:
+        user_input: Текст запроса пользователя
+        seed: Seed генерации (общий для всех площадок)
+        start_date: Первый день планов (по умолчанию — завтра)
+        days: Горизонт планов в днях (по умолчанию — из запроса)
+    """
+    request = parse_request(user_input)
+    if start_date is None:
+        start_date = default_start_date()
+    days = days or request.horizon
+    return [
+        CompactPlan(
+            request.niche,
+            request.target_audience,
+            start_date,
+            seed,
+            choose_templates(seed, days, platform),
+            platform,
+        )
+        for platform in request_platforms(request)
     ]
 
-    for i in range(7):
-        day_date = start_date + timedelta(days=i)
+
+@lru_cache(maxsize=64)
+def _day_labels(start_date: date, days: int) -> Tuple[str, ...]:
+    """Заголовки дней «<b>День N</b> • Понедельник, 01.01» — общие для всех планов с этой датой."""
+    labels = []
+    day_date = start_date
+    one_day = timedelta(days=1)
+    for i in range(days):
         weekday = WEEKDAYS_RU[day_date.weekday()]
-        date_str = day_date.strftime("%d.%m")
+        labels.append(f"<b>День {i + 1}</b> • {weekday}, {day_date.day:02d}.{day_date.month:02d}\n")
+        day_date += one_day
+    return tuple(labels)
+
 
-        content = generate_day_content(i, niche, target_audience)
+def iter_plan_days(
+    plan: CompactPlan,
+    rendered: Optional[Dict[Tuple[Optional[str], str, int], str]] = None
+) -> Iterator[str]:
+    """
+    Лениво отрисовать дни плана.
+
+    Шаблон с подставленными нишей и ЦА собирается один раз на план:
+    в длинном плане дни повторяют одни и те же ~15 шаблонов.
 
-        lines.append(f"<b>День {i+1}</b> • {weekday}, {date_str}")
-        lines.append(content)
-        lines.append("")
+    Args:
+        plan: План
+        rendered: Уже собранные шаблоны для этих ниши и ЦА (общие для
+            нескольких планов, см. generate_content_plans)
+    """
+    values = {
+        "niche": plan.niche,
+        "topic": plan.niche,
+        "target_audience": plan.target_audience,
+    }
+    if rendered is None:
+        rendered = {}
+    # Календарь общий для всех планов (и площадок) с этой датой и горизонтом
+    labels = _day_labels(plan.start_date, len(plan.templates))
+    platform = plan.platform
+
+    for i, template_index in enumerate(plan.templates):
+        content_type = _content_type(i, platform)
+        key = (platform, content_type, template_index)
+        content = rendered.get(key)
+        if content is None:
+            content = render_template(_templates(content_type, platform)[template_index], values)
+            rendered[key] = content
+
+        yield f"{labels[i]}{content}\n\n"
+
+
+def iter_plan_entries(plan: CompactPlan) -> Iterator[Tuple[date, str]]:
+    """
+    Дни плана без разметки: (дата, пост) — для выгрузок.
+
+    Даты те же, что в заголовках дней render_plan.
+    """
+    values = {
+        "niche": plan.niche,
+        "topic": plan.niche,
+        "target_audience": plan.target_audience,
+    }
+    one_day = timedelta(days=1)
+    day_date = plan.start_date
+    for i, template_index in enumerate(plan.templates):
+        template = _templates(_content_type(i, plan.platform), plan.platform)[template_index]
+        yield day_date, render_template(template, values)
+        day_date += one_day
 
-    lines.extend([
+
+def plan_template_ids(plan: CompactPlan) -> List[Tuple[str, int]]:
+    """
+    Шаблоны CONTENT_TEMPLATES, из которых собран план: (тип контента, индекс).
+
+    Свои форматы площадок (индексы после общих шаблонов) не входят.
+    """
+    ids = []
+    for i, template_index in enumerate(plan.templates):
+        content_type = _content_type(i, plan.platform)
+        if template_index < len(CONTENT_TEMPLATES[content_type]):
+            ids.append((content_type, template_index))
+    return ids
+
+
+def render_plan(
+    plan: CompactPlan,
+    rendered: Optional[Dict[Tuple[Optional[str], str, int], str]] = None
+) -> Iterator[str]:
+    """Отрисовать план по частям: шапка, дни, подвал."""
+    days = len(plan.templates)
+    header = [
+        f"📋 <b>Контент-план на {days} {plural_days(days)}</b>",
+        f"🎯 Ниша: <b>{plan.niche}</b>",
+        f"👥 ЦА: <b>{plan.target_audience}</b>",
+    ]
+    if plan.platform:
+        header.append(f"📱 Площадка: <b>{PLATFORMS[plan.platform].title}</b>")
+    yield "\n".join(header + ["", "─" * 25, "", ""])
+
+    yield from iter_plan_days(plan, rendered)
+
+    yield "\n".join([
         "─" * 25,
         "",
         "💡 <i>Совет: адаптируйте план под свой стиль и актуальные события!</i>",
@@ -142,4 +748,314 @@ def generate_content_plan(user_input: str) -> str:
         "🔄 Хотите новый план? Просто напишите нишу и ЦА снова."
     ])
 
-    return "\n".join(lines)
+
+def iter_content_plan(
+    user_input: str,
+    seed: Optional[int] = None,
+    days: Optional[int] = None,
+    start_date: Optional[date] = None
+) -> Iterator[str]:
+    """
+    Генерирует контент-план по частям: шапка, дни, подвал.
+
+    Части можно показывать пользователю по мере готовности. Если в
+    запросе несколько площадок, их планы идут подряд, разделённые
+    фрагментом PLAN_BREAK: каждый план — отдельное сообщение.
+
+    Args:
+        user_input: Текст запроса пользователя
+        seed: Seed генерации; с ним план воспроизводим и берётся из кэша
+            (None — новый случайный seed, без кэша)
+        days: Горизонт плана в днях (7, 14, 30, 90...; по умолчанию —
+            из запроса, например «на 30 дней»)
+        start_date: Первый день плана (по умолчанию — завтра)
+
+    Yields:
+        Фрагменты плана (HTML)
+    """
+    cached = seed is not None
+    plans = build_platform_plans(user_input, seed if cached else new_seed(), start_date, days)
+    # С seed сюда попадают шаблоны с местами для ниши и ЦА (см. _plan_skeleton)
+    rendered: Dict[Tuple[Optional[str], str, int], str] = {}
+
+    for n, plan in enumerate(plans):
+        if n:
+            yield PLAN_BREAK
+        if not cached:
+            yield from render_plan(plan, rendered)
+            continue
+        key = _plan_key(plan)
+        skeleton = plan_cache.get(key)
+        if skeleton is MISSING:
+            skeleton = _plan_skeleton(plan, rendered)
+            plan_cache.set(key, skeleton)
+        yield from _fill_skeleton(skeleton, plan)
+
+
+def _plan_key(plan: CompactPlan) -> Hashable:
+    return plan_cache_key(
+        plan.niche, plan.target_audience, plan.start_date, plan.seed, len(plan.templates), plan.platform
+    )
+
+
+# Места ниши и ЦА в закэшированном плане. Ключ кэша нормализован, поэтому
+# «Фитнес!» и «фитнес» берут одну запись, но каждый получает своё написание
+_SLOT = "\x00"
+_SLOT_PLAN_VALUES = {
+    "niche": f"{_SLOT}niche{_SLOT}",
+    "target_audience": f"{_SLOT}target_audience{_SLOT}",
+}
+
+
+def _plan_skeleton(
+    plan: CompactPlan,
+    rendered: Optional[Dict[Tuple[Optional[str], str, int], str]] = None
+) -> Tuple[CompiledTemplate, ...]:
+    """Фрагменты плана без ниши и ЦА — в формате скомпилированных шаблонов."""
+    skeleton = []
+    for chunk in render_plan(replace(plan, **_SLOT_PLAN_VALUES), rendered):
+        parts = chunk.split(_SLOT)
+        skeleton.append(tuple(zip(parts[::2], parts[1::2] + [None])))
+    return tuple(skeleton)
+
+
+def _fill_skeleton(skeleton: Sequence[CompiledTemplate], plan: CompactPlan) -> Iterator[str]:
+    """Подставить в закэшированный план нишу и ЦА запроса."""
+    values = {"niche": plan.niche, "target_audience": plan.target_audience}
+    for chunk in skeleton:
+        yield render_template(chunk, values)
+
+
+def cached_plan_chunks(
+    user_input: str,
+    seed: int,
+    start_date: Optional[date] = None
+) -> Optional[List[str]]:
+    """
+    Готовый план из кэша без генерации (см. iter_content_plan).
+
+    Args:
+        start_date: Первый день плана (по умолчанию — завтра)
+
+    Returns:
+        Фрагменты с PLAN_BREAK между площадками или None, если план
+        какой-либо площадки ещё не в кэше
+    """
+    plans = build_platform_plans(user_input, seed, start_date)
+    keys = [_plan_key(plan) for plan in plans]
+    # Промах не считаем: план сгенерируют, и промах учтёт iter_content_plan
+    if any(plan_cache.peek(key) is MISSING for key in keys):
+        return None
+    chunks: List[str] = []
+    for n, (plan, key) in enumerate(zip(plans, keys)):
+        skeleton = plan_cache.get(key)
+        if skeleton is MISSING:
+            return None
+        if n:
+            chunks.append(PLAN_BREAK)
+        chunks.extend(_fill_skeleton(skeleton, plan))
+    return chunks
+
+
+def prewarm_plan(user_input: str, seed: int, ttl: Optional[float] = None) -> int:
+    """
+    Отрисовать план заранее и положить в кэш.
+
+    Args:
+        user_input: Текст запроса
+        seed: Seed, с которым план потом запросят
+        ttl: Время жизни записей (по умолчанию — PLAN_CACHE_TTL)
+
+    Returns:
+        Количество отрисованных планов (уже лежавшие в кэше не считаются)
+    """
+    rendered: Dict[Tuple[Optional[str], str, int], str] = {}
+    count = 0
+    for plan in build_platform_plans(user_input, seed):
+        key = _plan_key(plan)
+        skeleton = plan_cache.peek(key)
+        if skeleton is MISSING:
+            skeleton = _plan_skeleton(plan, rendered)
+            count += 1
+        # Запись и при попадании: продлевает TTL до следующего прогрева
+        plan_cache.set(key, skeleton, ttl=ttl)
+    return count
+
+
+def split_plans(chunks: Iterable[str]) -> List[str]:
+    """Склеить фрагменты iter_content_plan в тексты планов (по одному на площадку)."""
+    plans: List[List[str]] = [[]]
+    for chunk in chunks:
+        if chunk == PLAN_BREAK:
+            plans.append([])
+        else:
+            plans[-1].append(chunk)
+    return ["".join(parts) for parts in plans]
+
+
+def generate_content_plan(
+    user_input: str,
+    seed: Optional[int] = None,
+    days: Optional[int] = None
+) -> str:
+    """
+    Генерирует контент-план.
+
+    Args:
+        user_input: Текст запроса пользователя
+        seed: Seed генерации (None — случайный план, без кэша)
+        days: Горизонт плана в днях (по умолчанию — из запроса)
+
+    Returns:
+        Отформатированный контент-план (планы нескольких площадок — подряд)
+    """
+    return "\n\n".join(split_plans(iter_content_plan(user_input, seed, days)))
+
+
+def generate_content_plan_chunks(
+    user_input: str,
+    seed: Optional[int] = None,
+    days: Optional[int] = None,
+    start_date: Optional[date] = None
+) -> List[str]:
+    """Контент-план списком фрагментов с PLAN_BREAK между площадками (для пула процессов)."""
+    return list(iter_content_plan(user_input, seed, days, start_date))
+
+
+def generate_content_plans(
+    requests: Sequence[str],
+    seeds: Optional[Sequence[int]] = None,
+    start_date: Optional[date] = None
+) -> List[str]:
+    """
+    Пакетная генерация планов (для агентств и /batch).
+
+    Дата начала и заголовки дней считаются один раз на пакет, одинаковые
+    запросы разбираются один раз, а шаблоны с подставленными нишей и ЦА
+    переиспользуются между планами — стоимость одного плана не растёт
+    с размером пакета.
+
+    Args:
+        requests: Тексты запросов, по одному на план
+        seeds: Seed для каждого запроса (по умолчанию — новые)
+        start_date: Первый день всех планов (по умолчанию — завтра)
+
+    Returns:
+        Планы в порядке запросов (планы площадок одного запроса — подряд)
+    """
+    if seeds is not None and len(seeds) != len(requests):
+        raise ValueError("seeds must match requests")
+    if start_date is None:
+        start_date = default_start_date()
+
+    parsed: Dict[str, PlanRequest] = {}
+    rendered: Dict[Tuple[str, str], Dict[Tuple[Optional[str], str, int], str]] = {}
+    plans = []
+
+    for i, text in enumerate(requests):
+        request = parsed.get(text)
+        if request is None:
+            request = parsed[text] = parse_request(text)
+        seed = seeds[i] if seeds is not None else new_seed()
+        subject = rendered.setdefault((request.niche, request.target_audience), {})
+        platform_plans = []
+        for platform in request_platforms(request):
+            plan = CompactPlan(
+                request.niche,
+                request.target_audience,
+                start_date,
+                seed,
+                choose_templates(seed, request.horizon, platform),
+                platform,
+            )
+            platform_plans.append("".join(render_plan(plan, subject)))
+        plans.append("\n\n".join(platform_plans))
+
+    return plans
+
+
+def plan_to_text(plan_html: str) -> str:
+    """Текст плана без HTML-разметки Telegram (для файлов)."""
+    return html.unescape(_HTML_TAG_RE.sub("", plan_html))
+
+
+def plan_cache_stats() -> Dict[str, Any]:
+    """Счётчики кэша планов для подбора его размера."""
+    return plan_cache.stats()
+
+
+def encode_templates(templates: Tuple[int, ...]) -> str:
+    """Индексы шаблонов для хранения в БД: «0,2,1,...»."""
+    return ",".join(map(str, templates))
+
+
+def decode_templates(value: str) -> Tuple[int, ...]:
+    """Обратное к encode_templates."""
+    return tuple(int(x) for x in value.split(",")) if value else ()
+
+
+def stored_plan(row: Mapping[str, Any]) -> Optional[CompactPlan]:
+    """Компактный план из строки content_plans (None — план хранится текстом)."""
+    if row["templates"] is None:
+        return None
+    return CompactPlan(
+        niche=row["niche"],
+        target_audience=row["target_audience"],
+        start_date=date.fromisoformat(row["start_date"]),
+        seed=row["seed"],
+        templates=decode_templates(row["templates"]),
+        platform=row.get("platform"),
+    )
+
+
+def iter_stored_plan(row: Mapping[str, Any]) -> Iterator[str]:
+    """
+    Сохранённый план по частям — чтобы длинный план можно было разбить
+    на сообщения (фрагменты не режут HTML-разметку).
+    """
+    plan = stored_plan(row)
+    if plan is not None:
+        yield from render_plan(plan)
+    else:
+        yield from row["plan_content"].splitlines(keepends=True)
+
+
+def render_stored_plan(row: Mapping[str, Any]) -> str:
+    """
+    Текст сохранённого плана.
+
+    Компактные записи отрисовываются заново, полные (например, от LLM)
+    возвращаются как есть.
+    """
+    return "".join(iter_stored_plan(row))
+
+
+def plan_records(
+    user_input: str,
+    seed: int,
+    texts: Sequence[str],
+    start_date: Optional[date] = None
+) -> List[Tuple[Optional[CompactPlan], str]]:
+    """
+    Что сохранить в историю по результату генерации.
+
+    Если тексты совпадают с шаблонными планами для этого seed, они
+    хранятся компактно; иначе (ответ LLM) — одним текстом. Планы
+    отрисовываются заново — вызывать в пуле исполнителей.
+
+    Args:
+        user_input: Текст запроса пользователя
+        seed: Seed генерации
+        texts: Доставленные планы, по одному на сообщение
+        start_date: Дата начала, с которой планы генерировались
+            (по умолчанию — завтра)
+
+    Returns:
+        Пары (компактный план или None, текст плана)
+    """
+    plans = build_platform_plans(user_input, seed, start_date)
+    if len(plans) == len(texts) and all(
+        "".join(render_plan(plan)) == text for plan, text in zip(plans, texts)
+    ):
+        return [(plan, text) for plan, text in zip(plans, texts)]
+    return [(None, "\n\n".join(texts))]
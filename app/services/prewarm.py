@@ -0,0 +1,159 @@
+"""
+Прогрев кэша планов для популярных ниш.
+
+Планы ниш с кнопок-примеров (get_inline_examples) и самых частых ниш за
+сутки (см. trends.py) отрисовываются заранее — при запуске и сразу после
+полуночи, когда сдвигается дата начала планов. Популярные ниши берутся в
+самом частом исходном написании. Запрос с теми же нишей и ЦА (слово в
+слово, после разбора) получает общий на день seed (daily_seed), поэтому
+план берётся из кэша и отдаётся без генерации; «C#» не получит план,
+прогретый для «C++», хотя ключи трендов у них совпадают.
+
+Прогрев идёт в фоне по одному плану с паузой между ними и не занимает
+пул исполнителей: пользовательские запросы не ждут прогрева. Записи
+прогрева живут в кэше до следующего прогрева, а не PLAN_CACHE_TTL.
+"""
+
+import asyncio
+import hashlib
+import logging
+from datetime import date, datetime, timedelta
+from typing import Dict, Hashable, List, Optional
+
+from app.config import settings
+from app.services.planner import (
+    SEED_BITS,
+    default_start_date,
+    parse_request,
+    prewarm_plan,
+)
+from app.services.trends import NICHE, niche_trends
+
+logger = logging.getLogger(__name__)
+
+# Запросы кнопок-примеров (callback_data "niche:<ключ>")
+NICHE_PRESETS: Dict[str, str] = {
+    "fitness": "ниша: фитнес, ЦА: женщины 25-35",
+    "it": "ниша: IT, ЦА: начинающие разработчики",
+    "cooking": "ниша: кулинария, ЦА: молодые мамы",
+    "education": "ниша: образование, ЦА: школьники и родители",
+}
+
+# Запас TTL записей прогрева после полуночи — на случай задержки следующего прогрева
+TTL_MARGIN = 60 * 60
+
+
+def request_key(text: str) -> Hashable:
+    """
+    Ключ запроса: ниша и ЦА как их написал пользователь, площадки и горизонт.
+
+    «фитнес» и «ниша: фитнес» — один ключ, «Фитнес» — уже другой.
+    """
+    request = parse_request(text)
+    return (
+        request.niche,
+        request.target_audience,
+        request.platforms,
+        request.horizon,
+    )
+
+
+def daily_seed(key: Hashable, start_date: date) -> int:
+    """Общий seed запроса на день: у всех, кто попросит, один план из кэша."""
+    digest = hashlib.sha1(f"{start_date.isoformat()}:{key!r}".encode("utf-8")).digest()
+    return int.from_bytes(digest[:8], "big") % (1 << SEED_BITS)
+
+
+def _seconds_to_midnight() -> float:
+    now = datetime.now()
+    midnight = datetime.combine(now.date() + timedelta(days=1), datetime.min.time())
+    return (midnight - now).total_seconds()
+
+
+class PlanPrewarmer:
+    """Фоновый прогрев планов популярных ниш."""
+
+    def __init__(self, top_niches: int, pause: float):
+        """
+        Args:
+            top_niches: Сколько самых частых ниш за сутки прогревать
+                (помимо NICHE_PRESETS)
+            pause: Пауза между планами, сек
+        """
+        self.top_niches = top_niches
+        self.pause = pause
+        self.warmed = 0
+        # Ключ запроса -> seed прогретого плана
+        self._seeds: Dict[Hashable, int] = {}
+        self._start_date: Optional[date] = None
+        self._task: Optional[asyncio.Task] = None
+
+    def seed_for(self, text: str) -> Optional[int]:
+        """Seed прогретого плана для запроса или None, если запрос не прогревался."""
+        if not self._seeds or self._start_date != default_start_date():
+            return None
+        return self._seeds.get(request_key(text))
+
+    async def requests(self) -> List[str]:
+        """Запросы для прогрева: кнопки-примеры и популярные ниши за сутки."""
+        texts = list(NICHE_PRESETS.values())
+        if self.top_niches:
+            # Написание ниши — самое частое у пользователей, а не ключ трендов
+            texts += [f"ниша: {label}" for label, _ in await niche_trends.daily(NICHE, self.top_niches)]
+        return texts
+
+    async def warm(self) -> int:
+        """
+        Прогреть планы на текущую дату начала.
+
+        Returns:
+            Количество отрисованных планов
+        """
+        start_date = default_start_date()
+        if start_date != self._start_date:
+            self._seeds, self._start_date = {}, start_date
+        ttl = _seconds_to_midnight() + TTL_MARGIN
+        count = 0
+        for text in await self.requests():
+            key = request_key(text)
+            seed = daily_seed(key, start_date)
+            count += prewarm_plan(text, seed, ttl=ttl)
+            # Seed отдаётся только готовому плану
+            self._seeds[key] = seed
+            await asyncio.sleep(self.pause)
+        self.warmed += count
+        return count
+
+    def start(self) -> None:
+        """Запустить прогрев: сейчас и после каждой полуночи."""
+        if self._task is not None and not self._task.done():
+            return
+        self._task = asyncio.create_task(self._run(), name="plan-prewarmer")
+
+    async def stop(self) -> None:
+        """Остановить прогрев."""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                count = await self.warm()
+                logger.info(f"Plan cache prewarmed: {count} plans for {self._start_date}")
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.exception("Plan prewarm failed")
+            # Чуть позже полуночи, чтобы default_start_date() уже сдвинулась
+            await asyncio.sleep(_seconds_to_midnight() + 1)
+
+
+plan_prewarmer = PlanPrewarmer(
+    top_niches=settings.prewarm_top_niches,
+    pause=settings.prewarm_pause,
+)
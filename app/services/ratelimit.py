@@ -0,0 +1,76 @@
+"""
+Ограничители частоты запросов к Telegram Bot API.
+"""
+
+import asyncio
+import time
+from typing import Dict, Optional
+
+
+class TokenBucket:
+    """
+    Глобальный token bucket.
+
+    Пополняется со скоростью ``rate`` токенов в секунду, вмещает не больше
+    ``capacity``. Поддерживает общую паузу (ответ Telegram RetryAfter).
+    """
+
+    def __init__(self, rate: float, capacity: Optional[float] = None):
+        self.rate = rate
+        self.capacity = capacity if capacity is not None else rate
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._paused_until = 0.0
+        self._lock = asyncio.Lock()
+
+    def pause(self, seconds: float) -> None:
+        """Приостановить выдачу токенов всем потребителям."""
+        self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+        self._tokens = 0
+
+    async def acquire(self) -> None:
+        """Дождаться и забрать один токен."""
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                if now < self._paused_until:
+                    await asyncio.sleep(self._paused_until - now)
+                    continue
+
+                elapsed = now - self._updated
+                self._updated = now
+                self._tokens = min(self.capacity, self._tokens + elapsed * self.rate)
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                await asyncio.sleep((1 - self._tokens) / self.rate)
+
+
+class ChatRateLimiter:
+    """
+    Минимальный интервал между сообщениями в один чат.
+
+    Хранит время последней отправки только для недавних чатов,
+    поэтому память не растёт с числом пользователей.
+    """
+
+    def __init__(self, interval: float, max_chats: int = 10_000):
+        self.interval = interval
+        self.max_chats = max_chats
+        self._last_sent: Dict[int, float] = {}
+
+    async def acquire(self, chat_id: int) -> None:
+        """Дождаться, когда в чат можно отправить следующее сообщение."""
+        now = time.monotonic()
+        wait = self._last_sent.get(chat_id, 0.0) + self.interval - now
+        if wait > 0:
+            await asyncio.sleep(wait)
+            now += wait
+        self._last_sent[chat_id] = now
+
+        if len(self._last_sent) > self.max_chats:
+            # Записи старше интервала больше ни на что не влияют
+            threshold = now - self.interval
+            self._last_sent = {
+                cid: ts for cid, ts in self._last_sent.items() if ts > threshold
+            }
@@ -0,0 +1,214 @@
+"""
+Поиск по сохранённым планам (/search).
+
+Термы плана считаются при сохранении и хранятся в его строке, индекс
+content_plans_fts поддерживается триггерами (см. fts.py и миграцию 15).
+Планы, сохранённые до появления термов, индексируются в фоне небольшими
+пачками (SearchIndexer) — бот работает, пока индекс строится, а
+найденное просто пополняется.
+"""
+
+import asyncio
+import html
+import logging
+import re
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Any, Dict, List, Mapping, Optional, Sequence, Tuple
+
+from app.config import settings
+from app.database.fts import STEM_CUT, STEM_MIN_LENGTH, normalize_word, search_terms, search_words
+from app.database.repository import PlanSearchRepository
+from app.services.cache import LRUCache
+from app.services.executor import ExecutorBusyError, plan_executor
+from app.services.planner import PLATFORMS, plan_to_text, render_stored_plan
+
+logger = logging.getLogger(__name__)
+
+# Последний запрос пользователя — для кнопок листания (callback_data до 64 байт)
+search_queries = LRUCache(max_size=10_000, ttl=3600)
+
+# Слов в сниппете
+SNIPPET_WORDS = 12
+# Пауза фоновой индексации, пока пул исполнителей занят планами пользователей, сек
+BUSY_PAUSE = 1.0
+
+_WORD_RE = re.compile(r"[^\W_]+")
+
+
+@dataclass(slots=True)
+class SearchResults:
+    """Страница результатов поиска."""
+
+    query: str
+    page: int
+    plans: List[Dict[str, Any]]
+    has_next: bool
+
+
+class SearchService:
+    """Поиск по планам пользователя."""
+
+    @staticmethod
+    async def search(user_id: int, query: str, page: int = 0) -> SearchResults:
+        """
+        Страница результатов, от самых релевантных.
+
+        Args:
+            user_id: Telegram ID пользователя
+            query: Текст запроса
+            page: Номер страницы с нуля
+        """
+        size = settings.search_page_size
+        # Лишняя строка показывает, есть ли следующая страница
+        plans = await PlanSearchRepository.search(user_id, query, size + 1, page * size)
+        search_queries.set(user_id, query)
+        return SearchResults(query, page, plans[:size], has_next=len(plans) > size)
+
+
+def _prefixes(query: str) -> List[str]:
+    # Те же начала слов, что ищет build_match
+    return [
+        word[:-STEM_CUT] if len(word) >= STEM_MIN_LENGTH else word
+        for word in search_words(query)
+        if len(word) > 1
+    ]
+
+
+def highlight(text: str, query: str, max_words: Optional[int] = None) -> str:
+    """
+    HTML с найденными словами жирным.
+
+    Args:
+        text: Текст без разметки
+        query: Запрос пользователя
+        max_words: Обрезать до окна вокруг первого совпадения (для сниппета)
+    """
+    prefixes = tuple(_prefixes(query))
+    words = list(_WORD_RE.finditer(text))
+    matched = [normalize_word(m.group()).startswith(prefixes) for m in words] if prefixes else []
+
+    start, end = 0, len(words)
+    if max_words is not None and words:
+        first = matched.index(True) if True in matched else 0
+        start = max(0, first - max_words // 3)
+        end = min(len(words), start + max_words)
+
+    parts = ["…"] if start > 0 else []
+    position = words[start].start() if words else 0
+    for i in range(start, end):
+        word = words[i]
+        parts.append(html.escape(text[position:word.start()]))
+        token = html.escape(word.group())
+        parts.append(f"<b>{token}</b>" if matched[i] else token)
+        position = word.end()
+    if end < len(words):
+        parts.append("…")
+    else:
+        parts.append(html.escape(text[position:]))
+    return "".join(parts).strip()
+
+
+def format_results(results: SearchResults) -> str:
+    """Текст страницы результатов: строка на план и сниппет текста."""
+    query = html.escape(results.query)
+    if not results.plans:
+        if results.page:
+            return f"🔎 По запросу «{query}» больше ничего нет."
+        return (
+            f"🔎 По запросу «{query}» ничего не нашлось.\n\n"
+            "Ищется по нише, ЦА и тексту ваших сохранённых планов."
+        )
+
+    lines = [f"🔎 <b>Найдено по запросу «{query}»</b>", ""]
+    for number, plan in enumerate(results.plans, start=1):
+        created = datetime.fromtimestamp(plan["created_at"]).strftime("%d.%m.%Y")
+        line = f"{number}. {created} • {highlight(plan['niche'], results.query)}"
+        if plan["target_audience"]:
+            line += f" — {highlight(plan['target_audience'], results.query)}"
+        if plan["platform"] in PLATFORMS:
+            line += f" ({PLATFORMS[plan['platform']].title})"
+        lines.append(line)
+        # Компактный план отрисовывается заново — как и для индекса
+        text = plan_to_text(render_stored_plan(plan))
+        if text:
+            snippet = highlight(text, results.query, SNIPPET_WORDS)
+            lines.append(f"   <i>{snippet}</i>")
+    lines += ["", "Нажмите номер, чтобы открыть план."]
+    return "\n".join(lines)
+
+
+def plan_search_terms(rows: Sequence[Mapping[str, Any]]) -> List[Tuple[int, str]]:
+    """Термы сохранённых планов (компактные отрисовываются) — для пула исполнителей."""
+    return [
+        (row["id"], search_terms(row["user_id"], row["niche"], row["target_audience"], render_stored_plan(row)))
+        for row in rows
+    ]
+
+
+class SearchIndexer:
+    """Фоновая индексация планов, сохранённых до появления поиска."""
+
+    def __init__(self, batch_size: int, pause: float):
+        """
+        Args:
+            batch_size: Планов в одной транзакции
+            pause: Пауза между пачками, сек (чтобы не занимать писателя)
+        """
+        self.batch_size = batch_size
+        self.pause = pause
+        self.indexed = 0
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    def start(self) -> None:
+        """Запустить индексацию (если индекс уже построен, задача сразу завершится)."""
+        if self.running:
+            return
+        self._task = asyncio.create_task(self._run(), name="search-indexer")
+
+    async def stop(self) -> None:
+        """Остановить индексацию; продолжится со следующего запуска."""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self) -> None:
+        try:
+            while True:
+                rows = await PlanSearchRepository.unindexed(self.batch_size)
+                if rows:
+                    try:
+                        # Отрисовка компактных планов — CPU, не в event loop
+                        terms = await plan_executor.run(plan_search_terms, rows)
+                    except ExecutorBusyError:
+                        # Пользовательские планы важнее: повторим пачку позже
+                        await asyncio.sleep(BUSY_PAUSE)
+                        continue
+                else:
+                    terms = []
+                await PlanSearchRepository.index_batch(terms)
+                if not terms:
+                    break
+                self.indexed += len(terms)
+                await asyncio.sleep(self.pause)
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            logger.exception("Search index backfill failed")
+            return
+        if self.indexed:
+            logger.info(f"Search index built: {self.indexed} plans indexed in background")
+
+
+search_indexer = SearchIndexer(
+    batch_size=settings.search_backfill_batch_size,
+    pause=settings.search_backfill_pause,
+)
@@ -0,0 +1,166 @@
+"""
+Статистика для /admin: итоговые счётчики и тренды по дням.
+
+Счётчики и дневные агрегаты поддерживаются триггерами (миграция 10),
+поэтому /admin читает несколько строк, а не считает COUNT(*) по растущим
+таблицам. Число активных подписчиков со временем меняется без записи в
+БД (подписки истекают), поэтому его раз в ``stats_snapshot_interval``
+секунд записывает StatsRecorder.
+"""
+
+import asyncio
+import logging
+import time
+from dataclasses import dataclass
+from datetime import date, timedelta
+from typing import Any, Dict, List, Optional
+
+from app.config import settings
+from app.database.repository import StatsRepository
+
+logger = logging.getLogger(__name__)
+
+# Окна трендов, дней (включая сегодня)
+TREND_WINDOWS = (7, 30)
+
+# Сколько дней хранятся отметки активности пользователей для DAU
+ACTIVITY_RETENTION_DAYS = 2
+
+
+@dataclass(frozen=True)
+class Trend:
+    """Суммы дневных агрегатов за окно."""
+
+    days: int
+    new_users: int
+    plans: int
+    payments: int
+    avg_dau: float
+    subscribers_change: Optional[int]
+
+
+@dataclass(frozen=True)
+class StatsSummary:
+    """Данные для /admin."""
+
+    users: int
+    active_users: int
+    plans: int
+    today: Dict[str, Any]
+    trends: List[Trend]
+
+
+def _day(days_ago: int = 0) -> str:
+    return (date.today() - timedelta(days=days_ago)).isoformat()
+
+
+def _trend(rows: List[Dict[str, Any]], days: int, subscribers: Optional[int]) -> Trend:
+    since = _day(days - 1)
+    window = [row for row in rows if row["day"] >= since]
+    # DAU собирается с миграции 10: дни без отметок не занижают среднее
+    dau = [row["active_users"] for row in window if row["active_users"]]
+    # Подписчики на начало окна — первая запись в нём
+    first = next((row["subscribers"] for row in window if row["subscribers"] is not None), None)
+    return Trend(
+        days=days,
+        new_users=sum(row["new_users"] for row in window),
+        plans=sum(row["plans"] for row in window),
+        payments=sum(row["payments"] for row in window),
+        avg_dau=sum(dau) / len(dau) if dau else 0.0,
+        subscribers_change=(
+            subscribers - first if subscribers is not None and first is not None else None
+        ),
+    )
+
+
+class StatsService:
+    """Сводка статистики бота."""
+
+    @staticmethod
+    async def record_snapshot() -> None:
+        """Записать число подписчиков за сегодня и удалить старые отметки активности."""
+        await StatsRepository.record_subscribers(_day(), int(time.time()))
+        await StatsRepository.prune_active_users(_day(ACTIVITY_RETENTION_DAYS))
+
+    @staticmethod
+    async def summary() -> StatsSummary:
+        """Итоговые счётчики, сегодняшний день и тренды за TREND_WINDOWS."""
+        counters = await StatsRepository.counters()
+        rows = await StatsRepository.daily(_day(max(TREND_WINDOWS) - 1))
+        today = rows[-1] if rows and rows[-1]["day"] == _day() else {}
+        subscribers = today.get("subscribers")
+        return StatsSummary(
+            users=counters.get("users", 0),
+            active_users=counters.get("active_users", 0),
+            plans=counters.get("plans", 0),
+            today=today,
+            trends=[_trend(rows, days, subscribers) for days in TREND_WINDOWS],
+        )
+
+
+def format_summary(summary: StatsSummary) -> str:
+    """Блок /admin с итогами и трендами."""
+    today = summary.today
+    lines = [
+        f"👥 Пользователей: <b>{summary.users}</b> (активных {summary.active_users})",
+        f"📝 Создано планов: <b>{summary.plans}</b>",
+        f"⭐ Подписчиков: <b>{today.get('subscribers') or 0}</b>",
+        "",
+        f"📅 Сегодня: DAU {today.get('active_users', 0)}, "
+        f"новых {today.get('new_users', 0)}, планов {today.get('plans', 0)}, "
+        f"оплат {today.get('payments', 0)}",
+    ]
+    for trend in summary.trends:
+        line = (
+            f"📈 {trend.days} дн.: новых {trend.new_users}, планов {trend.plans}, "
+            f"оплат {trend.payments}, DAU ср. {trend.avg_dau:.0f}"
+        )
+        if trend.subscribers_change is not None:
+            line += f", подписчики {trend.subscribers_change:+d}"
+        lines.append(line)
+    return "\n".join(lines)
+
+
+class StatsRecorder:
+    """Периодическая запись числа подписчиков (см. StatsService.record_snapshot)."""
+
+    def __init__(self, interval: float):
+        """
+        Args:
+            interval: Пауза между записями, сек
+        """
+        self.interval = interval
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    def start(self) -> None:
+        """Запустить запись (первая — сразу)."""
+        if self.running:
+            return
+        self._task = asyncio.create_task(self._run(), name="stats-recorder")
+
+    async def stop(self) -> None:
+        """Остановить запись."""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                await StatsService.record_snapshot()
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.exception("Stats snapshot failed")
+            await asyncio.sleep(self.interval)
+
+
+stats_recorder = StatsRecorder(interval=settings.stats_snapshot_interval)
@@ -0,0 +1,203 @@
+"""
+Постепенная доставка плана правками одного сообщения.
+
+Фрагменты плана дописываются в сообщение «⏳ Генерирую...» по мере
+готовности. Правки объединяются: не чаще одной в ``stream_edit_interval``
+секунд на сообщение, всё пришедшее за интервал уходит одной правкой —
+так бот не упирается в лимиты Telegram на редактирование. Если текст не
+помещается в сообщение, продолжение отправляется новым сообщением.
+"""
+
+import asyncio
+import logging
+import re
+from typing import List, Optional
+
+from aiogram import Bot
+from aiogram.exceptions import TelegramBadRequest, TelegramRetryAfter
+from aiogram.types import InlineKeyboardMarkup
+
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+# Лимит длины текста сообщения Telegram
+MESSAGE_LIMIT = 4096
+
+_TAG_RE = re.compile(r"<(/?)(\w+)[^>]*>")
+# Самая длинная HTML-сущность, которую пишут планы (&quot;)
+_MAX_ENTITY = 8
+
+
+def _cut_position(text: str, limit: int) -> int:
+    """Позиция разреза не дальше limit: по строке, пробелу, но не внутри тега или сущности."""
+    cut = text.rfind("\n", 0, limit) + 1
+    if cut == 0:
+        cut = text.rfind(" ", 0, limit) + 1
+    if cut == 0:
+        cut = limit
+    tag_start = text.rfind("<", 0, cut)
+    if tag_start > text.rfind(">", 0, cut):
+        cut = tag_start
+    amp = text.rfind("&", max(0, cut - _MAX_ENTITY), cut)
+    if amp != -1 and ";" not in text[amp:cut]:
+        cut = amp
+    # Тег длиннее лимита — режем как есть, лишь бы не зациклиться
+    return cut if cut > 0 else limit
+
+
+def _open_tags(text: str) -> List[str]:
+    """Открывающие теги, не закрытые к концу text (по порядку открытия)."""
+    stack: List[str] = []
+    for match in _TAG_RE.finditer(text):
+        closing, name = match.group(1), match.group(2)
+        if not closing:
+            stack.append(match.group(0))
+        elif stack and _TAG_RE.match(stack[-1]).group(2) == name:
+            stack.pop()
+    return stack
+
+
+def split_chunk(chunk: str, limit: int) -> List[str]:
+    """
+    Разбить фрагмент на части не длиннее limit.
+
+    Режет по границе строки (или слова), не внутри тега или HTML-сущности;
+    незакрытые теги закрываются в конце части и открываются заново в
+    начале следующей, чтобы каждая часть была корректным HTML.
+    """
+    parts: List[str] = []
+    while len(chunk) > limit:
+        reserve = 0
+        while True:
+            cut = _cut_position(chunk, max(1, limit - reserve))
+            head = chunk[:cut]
+            tags = _open_tags(head)
+            closing = "".join(f"</{_TAG_RE.match(tag).group(2)}>" for tag in reversed(tags))
+            if len(head) + len(closing) <= limit or reserve >= limit - 1:
+                break
+            reserve = len(closing)
+        parts.append(head + closing)
+        chunk = "".join(tags) + chunk[cut:]
+    parts.append(chunk)
+    return parts
+
+
+class MessageStream:
+    """Сообщение Telegram, дописываемое по мере генерации."""
+
+    def __init__(
+        self,
+        bot: Bot,
+        chat_id: int,
+        message_id: Optional[int] = None,
+        min_interval: Optional[float] = None,
+        max_length: int = MESSAGE_LIMIT
+    ):
+        """
+        Args:
+            bot: Экземпляр бота
+            chat_id: Чат получателя
+            message_id: Сообщение для правки (None — отправить новое)
+            min_interval: Минимальный интервал между правками, сек
+            max_length: Максимальная длина одного сообщения
+        """
+        self.bot = bot
+        self.chat_id = chat_id
+        self.message_id = message_id
+        self.min_interval = settings.stream_edit_interval if min_interval is None else min_interval
+        self.max_length = max_length
+        self.edits = 0
+        self._text = ""
+        self._sent = ""
+        self._last_edit = float("-inf")
+        self._pending: Optional[asyncio.Task] = None
+        self._lock = asyncio.Lock()
+
+    async def write(self, chunk: str) -> None:
+        """Дописать фрагмент; правка уйдёт не позже чем через min_interval."""
+        # Фрагмент длиннее сообщения режем по безопасным границам, остальные
+        # не режем: в них может быть HTML-разметка
+        for part in split_chunk(chunk, self.max_length):
+            if self._text and len(self._text) + len(part) > self.max_length:
+                await self._settle()
+                self.message_id = None
+                self._text = self._sent = ""
+            self._text += part
+            if self._pending is None:
+                self._pending = asyncio.create_task(self._flush_later())
+
+    async def close(self) -> None:
+        """Доставить остаток текста."""
+        await self._settle()
+
+    async def attach_markup(self, reply_markup: InlineKeyboardMarkup) -> None:
+        """Добавить кнопки к последнему сообщению (после close())."""
+        if self.message_id is None:
+            return
+        await self.bot.edit_message_reply_markup(
+            chat_id=self.chat_id, message_id=self.message_id, reply_markup=reply_markup
+        )
+
+    async def replace(self, text: str) -> None:
+        """Заменить текст текущего сообщения (например, на сообщение об ошибке)."""
+        self._cancel_pending()
+        self._text = text
+        await self._flush()
+
+    def abort(self) -> None:
+        """Отменить отложенную правку (при выключении бота)."""
+        self._cancel_pending()
+
+    def _cancel_pending(self) -> None:
+        if self._pending is not None:
+            self._pending.cancel()
+            self._pending = None
+
+    async def _settle(self) -> None:
+        """Дождаться интервала и отправить всё накопленное."""
+        while True:
+            self._cancel_pending()
+            if self._text == self._sent:
+                return
+            await asyncio.sleep(self._delay())
+            await self._flush()
+
+    def _delay(self) -> float:
+        loop = asyncio.get_running_loop()
+        return max(0.0, self._last_edit + self.min_interval - loop.time())
+
+    async def _flush_later(self) -> None:
+        await asyncio.sleep(self._delay())
+        self._pending = None
+        await self._flush()
+
+    async def _flush(self) -> None:
+        async with self._lock:
+            text = self._text
+            if text == self._sent or not text:
+                return
+            try:
+                if self.message_id is None:
+                    message = await self.bot.send_message(chat_id=self.chat_id, text=text)
+                    self.message_id = message.message_id
+                else:
+                    await self.bot.edit_message_text(
+                        text=text, chat_id=self.chat_id, message_id=self.message_id
+                    )
+            except TelegramRetryAfter as e:
+                # Откладываем правку; текст не теряется — уйдёт следующей
+                logger.warning(f"Stream edit flood control: retry after {e.retry_after}s")
+                self._last_edit = asyncio.get_running_loop().time() + e.retry_after
+                if self._pending is None:
+                    self._pending = asyncio.create_task(self._flush_later())
+                return
+            except TelegramBadRequest as e:
+                if "not modified" not in str(e):
+                    # Сообщение удалено или недоступно для правки — шлём новое
+                    logger.debug(f"Stream edit failed, sending new message: {e}")
+                    message = await self.bot.send_message(chat_id=self.chat_id, text=text)
+                    self.message_id = message.message_id
+            self._sent = text
+            self.edits += 1
+            self._last_edit = asyncio.get_running_loop().time()
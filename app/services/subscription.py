@@ -3,13 +3,45 @@
 Логика проверки и выдачи доступа.
 """
 
+from dataclasses import dataclass
 from datetime import datetime, timedelta
 import logging
+import time
+from typing import Any, Dict, Optional
 
+from app.config import settings
 from app.database.repository import UserRepository
+from app.services.cache import LRUCache, MISSING
+from app.services.expiry import EXPIRED, ExpiryEvent, expiry_scheduler
 
 logger = logging.getLogger(__name__)
 
+# telegram_id -> окончание подписки (секунды Unix) или None, если её нет
+_access_cache = LRUCache(
+    max_size=settings.subscription_cache_size,
+    ttl=settings.subscription_cache_ttl,
+)
+
+
+@dataclass(slots=True)
+class _Load:
+    """Чтения срока подписки из БД, идущие сейчас для одного пользователя."""
+
+    readers: int = 0
+    # Растёт при каждом изменении срока (grant_access, invalidate)
+    version: int = 0
+
+
+# Только пользователи с незавершённым чтением — словарь не растёт без предела
+_loads: Dict[int, _Load] = {}
+
+
+def _bump_version(user_id: int) -> None:
+    """Срок подписки изменился: идущие чтения не должны класть в кэш старое значение."""
+    load = _loads.get(user_id)
+    if load is not None:
+        load.version += 1
+
 
 class SubscriptionService:
     """Сервис подписок."""
@@ -26,31 +58,64 @@ class SubscriptionService:
             True, если подписка активна (или пользователь админ/тестировщик)
             False, если подписка истекла
         """
-        user = await UserRepository.get_by_telegram_id(user_id)
-        if not user:
-            return False
-
-        # Проверяем поле subscription_end_date
-        sub_end = user.get("subscription_end_date")
+        sub_end = _access_cache.get(user_id)
+        if sub_end is MISSING:
+            sub_end = await SubscriptionService._load_and_cache(user_id)
 
         # Если подписки нет вообще
         if not sub_end:
             return False
 
-        # Если это строка (из SQLite), преобразуем в datetime
-        if isinstance(sub_end, str):
-            try:
-                # SQLite хранит TIMESTAMP как строку 'YYYY-MM-DD HH:MM:SS'
-                sub_end = datetime.strptime(sub_end.split(".")[0], "%Y-%m-%d %H:%M:%S")
-            except ValueError:
-                logger.error(f"Error parsing date: {sub_end}")
-                return False
-
         # Проверяем срок
-        if sub_end > datetime.now():
-            return True
+        return sub_end > time.time()
+
+    @staticmethod
+    async def _load_and_cache(user_id: int) -> Optional[int]:
+        """
+        Прочитать срок подписки и положить его в кэш.
+
+        Если пока шло чтение срок изменили (оплата, сброс), в кэше уже
+        новое значение или его там нет намеренно — прочитанное не кладём.
+        """
+        load = _loads.setdefault(user_id, _Load())
+        load.readers += 1
+        version = load.version
+        try:
+            sub_end = await SubscriptionService._load_expiry(user_id)
+            if load.version == version:
+                _access_cache.set(user_id, sub_end)
+        finally:
+            load.readers -= 1
+            if not load.readers:
+                _loads.pop(user_id, None)
+        return sub_end
 
-        return False
+    @staticmethod
+    async def _load_expiry(user_id: int) -> Optional[int]:
+        """Окончание подписки из БД (секунды Unix) или None."""
+        user = await UserRepository.get_by_telegram_id(user_id)
+        return user.get("subscription_end_date") if user else None
+
+    @staticmethod
+    def invalidate(user_id: int) -> None:
+        """
+        Сбросить закэшированный срок подписки.
+
+        Нужно вызывать после изменения subscription_end_date в обход
+        grant_access (ручные правки, внешние скрипты).
+        """
+        _bump_version(user_id)
+        _access_cache.invalidate(user_id)
+
+    @staticmethod
+    def clear_cache() -> None:
+        """Полностью очистить кэш подписок."""
+        _access_cache.clear()
+
+    @staticmethod
+    def cache_stats() -> Dict[str, Any]:
+        """Счётчики попаданий/промахов кэша подписок."""
+        return _access_cache.stats()
 
     @staticmethod
     async def grant_access(user_id: int, days: int = 30) -> datetime:
@@ -64,17 +129,13 @@ class SubscriptionService:
         Returns:
             Новая дата окончания подписки
         """
-        user = await UserRepository.get_by_telegram_id(user_id)
+        # Платёж может прийти от пользователя, которого ещё нет в БД
+        user = await UserRepository.upsert(user_id)
 
         now = datetime.now()
-        current_end = user.get("subscription_end_date") if user else None
-
-        # Парсим текущую дату, если она есть
-        if isinstance(current_end, str):
-            try:
-                current_end = datetime.strptime(current_end.split(".")[0], "%Y-%m-%d %H:%M:%S")
-            except ValueError:
-                current_end = None
+        current_end = user.get("subscription_end_date")
+        if current_end:
+            current_end = datetime.fromtimestamp(current_end)
 
         # Если подписка активна, продлеваем её. Иначе начинаем с сейчас.
         if current_end and current_end > now:
@@ -83,6 +144,19 @@ class SubscriptionService:
             new_end = now + timedelta(days=days)
 
         await UserRepository.update_subscription(user_id, new_end)
+        new_end_ts = int(new_end.timestamp())
+        _bump_version(user_id)
+        _access_cache.set(user_id, new_end_ts)
+        expiry_scheduler.schedule(user_id, new_end_ts)
         logger.info(f"User {user_id} subscription updated until {new_end}")
 
         return new_end
+
+
+async def _on_expiry_event(event: ExpiryEvent) -> None:
+    """Истёкшая подписка больше не нужна в кэше."""
+    if event.kind == EXPIRED:
+        SubscriptionService.invalidate(event.user_id)
+
+
+expiry_scheduler.subscribe(_on_expiry_event)
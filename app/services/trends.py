@@ -0,0 +1,285 @@
+"""
+Популярные ниши и ЦА (/top) с ограниченной памятью.
+
+Каждый запрос на генерацию разбирается parse_user_input, ниша и ЦА
+учитываются в count-min sketch текущего часа, а рядом держится top-K
+кандидатов с наибольшей оценкой (heavy hitters). Память не зависит от
+числа разных ниш: width × depth счётчиков и K ключей на вид.
+
+Считаются нормализованные ключи («Фитнес!» и «фитнес» — одна ниша), а для
+/top и прогрева кэша (см. prewarm.py) у каждого ключа хранится самое
+частое исходное написание.
+
+Раз в ``trends_flush_interval`` секунд top-K текущего часа записывается в
+niche_trends; закончившийся час сбрасывается окончательно, и счёт
+начинается заново. При запуске счёт текущего часа продолжается с
+записанного в БД, поэтому перезапуск не занижает оценки часа. Сутки — сумма почасовых top-K, поэтому ниши, ни разу
+не попавшие в top-K часа, в суточный рейтинг не входят.
+"""
+
+import asyncio
+import logging
+import time
+from typing import Dict, List, Optional, Tuple
+
+from app.config import settings
+from app.database.repository import TrendRepository
+from app.services.planner import DEFAULT_AUDIENCE, normalize_text, parse_user_input
+
+logger = logging.getLogger(__name__)
+
+HOUR = 60 * 60
+DAY = 24 * HOUR
+
+NICHE = "niche"
+AUDIENCE = "audience"
+KINDS = (NICHE, AUDIENCE)
+
+# Ключи длиннее — описание своими словами, а не ниша: такие запросы не
+# учитываются (обрезка склеила бы разные запросы под выдуманным ключом)
+MAX_KEY_LENGTH = 64
+# Написаний, которые помнятся для одного ключа
+MAX_LABELS = 4
+
+_MASK_64 = (1 << 64) - 1
+_MASK_32 = (1 << 32) - 1
+# Множитель Фибоначчи-хеширования (2^32 / φ)
+_GOLDEN_32 = 0x9E3779B1
+
+
+class CountMinSketch:
+    """Count-min sketch с консервативным обновлением."""
+
+    def __init__(self, width: int, depth: int):
+        """
+        Args:
+            width: Счётчиков в строке (ошибка оценки ~ total / width)
+            depth: Число строк (вероятность большой ошибки ~ e^-depth)
+        """
+        self.width = width
+        self.depth = depth
+        self.total = 0
+        self._rows = [[0] * width for _ in range(depth)]
+
+    def _indexes(self, key: str) -> List[int]:
+        # Двойное хеширование (Kirsch–Mitzenmacher): одна hash() на ключ.
+        # Индекс берётся из старших битов перемешанного значения: остаток
+        # от деления на степень двойки зависел бы лишь от младших битов
+        # h1 и h2, и ключ совпадал бы с частым сразу во всех строках
+        h = hash(key) & _MASK_64
+        h1, h2 = h & _MASK_32, (h >> 32) | 1
+        return [
+            ((((h1 + i * h2) * _GOLDEN_32) & _MASK_32) * self.width) >> 32
+            for i in range(self.depth)
+        ]
+
+    def add(self, key: str, count: int = 1) -> int:
+        """Учесть ключ; возвращает новую оценку его частоты."""
+        self.total += count
+        indexes = self._indexes(key)
+        estimate = min(row[i] for row, i in zip(self._rows, indexes)) + count
+        # Консервативно: растут только счётчики ниже новой оценки
+        for row, i in zip(self._rows, indexes):
+            if row[i] < estimate:
+                row[i] = estimate
+        return estimate
+
+    def estimate(self, key: str) -> int:
+        """Оценка частоты сверху."""
+        return min(row[i] for row, i in zip(self._rows, self._indexes(key)))
+
+
+class HeavyHitters:
+    """Top-K самых частых ключей поверх CountMinSketch."""
+
+    def __init__(self, k: int, width: int, depth: int):
+        self.k = k
+        self.sketch = CountMinSketch(width, depth)
+        self._top: Dict[str, int] = {}
+        # Ключ из top-K -> счётчики его написаний (не больше MAX_LABELS)
+        self._labels: Dict[str, Dict[str, int]] = {}
+
+    def add(self, key: str, count: int = 1, label: Optional[str] = None) -> None:
+        """
+        Учесть ключ.
+
+        Args:
+            key: Нормализованный ключ
+            count: Сколько раз
+            label: Исходное написание (для показа)
+        """
+        estimate = self.sketch.add(key, count)
+        if key in self._top or len(self._top) < self.k:
+            self._top[key] = estimate
+            self._add_label(key, label, count)
+            return
+        # K небольшое — линейный поиск минимума дешевле поддержки кучи
+        weakest = min(self._top, key=self._top.__getitem__)
+        if estimate > self._top[weakest]:
+            del self._top[weakest]
+            self._labels.pop(weakest, None)
+            self._top[key] = estimate
+            self._add_label(key, label, count)
+
+    def _add_label(self, key: str, label: Optional[str], count: int) -> None:
+        if label is None:
+            return
+        labels = self._labels.setdefault(key, {})
+        if label in labels or len(labels) < MAX_LABELS:
+            labels[label] = labels.get(label, 0) + count
+            return
+        # Misra–Gries: новое написание «гасит» по счётчику у остальных, так
+        # самое частое не вытесняется редкими
+        for other in list(labels):
+            labels[other] -= count
+            if labels[other] <= 0:
+                del labels[other]
+
+    def label(self, key: str) -> str:
+        """Самое частое написание ключа (сам ключ, если написаний нет)."""
+        labels = self._labels.get(key)
+        return max(labels, key=labels.__getitem__) if labels else key
+
+    def top(self, n: Optional[int] = None) -> List[Tuple[str, int]]:
+        """Ключи по убыванию оценки."""
+        items = sorted(self._top.items(), key=lambda item: (-item[1], item[0]))
+        return items[:n] if n is not None else items
+
+    def __len__(self) -> int:
+        return len(self._top)
+
+
+def trend_key(text: str) -> Optional[str]:
+    """
+    Ключ ниши/ЦА: «Фитнес!» и «фитнес» считаются вместе.
+
+    Returns:
+        Ключ или None — текст пуст или длиннее MAX_KEY_LENGTH
+    """
+    key = normalize_text(text)
+    return key if key and len(key) <= MAX_KEY_LENGTH else None
+
+
+class TrendTracker:
+    """Почасовые heavy hitters ниш и ЦА с периодическим сбросом в БД."""
+
+    def __init__(self, k: int, width: int, depth: int, flush_interval: float, retention: float):
+        """
+        Args:
+            k: Размер top-K на вид и час
+            width: Ширина count-min sketch
+            depth: Глубина count-min sketch
+            flush_interval: Пауза между сбросами в БД, сек
+            retention: Сколько секунд хранить часы в БД
+        """
+        self.k = k
+        self.width = width
+        self.depth = depth
+        self.flush_interval = flush_interval
+        self.retention = retention
+        self._bucket = self._current_bucket()
+        self._hitters = self._new_hitters()
+        # Закончившиеся часы, ещё не записанные в БД
+        self._finished: List[Tuple[str, int, str, str, int]] = []
+        self._task: Optional[asyncio.Task] = None
+
+    @staticmethod
+    def _current_bucket() -> int:
+        now = int(time.time())
+        return now - now % HOUR
+
+    def _new_hitters(self) -> Dict[str, HeavyHitters]:
+        return {kind: HeavyHitters(self.k, self.width, self.depth) for kind in KINDS}
+
+    def _rows(self) -> List[Tuple[str, int, str, str, int]]:
+        return [
+            (kind, self._bucket, key, hitters.label(key), count)
+            for kind, hitters in self._hitters.items()
+            for key, count in hitters.top()
+        ]
+
+    def _roll(self) -> None:
+        bucket = self._current_bucket()
+        if bucket != self._bucket:
+            self._finished.extend(self._rows())
+            self._bucket = bucket
+            self._hitters = self._new_hitters()
+
+    def record(self, user_input: str) -> None:
+        """Учесть нишу и ЦА запроса."""
+        niche, target_audience = parse_user_input(user_input)
+        self._roll()
+        key = trend_key(niche)
+        if key:
+            self._hitters[NICHE].add(key, label=niche)
+        # ЦА по умолчанию ничего не говорит о спросе
+        key = trend_key(target_audience)
+        if key and target_audience != DEFAULT_AUDIENCE:
+            self._hitters[AUDIENCE].add(key, label=target_audience)
+
+    def hourly(self, kind: str, limit: int = 10) -> List[Tuple[str, int]]:
+        """Top за текущий час (из памяти): пары (написание, оценка)."""
+        self._roll()
+        hitters = self._hitters[kind]
+        return [(hitters.label(key), count) for key, count in hitters.top(limit)]
+
+    async def daily(self, kind: str, limit: int = 10) -> List[Tuple[str, int]]:
+        """Top за последние сутки (сумма почасовых top-K из БД): пары (написание, оценка)."""
+        await self.flush()
+        return await TrendRepository.top(kind, self._bucket - DAY + HOUR, limit)
+
+    async def flush(self) -> None:
+        """Записать top-K текущего и закончившихся часов в БД."""
+        self._roll()
+        finished, self._finished = self._finished, []
+        rows = finished + self._rows()
+        if not rows:
+            return
+        try:
+            await TrendRepository.save(rows)
+        except Exception:
+            # Закончившиеся часы больше нигде не хранятся — попробуем в следующий раз
+            self._finished = finished + self._finished
+            raise
+
+    async def start(self) -> None:
+        """Продолжить счёт текущего часа из БД и запустить периодический сброс."""
+        if self._task is not None and not self._task.done():
+            return
+        self._roll()
+        # Иначе первый сброс после перезапуска заменил бы оценки часа меньшими
+        for kind, key, label, count in await TrendRepository.hour(self._bucket):
+            if kind in self._hitters:
+                self._hitters[kind].add(key, count, label=label)
+        self._task = asyncio.create_task(self._run(), name="trends-flusher")
+
+    async def stop(self) -> None:
+        """Остановить сброс и записать накопленное."""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await self.flush()
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            try:
+                await self.flush()
+                await TrendRepository.purge(self._bucket - int(self.retention))
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.exception("Trends flush failed")
+
+
+niche_trends = TrendTracker(
+    k=settings.trends_top_k,
+    width=settings.trends_sketch_width,
+    depth=settings.trends_sketch_depth,
+    flush_interval=settings.trends_flush_interval,
+    retention=settings.trends_retention_days * DAY,
+)
@@ -0,0 +1,108 @@
+"""
+Бенчмарк разбора запросов пользователя.
+
+Сравнивает с прежним parse_user_input (два некомпилированных re.search
+с re.IGNORECASE, только ниша и ЦА):
+
+- parse_user_input — те же выражения, скомпилированные заранее; горячий
+  путь, где нужны только ниша и ЦА;
+- parse_request — однопроходный разбор всех полей (ниша, ЦА, тон,
+  площадки, частота, горизонт).
+
+Замер на всём корпусе и отдельно на запросах вида «ниша: X, ЦА: Y».
+parse_request в несколько раз медленнее двух выражений: он не ради
+скорости, а ради полей, которых выражения не видят, многострочных
+запросов и слов вроде «улица» (не «ЦА»). Поэтому он вызывается только
+там, где эти поля нужны, — при генерации плана.
+
+Запуск:
+    python -m benchmarks.bench_parser
+"""
+
+import re
+import time
+from typing import Tuple
+
+from app.services.planner import parse_request, parse_user_input
+
+CORPUS = [
+    "ниша: фитнес, ЦА: женщины 25-35",
+    "ниша кулинария, ЦА молодёжь",
+    "кулинария для мам",
+    "Ниша: IT-курсы; ЦА: джуниоры, студенты",
+    "продвижение кофейни в телеграме на месяц, 2 поста в день",
+    "Привет!\nниша: йога\nЦА: офисные работники 30+\nтон: дружелюбный\nплатформа: Инстаграм",
+    "хочу план для салона красоты на 2 недели, 3 поста в неделю, стиль лёгкий",
+    "ниша: недвижимость, ЦА: семьи с детями, горизонт: 90",
+    "  ниша:   ремонт квартир  ,  ЦА:  владельцы новостроек   ",
+    "тема: английский для детей\nаудитория: родители школьников\nчастота: ежедневно",
+    "Магазин handmade-украшений, вк, ежедневно",
+    "ниша: психология отношений, ЦА: женщины 30-45, тон: экспертный, на 30 дней",
+    "ветеринарная клиника\nЦА: владельцы кошек и собак\nсрок: 14",
+    "стоматология, ЦА: взрослые, youtube, 1 раз в неделю",
+    "ниша - путешествия по России, ЦА - пенсионеры",
+    "Бухгалтерские услуги для ИП и малого бизнеса. Нужен контент-план на квартал.",
+]
+
+# Запросы вида «ниша: X, ЦА: Y» (кнопки-примеры, подсказка в /start)
+SIMPLE = [
+    "ниша: фитнес, ЦА: женщины 25-35",
+    "ниша кулинария, ЦА молодёжь",
+    "ниша: программирование",
+    "Ниша: IT-курсы, ЦА: начинающие разработчики",
+    "ниша - путешествия по России, ЦА - пенсионеры",
+]
+
+MIN_SECONDS = 0.5
+REPEATS = 5
+
+
+def legacy_parse(text: str) -> Tuple[str, str]:
+    """Прежний parse_user_input: два некомпилированных re.search."""
+    niche = ""
+    target_audience = ""
+    niche_match = re.search(r'ниша[:\s]+([^,]+)', text, re.IGNORECASE)
+    ta_match = re.search(r'ЦА[:\s]+(.+)', text, re.IGNORECASE)
+    if niche_match:
+        niche = niche_match.group(1).strip()
+    if ta_match:
+        target_audience = ta_match.group(1).strip()
+    if not niche:
+        niche = text.strip()
+    if not target_audience:
+        target_audience = "широкая аудитория"
+    return niche, target_audience
+
+
+def measure(fn, corpus) -> float:
+    """Микросекунд на сообщение (лучший из REPEATS замеров)."""
+    best = float("inf")
+    for _ in range(REPEATS):
+        count = 0
+        started = time.perf_counter()
+        elapsed = 0.0
+        while elapsed < MIN_SECONDS / REPEATS:
+            for _ in range(50):
+                for text in corpus:
+                    fn(text)
+            count += 50 * len(corpus)
+            elapsed = time.perf_counter() - started
+        best = min(best, elapsed / count)
+    return best * 1e6
+
+
+def main() -> None:
+    for title, corpus in (("Весь корпус", CORPUS), ("«ниша: X, ЦА: Y»", SIMPLE)):
+        legacy = measure(legacy_parse, corpus)
+        print(f"{title}: {len(corpus)} сообщений")
+        for name, fn in (
+            ("прежний parse_user_input", legacy_parse),
+            ("parse_user_input", parse_user_input),
+            ("parse_request, все поля", parse_request),
+        ):
+            us = legacy if fn is legacy_parse else measure(fn, corpus)
+            print(f"  {name:<26} {us:>7.2f} мкс/сообщ. ({us / legacy:.2f}x к прежнему)")
+
+
+if __name__ == "__main__":
+    main()
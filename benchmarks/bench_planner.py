@@ -0,0 +1,88 @@
+"""
+Бенчмарк отрисовки контент-планов: пропускная способность на план-день.
+
+Сравнивает скомпилированные шаблоны с прежним путём (str.format и
+strftime на каждый день) для горизонтов 7/14/30/90 дней, а также
+пакетную генерацию (generate_content_plans) для пакетов разного размера.
+
+Запуск:
+    python -m benchmarks.bench_planner
+"""
+
+import random
+import time
+from datetime import date, timedelta
+
+from app.services.planner import (
+    CONTENT_TEMPLATES,
+    SUPPORTED_HORIZONS,
+    WEEKDAYS_RU,
+    CompactPlan,
+    choose_templates,
+    generate_content_plans,
+    render_plan,
+)
+
+NICHE = "фитнес"
+AUDIENCE = "женщины 25-35"
+MIN_SECONDS = 0.5
+
+
+def legacy_plan(days: int, rng: random.Random) -> str:
+    """Прежняя реализация: str.format и strftime на каждый день."""
+    start_date = date.today() + timedelta(days=1)
+    content_types = list(CONTENT_TEMPLATES.keys())
+    lines = [f"📋 <b>Контент-план на {days} дней</b>", "", "─" * 25, ""]
+    for i in range(days):
+        day_date = start_date + timedelta(days=i)
+        template = rng.choice(CONTENT_TEMPLATES[content_types[i % len(content_types)]])
+        content = template.format(niche=NICHE, topic=NICHE, target_audience=AUDIENCE)
+        lines.append(f"<b>День {i+1}</b> • {WEEKDAYS_RU[day_date.weekday()]}, {day_date.strftime('%d.%m')}")
+        lines.append(content)
+        lines.append("")
+    return "\n".join(lines)
+
+
+def compiled_plan(days: int, seed: int) -> str:
+    """Текущая реализация: выбор шаблонов по seed и сборка из фрагментов."""
+    plan = CompactPlan(NICHE, AUDIENCE, date.today() + timedelta(days=1), seed, choose_templates(seed, days))
+    return "".join(render_plan(plan))
+
+
+def measure(fn, days: int) -> float:
+    """План-дней в секунду."""
+    plans = 0
+    started = time.perf_counter()
+    elapsed = 0.0
+    while elapsed < MIN_SECONDS:
+        for _ in range(100):
+            fn(days, plans)
+            plans += 1
+        elapsed = time.perf_counter() - started
+    return plans * days / elapsed
+
+
+def main() -> None:
+    rng = random.Random(0)
+    print(f"{'дней':>6} {'str.format':>14} {'compiled':>14} {'ускорение':>10}")
+    for days in SUPPORTED_HORIZONS:
+        legacy = measure(lambda d, _: legacy_plan(d, rng), days)
+        compiled = measure(compiled_plan, days)
+        print(f"{days:>6} {legacy:>12,.0f}/с {compiled:>12,.0f}/с {compiled / legacy:>9.2f}x")
+
+    print()
+    print(f"{'пакет':>6} {'планов/с':>14} {'мс на пакет':>12}")
+    niches = ["фитнес", "кулинария", "IT", "образование", "кофейня"]
+    for size in (1, 10, 100, 1000):
+        requests = [f"ниша: {niches[i % len(niches)]}, ЦА: аудитория {i % 7}" for i in range(size)]
+        batches = 0
+        started = time.perf_counter()
+        while time.perf_counter() - started < MIN_SECONDS:
+            generate_content_plans(requests)
+            batches += 1
+        elapsed = time.perf_counter() - started
+        print(f"{size:>6} {batches * size / elapsed:>12,.0f}/с {elapsed / batches * 1000:>12.2f}")
+
+
+if __name__ == "__main__":
+    main()
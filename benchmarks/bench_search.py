@@ -0,0 +1,77 @@
+"""
+Бенчмарк поиска по планам (/search) на большой таблице.
+
+Заполняет временную БД N планами (по ~50 на пользователя, термы
+считаются как при сохранении, триггеры переносят их в индекс) и измеряет задержку PlanSearchRepository.search —
+точным словом, началом слова и несколькими словами.
+
+Запуск:
+    python -m benchmarks.bench_search [N]   # по умолчанию 1 000 000 планов
+"""
+
+import asyncio
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+
+WORDS = (
+    "фитнес марафон бег йога кофейня кулинария маркетинг стоматология ремонт "
+    "квартир психология отношений путешествия курсы английский недвижимость"
+).split()
+AUDIENCES = ["мамы", "студенты", "офисные работники", "пенсионеры", "владельцы бизнеса"]
+CONTENT = "День 1: подготовка к марафону за 30 дней — бег, питание и восстановление"
+QUERIES = ["фитнес", "мара", "подготовка марафону"]
+ROWS_PER_INSERT = 50_000
+RUNS = 300
+
+
+async def main(total: int) -> None:
+    from app.config import settings
+    from app.database.connection import close_db, get_connection, init_db
+    from app.database.fts import search_terms
+    from app.database.repository import PlanSearchRepository
+
+    settings.db_path = os.path.join(tempfile.mkdtemp(), "bench_search.sqlite3")
+    await init_db()
+    try:
+        conn = await get_connection()
+        rng = random.Random(0)
+        users = max(1, total // 50)
+        started = time.perf_counter()
+        for offset in range(0, total, ROWS_PER_INSERT):
+            rows = [
+                (
+                    rng.randrange(users),
+                    " ".join(rng.sample(WORDS, 2)),
+                    rng.choice(AUDIENCES),
+                    CONTENT if rng.random() < 0.2 else "",
+                )
+                for _ in range(min(ROWS_PER_INSERT, total - offset))
+            ]
+            await conn.executemany(
+                """INSERT INTO content_plans (user_id, niche, target_audience, plan_content, search_terms)
+                   VALUES (?, ?, ?, ?, ?)""",
+                [row + (search_terms(*row),) for row in rows]
+            )
+            await conn.commit()
+        print(f"Планов: {total:,}, пользователей: {users:,}, заполнение {time.perf_counter() - started:.0f}с")
+
+        print(f"{'запрос':<24} {'p50, мс':>8} {'p99, мс':>8}")
+        for query in QUERIES:
+            timings = []
+            for _ in range(RUNS):
+                user_id = rng.randrange(users)
+                t = time.perf_counter()
+                await PlanSearchRepository.search(user_id, query, limit=6)
+                timings.append((time.perf_counter() - t) * 1000)
+            timings.sort()
+            print(f"{query:<24} {statistics.median(timings):>8.2f} {timings[int(len(timings) * 0.99)]:>8.2f}")
+    finally:
+        await close_db()
+
+
+if __name__ == "__main__":
+    asyncio.run(main(int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000))
@@ -1,8 +1,8 @@
 #!/bin/bash
 set -e
 
-# Здесь можно добавить миграции, если появятся (например, alembic)
-# python -m alembic upgrade head
+# Миграции схемы БД (идемпотентны, прерванный перенос продолжается)
+python -m app.database.migrations
 
 # Запуск бота
 exec python app/main.py
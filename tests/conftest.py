@@ -50,6 +50,10 @@ def mock_message_short():
 async def temp_db():
     """Временная база данных для тестов."""
     from app.database.connection import init_db, close_db
+    from app.services.subscription import SubscriptionService
+
+    # Кэш подписок не должен переживать пересоздание БД
+    SubscriptionService.clear_cache()
 
     # Используем in-memory базу
     original_path = os.environ.get("DB_PATH")
@@ -7,6 +7,7 @@ from unittest.mock import AsyncMock, MagicMock
 
 from app.handlers.admin import cmd_admin_stats, cmd_broadcast
 from app.config import settings
+from app.services.broadcast import BroadcastService
 
 
 @pytest.fixture
@@ -14,8 +15,11 @@ def mock_admin_message():
     """Мок сообщения от админа."""
     message = MagicMock()
     message.from_user.id = 123456789  # ID из conftest/env
+    message.chat.id = 123456789
     message.answer = AsyncMock()
+    message.answer.return_value.message_id = 1
     message.bot.send_message = AsyncMock()
+    message.bot.edit_message_text = AsyncMock()
     return message
 
 
@@ -66,10 +70,13 @@ class TestAdminHandlers:
         await UserRepository.get_or_create(222, "user2")
 
         await cmd_broadcast(mock_admin_message)
+        await BroadcastService.wait_all()
 
         # Проверяем отправку
         assert mock_admin_message.bot.send_message.call_count == 2
         mock_admin_message.answer.assert_called()  # Отчет админу
+        report = mock_admin_message.bot.edit_message_text.call_args.kwargs["text"]
+        assert "Рассылка завершена" in report
 
     @pytest.mark.asyncio
     async def test_broadcast_no_text(self, mock_admin_message):
@@ -82,3 +89,141 @@ class TestAdminHandlers:
         # Проверяем сообщение об ошибке
         mock_admin_message.answer.assert_called_with("⚠️ Использование: <code>/broadcast Текст сообщения</code>")
         mock_admin_message.bot.send_message.assert_not_called()
+
+
+class TestBroadcastService:
+    """Тесты движка рассылок."""
+
+    @staticmethod
+    async def _create_users(*user_ids):
+        from types import SimpleNamespace
+        from app.database.repository import UserRepository
+
+        await UserRepository.upsert_many(
+            SimpleNamespace(id=uid, username=None, first_name=None) for uid in user_ids
+        )
+
+    @pytest.mark.asyncio
+    async def test_blocked_users_marked_inactive(self, temp_db):
+        """Тест что заблокировавшие бота пользователи становятся неактивными."""
+        from aiogram.exceptions import TelegramForbiddenError
+        from app.database.repository import BroadcastRepository, UserRepository
+
+        await self._create_users(1, 2, 3)
+        bot = MagicMock()
+        bot.edit_message_text = AsyncMock()
+
+        async def send_message(chat_id, text):
+            if chat_id == 2:
+                raise TelegramForbiddenError(method=MagicMock(), message="bot was blocked by the user")
+
+        bot.send_message = AsyncMock(side_effect=send_message)
+
+        job_id = await BroadcastService.create_job("привет", 10, 1, 3)
+        await BroadcastService.start(bot, job_id)
+
+        job = await BroadcastRepository.get(job_id)
+        assert job["status"] == "done"
+        assert (job["sent"], job["blocked"], job["failed"]) == (2, 1, 0)
+        assert (await UserRepository.get_by_telegram_id(2))["is_active"] == 0
+        assert await UserRepository.count_active() == 2
+
+    @pytest.mark.asyncio
+    async def test_retry_after_is_retried(self, temp_db, monkeypatch):
+        """Тест повторной отправки после RetryAfter."""
+        from aiogram.exceptions import TelegramRetryAfter
+        from app.services import broadcast
+
+        monkeypatch.setattr(broadcast._bucket, "pause", MagicMock())
+        await self._create_users(1)
+        bot = MagicMock()
+        bot.edit_message_text = AsyncMock()
+        bot.send_message = AsyncMock(side_effect=[
+            TelegramRetryAfter(method=MagicMock(), message="flood", retry_after=0),
+            None,
+        ])
+
+        job_id = await BroadcastService.create_job("привет", 10, 1, 1)
+        await BroadcastService.start(bot, job_id)
+
+        assert bot.send_message.call_count == 2
+        broadcast._bucket.pause.assert_called_once_with(0)
+
+    @pytest.mark.asyncio
+    async def test_resume_from_last_acknowledged_user(self, temp_db):
+        """Тест продолжения рассылки после перезапуска."""
+        from app.database.repository import BroadcastRepository
+
+        await self._create_users(1, 2, 3, 4)
+        job_id = await BroadcastService.create_job("привет", 10, 1, 4)
+        # Как будто до падения процесса успели подтвердить пользователей 1 и 2
+        await BroadcastRepository.ack_batch(job_id, 2, sent=2, failed=0, blocked=0)
+
+        bot = MagicMock()
+        bot.edit_message_text = AsyncMock()
+        bot.send_message = AsyncMock()
+
+        assert await BroadcastService.resume_all(bot) == 1
+        await BroadcastService.wait_all()
+
+        sent_to = [call.kwargs["chat_id"] for call in bot.send_message.call_args_list]
+        assert sent_to == [3, 4]
+        job = await BroadcastRepository.get(job_id)
+        assert job["sent"] == 4
+        assert job["status"] == "done"
+
+    @pytest.mark.asyncio
+    async def test_db_error_mid_run_does_not_stop_broadcast(self, temp_db, monkeypatch):
+        """Тест что сбой записи прогресса логируется, а счётчики уходят со следующей страницей."""
+        from app.config import settings
+        from app.database.repository import BroadcastRepository
+
+        monkeypatch.setattr(settings, "broadcast_batch_size", 1)
+        ack_batch = BroadcastRepository.ack_batch
+        failures = []
+
+        async def flaky_ack_batch(*args, **kwargs):
+            if not failures:
+                failures.append(1)
+                raise RuntimeError("database is locked")
+            return await ack_batch(*args, **kwargs)
+
+        monkeypatch.setattr(BroadcastRepository, "ack_batch", flaky_ack_batch)
+        await self._create_users(1, 2, 3)
+        bot = MagicMock()
+        bot.edit_message_text = AsyncMock()
+        bot.send_message = AsyncMock()
+
+        job_id = await BroadcastService.create_job("привет", 10, 1, 3)
+        await BroadcastService.start(bot, job_id)
+
+        assert failures
+        assert [call.kwargs["chat_id"] for call in bot.send_message.call_args_list] == [1, 2, 3]
+        job = await BroadcastRepository.get(job_id)
+        assert job["status"] == "done"
+        assert (job["sent"], job["last_user_id"]) == (3, 3)
+        assert "завершена" in bot.edit_message_text.call_args.kwargs["text"]
+
+    @pytest.mark.asyncio
+    async def test_failure_reported_and_job_left_for_resume(self, temp_db, monkeypatch):
+        """Тест что при падении рассылки админ получает отчёт, а задание продолжится после перезапуска."""
+        from app.database.repository import BroadcastRepository, UserRepository
+
+        async def broken_iter_ids(*args, **kwargs):
+            raise RuntimeError("disk I/O error")
+            yield
+
+        monkeypatch.setattr(UserRepository, "iter_ids", broken_iter_ids)
+        bot = MagicMock()
+        # Сообщение прогресса удалено — отчёт приходит новым сообщением
+        bot.edit_message_text = AsyncMock(side_effect=RuntimeError("message to edit not found"))
+        bot.send_message = AsyncMock()
+
+        job_id = await BroadcastService.create_job("привет", 10, 1, 3)
+        await BroadcastService.start(bot, job_id)
+
+        job = await BroadcastRepository.get(job_id)
+        assert job["status"] == "running"
+        kwargs = bot.send_message.call_args.kwargs
+        assert kwargs["chat_id"] == 10
+        assert "прервана" in kwargs["text"]
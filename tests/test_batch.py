@@ -0,0 +1,111 @@
+"""
+Тесты для пакетной генерации планов.
+"""
+
+import io
+from datetime import date
+
+import pytest
+from unittest.mock import AsyncMock, MagicMock
+
+from app.config import settings
+from app.handlers.batch import cmd_batch, handle_batch_file, split_batch
+from app.services.planner import generate_content_plan, generate_content_plans, plan_cache
+
+
+def _message() -> MagicMock:
+    message = MagicMock()
+    message.answer = AsyncMock()
+    message.answer_document = AsyncMock()
+    return message
+
+
+def _sent_document(message: MagicMock) -> str:
+    file = message.answer_document.call_args[0][0]
+    return file.data.decode("utf-8")
+
+
+class TestGenerateContentPlans:
+    """Тесты пакетного API."""
+
+    def test_batch_matches_single_generation(self):
+        """Тест что пакет даёт те же планы, что и поштучная генерация."""
+        plan_cache.clear()
+        requests = ["ниша: фитнес, ЦА: мамы", "ниша: кофейня на 14 дней", "ниша: фитнес, ЦА: мамы"]
+        seeds = [1, 2, 3]
+
+        plans = generate_content_plans(requests, seeds)
+
+        assert plans == [generate_content_plan(r, seed) for r, seed in zip(requests, seeds)]
+        assert "на 14 дней" in plans[1]
+
+    def test_shared_start_date(self):
+        """Тест общей даты начала пакета."""
+        plans = generate_content_plans(["ниша: а", "ниша: б"], start_date=date(2026, 1, 5))
+
+        assert all("Понедельник, 05.01" in plan for plan in plans)
+
+    def test_seeds_must_match_requests(self):
+        """Тест проверки длины seeds."""
+        with pytest.raises(ValueError):
+            generate_content_plans(["ниша: а"], seeds=[1, 2])
+
+
+class TestBatchHandlers:
+    """Тесты обработчиков /batch."""
+
+    def test_split_batch(self):
+        """Тест разбора списка запросов."""
+        assert split_batch("ниша: а\n\n  # комментарий\n ниша: б \r\n") == ["ниша: а", "ниша: б"]
+
+    @pytest.mark.asyncio
+    async def test_batch_command_returns_one_document(self):
+        """Тест что пакет из команды приходит одним файлом."""
+        message = _message()
+        command = MagicMock(args="ниша: фитнес, ЦА: мамы\nниша: кофейня")
+
+        await cmd_batch(message, command)
+
+        document = _sent_document(message)
+        assert "#1. ниша: фитнес, ЦА: мамы" in document
+        assert "#2. ниша: кофейня" in document
+        assert "<b>" not in document
+        assert message.answer_document.call_args.kwargs["caption"] == "📦 Готово, планов: 2"
+
+    @pytest.mark.asyncio
+    async def test_batch_limit(self):
+        """Тест ограничения размера пакета."""
+        message = _message()
+        command = MagicMock(args="\n".join(f"ниша: {i}" for i in range(settings.batch_max_plans + 1)))
+
+        await cmd_batch(message, command)
+
+        message.answer_document.assert_not_called()
+        assert "Слишком много" in message.answer.call_args[0][0]
+
+    @pytest.mark.asyncio
+    async def test_batch_from_text_file(self):
+        """Тест пакета из .txt-файла с BOM."""
+        message = _message()
+        message.document.mime_type = "text/plain"
+        message.document.file_size = 100
+        message.bot.download = AsyncMock(
+            return_value=io.BytesIO("ниша: йога\nниша: бег".encode("utf-8-sig"))
+        )
+
+        await handle_batch_file(message)
+
+        document = _sent_document(message)
+        assert "#1. ниша: йога" in document
+        assert "#2. ниша: бег" in document
+
+    @pytest.mark.asyncio
+    async def test_non_text_file_rejected(self):
+        """Тест что другие файлы не обрабатываются."""
+        message = _message()
+        message.document.mime_type = "image/png"
+        message.document.file_name = "photo.png"
+
+        await handle_batch_file(message)
+
+        message.answer_document.assert_not_called()
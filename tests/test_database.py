@@ -3,8 +3,10 @@
 """
 
 import pytest
-from app.database.connection import init_db, close_db
+from app.config import settings
+from app.database.connection import init_db, close_db, get_connection
 from app.database.repository import UserRepository, ContentPlanRepository
+from app.services.planner import build_plan, encode_templates, render_plan, render_stored_plan
 
 
 @pytest.fixture
@@ -13,9 +15,11 @@ async def db_connection():
     import os
     os.environ["DB_PATH"] = ":memory:"
 
-    # Сбрасываем глобальное соединение
+    # Сбрасываем глобальные соединения
     import app.database.connection as conn_module
-    conn_module._connection = None
+    conn_module._writer = None
+    conn_module._readers = []
+    conn_module._reader_cycle = None
 
     await init_db()
     yield
@@ -47,7 +51,54 @@ class TestUserRepository:
         # Получаем его снова
         user2 = await UserRepository.get_or_create(telegram_id=67890)
 
-        assert user1["id"] == user2["id"]
+        assert user1["telegram_id"] == user2["telegram_id"]
+        assert user1["created_at"] == user2["created_at"]
+
+    @pytest.mark.asyncio
+    async def test_upsert_updates_changed_names(self, db_connection):
+        """Тест обновления username/first_name существующего пользователя."""
+        await UserRepository.upsert(telegram_id=333, username="old", first_name="Old")
+
+        user = await UserRepository.upsert(telegram_id=333, username="new")
+
+        assert user["username"] == "new"
+        assert user["first_name"] == "Old"
+
+    @pytest.mark.asyncio
+    async def test_upsert_many(self, db_connection):
+        """Тест массового сохранения пользователей одной пачкой."""
+        from types import SimpleNamespace
+
+        await UserRepository.upsert(telegram_id=1, username="stale")
+        batch = [
+            SimpleNamespace(id=1, username="fresh", first_name=None),
+            SimpleNamespace(id=2, username="two", first_name="Two"),
+            SimpleNamespace(id=2, username="two_renamed", first_name="Two"),
+            SimpleNamespace(id=3, username=None, first_name=None),
+        ]
+
+        written = await UserRepository.upsert_many(batch)
+
+        assert written == 3
+        assert await UserRepository.count_all() == 3
+        assert (await UserRepository.get_by_telegram_id(1))["username"] == "fresh"
+        assert (await UserRepository.get_by_telegram_id(2))["username"] == "two_renamed"
+
+    @pytest.mark.asyncio
+    async def test_iter_ids_pages(self, db_connection):
+        """Тест постраничного перебора ID по возрастанию."""
+        from types import SimpleNamespace
+
+        await UserRepository.upsert_many(
+            SimpleNamespace(id=i, username=None, first_name=None)
+            for i in (50, 10, 40, 20, 30)
+        )
+
+        pages = [page async for page in UserRepository.iter_ids(batch_size=2)]
+        resumed = [page async for page in UserRepository.iter_ids(batch_size=2, after=30)]
+
+        assert pages == [[10, 20], [30, 40], [50]]
+        assert resumed == [[40, 50]]
 
     @pytest.mark.asyncio
     async def test_get_by_telegram_id(self, db_connection):
@@ -67,6 +118,31 @@ class TestUserRepository:
         assert user is None
 
 
+class TestUserTrackingMiddleware:
+    """Тесты пакетного учёта пользователей."""
+
+    @pytest.mark.asyncio
+    async def test_pending_users_flushed_without_new_updates(self, db_connection, monkeypatch):
+        """Тест что накопленные пользователи пишутся в фоне, без следующего апдейта."""
+        import asyncio
+        from types import SimpleNamespace
+        from unittest.mock import AsyncMock
+        from app.middlewares.users import UserTrackingMiddleware
+
+        monkeypatch.setattr(settings, "user_sync_interval", 0.05)
+        tracker = UserTrackingMiddleware()
+        tracker.start()
+        try:
+            user = SimpleNamespace(id=777, is_bot=False, username="late", first_name=None)
+            await tracker(AsyncMock(), object(), {"event_from_user": user})
+            assert await UserRepository.get_by_telegram_id(777) is None
+
+            await asyncio.sleep(0.2)
+            assert (await UserRepository.get_by_telegram_id(777))["username"] == "late"
+        finally:
+            await tracker.stop()
+
+
 class TestContentPlanRepository:
     """Тесты для ContentPlanRepository."""
 
@@ -83,6 +159,22 @@ class TestContentPlanRepository:
         assert plan_id is not None
         assert plan_id > 0
 
+    @pytest.mark.asyncio
+    async def test_get_by_seed_uses_index(self, db_connection):
+        """Тест что планы по seed ищутся по индексу, а не перебором планов пользователя."""
+        await ContentPlanRepository.create_compact(1, "фитнес", "мамы", "2024-01-01", 7, "0", "vk")
+        await ContentPlanRepository.create(1, "фитнес", "мамы", "План от LLM")
+
+        conn = await get_connection(readonly=True)
+        cursor = await conn.execute(
+            "EXPLAIN QUERY PLAN SELECT * FROM content_plans WHERE user_id = ? AND seed = ? ORDER BY id",
+            (1, 7)
+        )
+        plan = " ".join(row["detail"] for row in await cursor.fetchall())
+
+        assert "idx_plans_user_seed" in plan
+        assert [row["platform"] for row in await ContentPlanRepository.get_by_seed(1, 7)] == ["vk"]
+
     @pytest.mark.asyncio
     async def test_get_by_user(self, db_connection):
         """Тест получения планов пользователя."""
@@ -120,3 +212,295 @@ class TestContentPlanRepository:
         count = await ContentPlanRepository.count_by_user(user_id)
 
         assert count == 1
+
+    @pytest.mark.asyncio
+    async def test_compact_plan_rendered_on_read(self, db_connection):
+        """Тест компактного хранения: план восстанавливается без потерь."""
+        plan = build_plan("ниша: фитнес, ЦА: мамы", seed=2024)
+        rendered = "".join(render_plan(plan))
+
+        await ContentPlanRepository.create_compact(
+            user_id=1,
+            niche=plan.niche,
+            target_audience=plan.target_audience,
+            start_date=plan.start_date.isoformat(),
+            seed=plan.seed,
+            templates=encode_templates(plan.templates)
+        )
+        await ContentPlanRepository.create(1, "йога", "все", "Готовый текст")
+
+        compact, full = sorted(
+            await ContentPlanRepository.get_by_user(1), key=lambda row: row["id"]
+        )
+        assert render_stored_plan(compact) == rendered
+        assert render_stored_plan(full) == "Готовый текст"
+
+        conn = await get_connection()
+        cursor = await conn.execute(
+            """SELECT length(CAST(niche || target_audience || plan_content
+                                  || start_date || templates AS BLOB)) + 8 AS size
+               FROM content_plans WHERE id = ?""",
+            (compact["id"],)
+        )
+        stored = (await cursor.fetchone())["size"]
+        assert len(rendered.encode("utf-8")) > 10 * stored
+
+
+@pytest.fixture
+async def file_db(tmp_path, monkeypatch):
+    """Файловая БД с пулом read-only подключений."""
+    monkeypatch.setattr(settings, "db_path", str(tmp_path / "pool.sqlite3"))
+    monkeypatch.setattr(settings, "db_pool_size", 2)
+
+    await init_db()
+    yield
+    await close_db()
+
+
+class TestConnectionPool:
+    """Тесты пула подключений."""
+
+    @pytest.mark.asyncio
+    async def test_wal_mode_enabled(self, file_db):
+        """Тест включения WAL для файловой БД."""
+        conn = await get_connection()
+        cursor = await conn.execute("PRAGMA journal_mode")
+        row = await cursor.fetchone()
+
+        assert row[0] == "wal"
+
+    @pytest.mark.asyncio
+    async def test_readers_are_separate_and_readonly(self, file_db):
+        """Тест что читатели отделены от писателя и не могут писать."""
+        import sqlite3
+
+        writer = await get_connection()
+        reader1 = await get_connection(readonly=True)
+        reader2 = await get_connection(readonly=True)
+
+        assert reader1 is not writer
+        assert reader1 is not reader2
+
+        with pytest.raises(sqlite3.OperationalError):
+            await reader1.execute(
+                "INSERT INTO users (telegram_id) VALUES (?)", (1,)
+            )
+
+    @pytest.mark.asyncio
+    async def test_readers_see_committed_writes(self, file_db):
+        """Тест что читатели видят закоммиченные записи писателя."""
+        await UserRepository.get_or_create(telegram_id=42, username="pool")
+
+        user = await UserRepository.get_by_telegram_id(42)
+
+        assert user is not None
+        assert user["username"] == "pool"
+
+    @pytest.mark.asyncio
+    async def test_memory_db_falls_back_to_writer(self, db_connection):
+        """Тест что in-memory БД использует одно подключение."""
+        writer = await get_connection()
+        reader = await get_connection(readonly=True)
+
+        assert reader is writer
+
+
+@pytest.fixture
+async def buffered_db(db_connection):
+    """БД с запущенным буфером group commit."""
+    from app.database.write_buffer import write_buffer
+
+    await write_buffer.start()
+    yield write_buffer
+    await write_buffer.stop()
+
+
+class TestWriteBuffer:
+    """Тесты буфера отложенной записи."""
+
+    @pytest.mark.asyncio
+    async def test_concurrent_writes_share_commit(self, buffered_db):
+        """Тест что конкурентные записи выполняются и получают id."""
+        import asyncio
+
+        ids = await asyncio.gather(*[
+            ContentPlanRepository.create(
+                user_id=1, niche=f"ниша {i}", target_audience="ца", plan_content="план"
+            )
+            for i in range(50)
+        ])
+
+        assert len(set(ids)) == 50
+        assert await ContentPlanRepository.count_by_user(1) == 50
+
+    @pytest.mark.asyncio
+    async def test_background_write_visible_after_flush(self, buffered_db):
+        """Тест записи без ожидания и явного сброса."""
+        result = await buffered_db.execute(
+            "INSERT INTO users (telegram_id) VALUES (?)", (555,), wait=False
+        )
+        assert result is None
+
+        await buffered_db.flush()
+
+        assert await UserRepository.get_by_telegram_id(555) is not None
+
+    @pytest.mark.asyncio
+    async def test_failed_write_does_not_break_batch(self, buffered_db):
+        """Тест что ошибка одного запроса не откатывает остальные."""
+        import asyncio
+        import sqlite3
+
+        results = await asyncio.gather(
+            buffered_db.execute("INSERT INTO users (telegram_id) VALUES (?)", (1,)),
+            buffered_db.execute("INSERT INTO users (telegram_id) VALUES (?)", (1,)),
+            buffered_db.execute("INSERT INTO users (telegram_id) VALUES (?)", (2,)),
+            return_exceptions=True,
+        )
+
+        assert isinstance(results[1], sqlite3.IntegrityError)
+        assert await UserRepository.get_by_telegram_id(2) is not None
+
+    @pytest.mark.asyncio
+    async def test_stop_drains_pending(self, db_connection):
+        """Тест что остановка буфера записывает хвост очереди."""
+        from app.database.write_buffer import WriteBuffer
+
+        buffer = WriteBuffer(flush_interval_ms=60_000, max_rows=1000)
+        await buffer.start()
+        await buffer.execute(
+            "INSERT INTO users (telegram_id) VALUES (?)", (777,), wait=False
+        )
+        await buffer.stop()
+
+        assert await UserRepository.get_by_telegram_id(777) is not None
+
+
+def _create_legacy_db(path: str) -> None:
+    """Создать БД в схеме до миграций (как делал старый init_db)."""
+    import sqlite3
+
+    conn = sqlite3.connect(path)
+    conn.executescript("""
+        CREATE TABLE users (
+            id INTEGER PRIMARY KEY,
+            telegram_id INTEGER UNIQUE NOT NULL,
+            username TEXT,
+            first_name TEXT,
+            subscription_end_date TIMESTAMP,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        );
+        CREATE TABLE content_plans (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            user_id INTEGER NOT NULL,
+            niche TEXT NOT NULL,
+            target_audience TEXT,
+            plan_content TEXT NOT NULL,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY (user_id) REFERENCES users(telegram_id)
+        );
+        CREATE INDEX idx_users_telegram_id ON users(telegram_id);
+        CREATE INDEX idx_plans_user_id ON content_plans(user_id);
+    """)
+    conn.execute(
+        "INSERT INTO users (telegram_id, username, subscription_end_date, created_at) "
+        "VALUES (100, 'legacy', '2030-01-02 03:04:05.123456', '2024-05-06 07:08:09')"
+    )
+    conn.execute("INSERT INTO users (telegram_id) VALUES (200)")
+    for i in range(5):
+        conn.execute(
+            "INSERT INTO content_plans (user_id, niche, plan_content, created_at) "
+            "VALUES (100, ?, 'план', '2024-05-06 07:08:09')",
+            (f"ниша {i}",)
+        )
+    conn.commit()
+    conn.close()
+
+
+class _CrashingConnection:
+    """Обёртка над подключением, падающая на N-й пачке переноса планов."""
+
+    def __init__(self, conn, crash_on: int):
+        self._conn = conn
+        self._crash_on = crash_on
+        self._batches = 0
+
+    def __getattr__(self, name):
+        return getattr(self._conn, name)
+
+    async def execute(self, sql, params=()):
+        if "INTO content_plans_v2" in sql:
+            self._batches += 1
+            if self._batches == self._crash_on:
+                raise RuntimeError("simulated crash")
+        return await self._conn.execute(sql, params)
+
+
+class TestMigrations:
+    """Тесты версионных миграций."""
+
+    @pytest.mark.asyncio
+    async def test_legacy_db_is_migrated(self, tmp_path, monkeypatch):
+        """Тест переноса старой схемы без потери данных."""
+        import time
+        from datetime import datetime
+
+        path = str(tmp_path / "legacy.sqlite3")
+        _create_legacy_db(path)
+        monkeypatch.setattr(settings, "db_path", path)
+
+        await init_db()
+        try:
+            conn = await get_connection()
+            cursor = await conn.execute("PRAGMA table_info(users)")
+            columns = {row["name"]: row for row in await cursor.fetchall()}
+            cursor = await conn.execute("PRAGMA index_list(content_plans)")
+            indexes = {row["name"] for row in await cursor.fetchall()}
+
+            user = await UserRepository.get_by_telegram_id(100)
+            plans = await ContentPlanRepository.get_by_user(100)
+            new_id = await ContentPlanRepository.create(100, "новая", "ца", "план")
+        finally:
+            await close_db()
+
+        assert "id" not in columns
+        assert columns["telegram_id"]["pk"] == 1
+        assert "idx_plans_user_created" in indexes
+
+        expected_end = datetime(2030, 1, 2, 3, 4, 5).timestamp()
+        assert user["subscription_end_date"] == int(expected_end)
+        assert user["created_at"] == 1714979289
+        assert len(plans) == 5
+        assert all(isinstance(plan["created_at"], int) for plan in plans)
+        assert new_id == 6
+        assert user["subscription_end_date"] > time.time()
+
+    @pytest.mark.asyncio
+    async def test_migration_resumes_after_crash(self, tmp_path, monkeypatch):
+        """Тест продолжения переноса с последней закоммиченной пачки."""
+        import aiosqlite
+        from app.database import migrations
+
+        path = str(tmp_path / "resume.sqlite3")
+        _create_legacy_db(path)
+        monkeypatch.setattr(migrations, "BATCH_SIZE", 2)
+
+        conn = await aiosqlite.connect(path)
+        try:
+            with pytest.raises(RuntimeError):
+                await migrations.migrate(_CrashingConnection(conn, crash_on=2))
+
+            cursor = await conn.execute("SELECT COUNT(*) FROM content_plans_v2")
+            assert (await cursor.fetchone())[0] == 2
+
+            version = await migrations.migrate(conn)
+            cursor = await conn.execute("SELECT COUNT(*) FROM content_plans")
+            plans_count = (await cursor.fetchone())[0]
+            cursor = await conn.execute("SELECT COUNT(*) FROM schema_migration_progress")
+            progress_rows = (await cursor.fetchone())[0]
+        finally:
+            await conn.close()
+
+        assert version == migrations.MIGRATIONS[-1].version
+        assert plans_count == 5
+        assert progress_rows == 0
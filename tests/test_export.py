@@ -0,0 +1,151 @@
+"""
+Тесты для выгрузки истории планов.
+"""
+
+import csv
+import io
+
+import pytest
+from unittest.mock import AsyncMock, MagicMock
+
+from app.config import settings
+from app.database.repository import ContentPlanRepository
+from app.handlers.export import send_export
+from app.services.export import SpooledInputFile, export_history, ics_fold
+from app.services.history import HistoryService
+from app.services.planner import build_plan, generate_content_plan, iter_plan_entries
+
+REQUEST = "ниша: фитнес, ЦА: мамы на 14 дней"
+
+
+async def _save_plans(user_id: int) -> None:
+    await HistoryService.save(user_id, REQUEST, 3, [generate_content_plan(REQUEST, seed=3)])
+    await ContentPlanRepository.create(user_id, "йога", "все", "<b>План</b> от LLM; день 1")
+
+
+async def _read(fmt: str, user_id: int = 1) -> str:
+    file, _ = await export_history(user_id, fmt)
+    try:
+        return file.read().decode("utf-8-sig")
+    finally:
+        file.close()
+
+
+class TestIterByUser:
+    """Тесты постраничного чтения истории."""
+
+    @pytest.mark.asyncio
+    async def test_all_plans_in_order(self, temp_db):
+        """Тест что страницы покрывают историю без пропусков и повторов."""
+        ids = [await ContentPlanRepository.create(1, f"ниша {i}", "ЦА", "план") for i in range(7)]
+        await ContentPlanRepository.create(2, "чужая", "ЦА", "план")
+
+        pages = [page async for page in ContentPlanRepository.iter_by_user(1, batch_size=3)]
+
+        assert [len(page) for page in pages] == [3, 3, 1]
+        assert [row["id"] for page in pages for row in page] == ids
+
+
+class TestExportFormats:
+    """Тесты форматов выгрузки."""
+
+    @pytest.mark.asyncio
+    async def test_csv_row_per_day(self, temp_db):
+        """Тест CSV: строка на день компактного плана и строка на текстовый план."""
+        await _save_plans(1)
+
+        rows = list(csv.DictReader(io.StringIO(await _read("csv"))))
+
+        assert len(rows) == 14 + 1
+        assert rows[0]["niche"] == "фитнес" and rows[0]["day"] == "1"
+        assert rows[-1]["post"] == "План от LLM; день 1"
+
+    @pytest.mark.asyncio
+    async def test_ics_event_per_day_with_plan_dates(self, temp_db):
+        """Тест .ics: событие на каждый день с датами плана."""
+        await _save_plans(1)
+        expected = [d.strftime("%Y%m%d") for d, _ in iter_plan_entries(build_plan(REQUEST, seed=3))]
+
+        text = await _read("ics")
+        lines = text.split("\r\n")
+
+        starts = [line.split(":")[1] for line in lines if line.startswith("DTSTART")]
+        assert starts[:14] == expected
+        assert text.count("BEGIN:VEVENT") == 14 + 1
+        assert text.startswith("BEGIN:VCALENDAR") and text.endswith("END:VCALENDAR\r\n")
+        assert "План от LLM\\; день 1" in text.replace("\r\n ", "")
+        assert all(len(line.encode("utf-8")) <= 75 for line in lines)
+
+    @pytest.mark.asyncio
+    async def test_markdown(self, temp_db):
+        """Тест Markdown: раздел на план."""
+        await _save_plans(1)
+
+        text = await _read("md")
+
+        assert text.startswith("# Контент-планы")
+        assert text.count("\n## ") == 2
+        assert "14. **" in text
+
+    @pytest.mark.asyncio
+    async def test_large_export_spills_to_disk(self, temp_db, monkeypatch):
+        """Тест что большая выгрузка уходит из памяти во временный файл."""
+        monkeypatch.setattr(settings, "export_spool_size", 1024)
+        await _save_plans(1)
+
+        file, count = await export_history(1, "csv")
+        try:
+            assert file._rolled
+            assert count == 2
+        finally:
+            file.close()
+
+    def test_ics_fold_keeps_utf8_characters(self):
+        """Тест переноса длинных строк .ics."""
+        folded = ics_fold("SUMMARY:" + "марафон " * 20)
+
+        assert all(len(line.encode("utf-8")) <= 75 for line in folded.split("\r\n"))
+        assert folded.replace("\r\n ", "") == "SUMMARY:" + "марафон " * 20 + "\r\n"
+
+
+class TestExportHandler:
+    """Тесты отправки выгрузки."""
+
+    @staticmethod
+    def _bot() -> MagicMock:
+        bot = MagicMock()
+        bot.send_message = AsyncMock()
+        bot.send_message.return_value.edit_text = AsyncMock()
+        bot.send_message.return_value.delete = AsyncMock()
+        bot.send_document = AsyncMock()
+        return bot
+
+    @pytest.mark.asyncio
+    async def test_document_streamed_from_file(self, temp_db):
+        """Тест что документ читается из временного файла по частям."""
+        await _save_plans(1)
+        bot = self._bot()
+        chunks = []
+
+        async def capture(chat_id, document, caption):
+            async for chunk in document.read(bot):
+                chunks.append(chunk)
+
+        bot.send_document.side_effect = capture
+        await send_export(bot, 100, 1, "ics")
+
+        document = bot.send_document.call_args.kwargs["document"]
+        assert isinstance(document, SpooledInputFile)
+        assert document.filename.endswith(".ics")
+        assert b"".join(chunks).startswith(b"BEGIN:VCALENDAR")
+        assert document.file.closed
+
+    @pytest.mark.asyncio
+    async def test_empty_history(self, temp_db):
+        """Тест выгрузки без планов."""
+        bot = self._bot()
+
+        await send_export(bot, 100, 1, "csv")
+
+        bot.send_document.assert_not_called()
+        assert "нет сохранённых планов" in bot.send_message.return_value.edit_text.call_args[0][0]
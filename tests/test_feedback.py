@@ -0,0 +1,125 @@
+"""
+Тесты для оценок планов и кнопок-примеров.
+"""
+
+from collections import Counter
+
+import pytest
+from unittest.mock import AsyncMock, MagicMock
+
+from app.database.connection import get_connection
+from app.database.repository import ContentPlanRepository, FeedbackRepository
+from app.handlers.feature import niche_example
+from app.handlers.feedback import parse_feedback_callback, plan_feedback
+from app.services.feedback import FeedbackService, feedback_buffer
+from app.services.history import HistoryService
+from app.services.planner import build_plan, generate_content_plan, plan_template_ids
+from app.services.prewarm import NICHE_PRESETS
+
+REQUEST = "ниша: фитнес, ЦА: мамы"
+
+
+async def _feedback_rows() -> list:
+    conn = await get_connection()
+    cursor = await conn.execute("SELECT user_id, seed, useful FROM plan_feedback ORDER BY user_id, seed")
+    return [tuple(row) for row in await cursor.fetchall()]
+
+
+async def _template_totals() -> dict:
+    return {
+        (row["content_type"], row["template_index"]): (row["useful"], row["not_useful"])
+        for row in await FeedbackRepository.template_stats()
+    }
+
+
+@pytest.fixture(autouse=True)
+async def empty_buffer():
+    feedback_buffer._pending.clear()
+    yield
+    feedback_buffer._pending.clear()
+
+
+class TestFeedbackBuffer:
+    """Тесты пакетной записи оценок."""
+
+    @pytest.mark.asyncio
+    async def test_batched_write_and_template_totals(self, temp_db):
+        """Тест что оценки пишутся пачкой и засчитываются шаблонам плана."""
+        await HistoryService.save(1, REQUEST, 7, [generate_content_plan(REQUEST, seed=7)])
+        await ContentPlanRepository.create(2, "йога", "все", "план от LLM")
+
+        await FeedbackService.record(1, 7, useful=False)
+        await FeedbackService.record(1, 7, useful=True)
+        await FeedbackService.record(2, 99, useful=False)
+
+        assert await _feedback_rows() == []
+        assert len(feedback_buffer) == 2
+
+        await feedback_buffer.flush()
+
+        assert await _feedback_rows() == [(1, 7, 1), (2, 99, 0)]
+        expected = Counter(plan_template_ids(build_plan(REQUEST, seed=7)))
+        assert await _template_totals() == {key: (count, 0) for key, count in expected.items()}
+
+    @pytest.mark.asyncio
+    async def test_changed_vote_moves_totals(self, temp_db):
+        """Тест что смена оценки после записи переносит голоса шаблонов."""
+        await HistoryService.save(1, REQUEST, 7, [generate_content_plan(REQUEST, seed=7)])
+        await FeedbackService.record(1, 7, useful=True)
+        await feedback_buffer.flush()
+        await FeedbackService.record(1, 7, useful=False)
+        await feedback_buffer.flush()
+        await FeedbackService.record(1, 7, useful=False)
+        await feedback_buffer.flush()
+
+        totals = await _template_totals()
+        assert all(useful == 0 and not_useful > 0 for useful, not_useful in totals.values())
+        assert sum(not_useful for _, not_useful in totals.values()) == 7
+
+        scores = await FeedbackService.template_scores()
+        key, (_, not_useful) = next(iter(totals.items()))
+        assert scores[key] == pytest.approx(1 / (not_useful + 2))
+
+    def test_parse_callback(self):
+        """Тест разбора callback_data кнопок оценки."""
+        assert parse_feedback_callback("feedback:useful:42") == (True, 42)
+        assert parse_feedback_callback("feedback:not_useful") == (False, None)
+        assert parse_feedback_callback("feedback:great:1") is None
+        assert parse_feedback_callback("feedback:useful:x") is None
+
+
+class TestCallbacks:
+    """Тесты обработчиков кнопок."""
+
+    @pytest.mark.asyncio
+    async def test_feedback_button(self, temp_db):
+        """Тест что нажатие попадает в буфер и получает ответ."""
+        callback = MagicMock()
+        callback.data = "feedback:useful:5"
+        callback.from_user.id = 3
+        callback.answer = AsyncMock()
+
+        await plan_feedback(callback)
+
+        assert len(feedback_buffer) == 1
+        callback.answer.assert_called_once()
+
+    @pytest.mark.asyncio
+    async def test_niche_button_submits_preset(self, monkeypatch):
+        """Тест что кнопка-пример ставит в очередь запрос ниши."""
+        submit = AsyncMock(return_value=1)
+        monkeypatch.setattr("app.handlers.feature.generation_queue.submit", submit)
+        monkeypatch.setattr("app.handlers.feature.generation_queue.position", AsyncMock(return_value=0))
+        monkeypatch.setattr("app.handlers.feature.SubscriptionService.check_access", AsyncMock(return_value=True))
+        callback = MagicMock()
+        callback.data = "niche:it"
+        callback.from_user.id = 3
+        callback.answer = AsyncMock()
+        callback.message.chat.id = 100
+        callback.message.answer = AsyncMock()
+        callback.message.answer.return_value.message_id = 9
+
+        await niche_example(callback)
+
+        assert submit.call_args.args[:3] == (3, 100, NICHE_PRESETS["it"])
+        assert submit.call_args.kwargs["message_id"] == 9
@@ -0,0 +1,212 @@
+"""
+Тесты для бэкендов генерации контент-плана.
+"""
+
+import asyncio
+import json
+
+import pytest
+from aiohttp import web
+from aiohttp.test_utils import TestServer
+
+from app.services.generators import (
+    FallbackGenerator,
+    GenerationError,
+    LLMGenerator,
+    SingleFlight,
+    TemplateGenerator,
+)
+
+
+class _StubLLM:
+    """Локальный stub GigaChat-совместимого API."""
+
+    def __init__(self, delay: float = 0.0, status: int = 200, chunk_delay: float = 0.0):
+        self.delay = delay
+        self.chunk_delay = chunk_delay
+        self.status = status
+        self.requests = []
+
+    async def handle(self, request: web.Request) -> web.Response:
+        payload = await request.json()
+        self.requests.append((request.headers.get("Authorization"), payload))
+        await asyncio.sleep(self.delay)
+        if self.status != 200:
+            return web.Response(status=self.status)
+        if payload.get("stream"):
+            return await self._stream(request)
+        return web.json_response({
+            "choices": [{"message": {"content": "День 1\nПост <про> бег"}}]
+        })
+
+    async def _stream(self, request: web.Request) -> web.StreamResponse:
+        response = web.StreamResponse(headers={"Content-Type": "text/event-stream"})
+        await response.prepare(request)
+        for piece in ("\nДень 1\n", "Пост <про> бег", "\nДень 2\nЕщё пост"):
+            data = json.dumps({"choices": [{"delta": {"content": piece}}]})
+            await response.write(f"data: {data}\n\n".encode())
+            await asyncio.sleep(self.chunk_delay)
+        await response.write(b"data: [DONE]\n\n")
+        return response
+
+
+@pytest.fixture
+async def stub_llm():
+    """Запускает stub-сервер и возвращает (stub, base_url)."""
+    servers = []
+
+    async def factory(**kwargs):
+        stub = _StubLLM(**kwargs)
+        app = web.Application()
+        app.router.add_post("/api/v1/chat/completions", stub.handle)
+        server = TestServer(app)
+        await server.start_server()
+        servers.append(server)
+        return stub, str(server.make_url("/api/v1"))
+
+    yield factory
+
+    for server in servers:
+        await server.close()
+
+
+def _llm(base_url: str, timeout: float = 5) -> LLMGenerator:
+    return LLMGenerator(
+        base_url=base_url, token="secret", model="GigaChat",
+        timeout=timeout, max_concurrency=4
+    )
+
+
+class TestLLMGenerator:
+    """Тесты HTTP LLM-бэкенда."""
+
+    @pytest.mark.asyncio
+    async def test_generates_escaped_plan(self, stub_llm):
+        """Тест запроса к API и экранирования ответа."""
+        stub, url = await stub_llm()
+        llm = _llm(url)
+        try:
+            plan = await llm.generate("ниша: бег, ЦА: новички")
+        finally:
+            await llm.close()
+
+        auth, payload = stub.requests[0]
+        assert auth == "Bearer secret"
+        assert payload["model"] == "GigaChat"
+        assert "бег" in payload["messages"][1]["content"]
+        assert "Пост &lt;про&gt; бег" in plan
+        assert "🎯 Ниша: <b>бег</b>" in plan
+
+    @pytest.mark.asyncio
+    async def test_concurrent_identical_requests_share_call(self, stub_llm):
+        """Тест single-flight для одинаковых (ниша, ЦА)."""
+        stub, url = await stub_llm(delay=0.2)
+        llm = _llm(url)
+        try:
+            plans = await asyncio.gather(*[
+                llm.generate(text) for text in (
+                    "ниша: бег, ЦА: новички",
+                    "ниша: Бег,  ЦА: новички",
+                    "ниша: бег, ЦА: новички",
+                )
+            ])
+            await llm.generate("ниша: йога, ЦА: новички")
+        finally:
+            await llm.close()
+
+        assert len(stub.requests) == 2
+        assert len(set(plans)) == 2  # регистр ниши в заголовке сохраняется
+
+    @pytest.mark.asyncio
+    async def test_stream_yields_chunks_as_they_arrive(self, stub_llm):
+        """Тест потоковой генерации: шапка с первым фрагментом, затем остальные."""
+        stub, url = await stub_llm(chunk_delay=0.05)
+        llm = _llm(url)
+        try:
+            chunks = [chunk async for chunk in llm.stream("ниша: бег")]
+        finally:
+            await llm.close()
+
+        assert stub.requests[0][1]["stream"] is True
+        assert len(chunks) == 4
+        assert chunks[0].startswith("📋") and chunks[0].endswith("День 1\n")
+        assert chunks[1] == "Пост &lt;про&gt; бег"
+        assert "".join(chunks) == LLMGenerator._format(
+            "бег", "широкая аудитория", "День 1\nПост <про> бег\nДень 2\nЕщё пост"
+        )
+
+    @pytest.mark.asyncio
+    async def test_http_error_raises(self, stub_llm):
+        """Тест ошибки HTTP."""
+        _, url = await stub_llm(status=500)
+        llm = _llm(url)
+        try:
+            with pytest.raises(GenerationError):
+                await llm.generate("ниша: бег")
+        finally:
+            await llm.close()
+
+
+class TestFallbackGenerator:
+    """Тесты фолбэка на шаблоны."""
+
+    @pytest.mark.asyncio
+    async def test_slow_backend_falls_back_to_templates(self, stub_llm):
+        """Тест превышения бюджета задержки."""
+        _, url = await stub_llm(delay=1.0)
+        generator = FallbackGenerator(_llm(url), TemplateGenerator(), budget=0.1)
+        try:
+            plan = await generator.generate("ниша: бег")
+        finally:
+            await generator.close()
+
+        assert "День 7" in plan
+
+    @pytest.mark.asyncio
+    async def test_failing_backend_falls_back_to_templates(self, stub_llm):
+        """Тест ошибки основного бэкенда."""
+        _, url = await stub_llm(status=503)
+        generator = FallbackGenerator(_llm(url), TemplateGenerator(), budget=5)
+        try:
+            plan = await generator.generate("ниша: бег")
+        finally:
+            await generator.close()
+
+        assert "День 1" in plan
+
+    @pytest.mark.asyncio
+    async def test_stream_falls_back_before_first_chunk(self, stub_llm):
+        """Тест что бюджет отсчитывается до первого фрагмента потока."""
+        _, url = await stub_llm(delay=1.0)
+        generator = FallbackGenerator(_llm(url), TemplateGenerator(), budget=0.1)
+        try:
+            chunks = [chunk async for chunk in generator.stream("ниша: бег")]
+        finally:
+            await generator.close()
+
+        assert len(chunks) == 9  # шапка, 7 дней, подвал
+        assert chunks[1].startswith("<b>День 1</b>")
+
+
+class TestSingleFlight:
+    """Тесты объединения вызовов."""
+
+    @pytest.mark.asyncio
+    async def test_cancelled_waiter_does_not_cancel_call(self):
+        """Тест что отмена одного ожидающего не прерывает общий вызов."""
+        flights = SingleFlight()
+        calls = []
+
+        async def work():
+            calls.append(1)
+            await asyncio.sleep(0.1)
+            return "ok"
+
+        first = asyncio.create_task(flights.do("k", work))
+        second = asyncio.create_task(flights.do("k", work))
+        await asyncio.sleep(0.01)
+        first.cancel()
+
+        assert await second == "ok"
+        assert calls == [1]
+        assert len(flights) == 0
@@ -0,0 +1,149 @@
+"""
+Тесты для истории планов.
+"""
+
+import pytest
+from unittest.mock import AsyncMock, MagicMock
+
+from app.database.repository import ContentPlanRepository
+from app.handlers.history import open_plan, parse_history_callback
+from app.services.history import HistoryService, format_history
+from app.services.planner import generate_content_plan, iter_content_plan, split_plans
+
+
+async def _create_plans(user_id: int, count: int) -> list:
+    return [
+        await ContentPlanRepository.create(user_id, f"ниша {i}", "ЦА", f"план {i}")
+        for i in range(count)
+    ]
+
+
+class TestHistoryPagination:
+    """Тесты keyset-пагинации."""
+
+    @pytest.mark.asyncio
+    async def test_pages_forward_and_back(self, temp_db):
+        """Тест листания: старше до конца и обратно к первой странице."""
+        ids = await _create_plans(1, 12)
+        await _create_plans(2, 3)
+        newest_first = ids[::-1]
+
+        first = await HistoryService.page(1)
+        second = await HistoryService.page(1, before=first.older)
+        third = await HistoryService.page(1, before=second.older)
+
+        assert [p["id"] for p in first.plans] == newest_first[:5]
+        assert [p["id"] for p in second.plans] == newest_first[5:10]
+        assert [p["id"] for p in third.plans] == newest_first[10:]
+        assert first.newer is None and third.older is None
+
+        back = await HistoryService.page(1, after=third.newer)
+        assert [p["id"] for p in back.plans] == newest_first[5:10]
+        top = await HistoryService.page(1, after=back.newer)
+        assert [p["id"] for p in top.plans] == newest_first[:5]
+        assert top.newer is None
+
+    @pytest.mark.asyncio
+    async def test_page_has_only_preview_columns(self, temp_db):
+        """Тест что страница не читает текст планов."""
+        await _create_plans(1, 1)
+
+        page = await HistoryService.page(1)
+
+        assert set(page.plans[0]) == {"id", "niche", "target_audience", "platform", "created_at"}
+        assert "ниша 0" in format_history(page)
+
+    @pytest.mark.asyncio
+    async def test_empty_history(self, temp_db):
+        """Тест пустой истории."""
+        page = await HistoryService.page(1)
+
+        assert page.plans == []
+        assert "нет сохранённых планов" in format_history(page)
+
+    def test_parse_callback(self):
+        """Тест разбора callback_data листания."""
+        assert parse_history_callback("history:older:1700000000:42") == ("older", (1700000000, 42))
+        assert parse_history_callback("history:older:x:42") is None
+        assert parse_history_callback("history:sideways:1:2") is None
+
+
+class TestSavePlans:
+    """Тесты сохранения доставленных планов."""
+
+    @pytest.mark.asyncio
+    async def test_template_plans_saved_compact_per_platform(self, temp_db):
+        """Тест что шаблонные планы хранятся компактно, по записи на площадку."""
+        text = "ниша: фитнес, площадки: instagram, vk"
+        texts = split_plans(iter_content_plan(text, seed=11))
+
+        await HistoryService.save(1, text, 11, texts)
+
+        rows = sorted(await ContentPlanRepository.get_by_user(1), key=lambda row: row["id"])
+        assert [row["platform"] for row in rows] == ["instagram", "vk"]
+        assert all(row["plan_content"] == "" and row["seed"] == 11 for row in rows)
+
+    @pytest.mark.asyncio
+    async def test_plan_saved_with_its_generation_date(self, temp_db):
+        """Тест что план сверяется и хранится с датой генерации, а не с «завтра» на момент записи."""
+        from datetime import date
+
+        text = "ниша: фитнес"
+        start_date = date(2024, 12, 31)
+        texts = split_plans(iter_content_plan(text, seed=11, start_date=start_date))
+
+        await HistoryService.save(1, text, 11, texts, start_date=start_date)
+
+        [row] = await ContentPlanRepository.get_by_user(1)
+        assert row["plan_content"] == ""
+        assert row["start_date"] == "2024-12-31"
+
+    @pytest.mark.asyncio
+    async def test_other_text_saved_as_is(self, temp_db):
+        """Тест что ответ LLM сохраняется текстом."""
+        await HistoryService.save(1, "ниша: фитнес, ЦА: мамы", 11, ["План от LLM"])
+
+        [row] = await ContentPlanRepository.get_by_user(1)
+        assert row["templates"] is None
+        assert row["plan_content"] == "План от LLM"
+        assert row["niche"] == "фитнес"
+
+
+class TestOpenPlan:
+    """Тесты просмотра сохранённого плана."""
+
+    @staticmethod
+    def _callback(user_id: int, plan_id: int) -> MagicMock:
+        callback = MagicMock()
+        callback.data = f"plan:{plan_id}"
+        callback.from_user.id = user_id
+        callback.answer = AsyncMock()
+        callback.bot.send_message = AsyncMock()
+        callback.bot.edit_message_reply_markup = AsyncMock()
+        return callback
+
+    @pytest.mark.asyncio
+    async def test_plan_sent_to_owner(self, temp_db):
+        """Тест что владелец получает план заново."""
+        text = "ниша: фитнес"
+        await HistoryService.save(1, text, 5, [generate_content_plan(text, seed=5)])
+        [row] = await ContentPlanRepository.get_by_user(1)
+        callback = self._callback(1, row["id"])
+
+        await open_plan(callback)
+
+        sent = callback.bot.send_message.call_args.kwargs["text"]
+        assert sent == generate_content_plan(text, seed=5)
+        markup = callback.bot.edit_message_reply_markup.call_args.kwargs["reply_markup"]
+        assert markup.inline_keyboard[0][0].callback_data == "feedback:useful:5"
+
+    @pytest.mark.asyncio
+    async def test_foreign_plan_not_shown(self, temp_db):
+        """Тест что чужой план не открывается."""
+        [plan_id] = await _create_plans(1, 1)
+        callback = self._callback(2, plan_id)
+
+        await open_plan(callback)
+
+        callback.bot.send_message.assert_not_called()
+        assert callback.answer.call_args.kwargs["show_alert"] is True
@@ -0,0 +1,245 @@
+"""
+Тесты для очереди заданий генерации.
+"""
+
+import asyncio
+
+import pytest
+from unittest.mock import AsyncMock, MagicMock
+
+from app.database.repository import GenerationJobRepository
+from app.services import jobs
+from app.services.jobs import (
+    PRIORITY_LOW,
+    PRIORITY_PAID,
+    GenerationQueue,
+    QueueFullError,
+    make_dedup_key,
+)
+from app.services.streaming import MessageStream
+
+
+def _mock_bot() -> MagicMock:
+    bot = MagicMock()
+    bot.send_message = AsyncMock()
+    bot.send_message.return_value.message_id = 500
+    bot.edit_message_text = AsyncMock()
+    bot.edit_message_reply_markup = AsyncMock()
+    return bot
+
+
+class TestGenerationJobRepository:
+    """Тесты хранения очереди."""
+
+    @pytest.mark.asyncio
+    async def test_paid_jobs_claimed_first(self, temp_db):
+        """Тест что платные задания обгоняют служебные."""
+        low = await GenerationJobRepository.enqueue(1, 1, "ниша: a", "a", PRIORITY_LOW)
+        paid = await GenerationJobRepository.enqueue(2, 2, "ниша: b", "b", PRIORITY_PAID)
+
+        assert (await GenerationJobRepository.claim())["id"] == paid
+        assert (await GenerationJobRepository.claim())["id"] == low
+        assert await GenerationJobRepository.claim() is None
+
+    @pytest.mark.asyncio
+    async def test_duplicate_request_dropped_while_pending(self, temp_db):
+        """Тест дедупликации повторных запросов пользователя."""
+        key = make_dedup_key("Ниша:  фитнес")
+        assert key == make_dedup_key("ниша: ФИТНЕС ")
+
+        first = await GenerationJobRepository.enqueue(1, 1, "Ниша:  фитнес", key, PRIORITY_PAID)
+        duplicate = await GenerationJobRepository.enqueue(1, 1, "ниша: ФИТНЕС", key, PRIORITY_PAID)
+        other_user = await GenerationJobRepository.enqueue(2, 2, "ниша: фитнес", key, PRIORITY_PAID)
+
+        assert first is not None
+        assert duplicate is None
+        assert other_user is not None
+
+        await GenerationJobRepository.claim()
+        await GenerationJobRepository.finish(first)
+
+        assert await GenerationJobRepository.enqueue(1, 1, "ниша: фитнес", key, PRIORITY_PAID)
+
+    @pytest.mark.asyncio
+    async def test_running_jobs_requeued_after_restart(self, temp_db):
+        """Тест возврата прерванных заданий в очередь."""
+        job_id = await GenerationJobRepository.enqueue(1, 1, "ниша: a", "a", PRIORITY_PAID)
+        await GenerationJobRepository.claim()
+
+        assert await GenerationJobRepository.requeue_running() == 1
+        job = await GenerationJobRepository.claim()
+
+        assert job["id"] == job_id
+        assert job["attempts"] == 2
+
+
+class TestGenerationQueue:
+    """Тесты воркеров очереди."""
+
+    @pytest.mark.asyncio
+    async def test_worker_generates_and_sends_plan(self, temp_db):
+        """Тест полного цикла: задание -> план -> сообщение."""
+        bot = MagicMock()
+        bot.send_message = AsyncMock()
+        queue = GenerationQueue(workers=2, max_pending=10)
+
+        await queue.start(bot)
+        try:
+            job_id = await queue.submit(1, 100, "ниша: фитнес, ЦА: мамы", PRIORITY_PAID)
+            for _ in range(100):
+                if bot.send_message.called:
+                    break
+                await asyncio.sleep(0.05)
+            await asyncio.sleep(0.1)
+            stats = await queue.stats()
+        finally:
+            await queue.stop()
+
+        assert job_id is not None
+        kwargs = bot.send_message.call_args.kwargs
+        assert kwargs["chat_id"] == 100
+        assert "фитнес" in kwargs["text"]
+        assert stats["jobs"] == 1
+        assert stats["pending"] == 0
+
+    @pytest.mark.asyncio
+    async def test_worker_survives_claim_error(self, temp_db, monkeypatch):
+        """Тест что ошибка БД в claim() не убивает воркер: задания выполняются дальше."""
+        monkeypatch.setattr(jobs, "WORKER_ERROR_PAUSE", 0)
+        claim = GenerationJobRepository.claim
+        failures = []
+
+        async def flaky_claim():
+            if not failures:
+                failures.append(1)
+                raise RuntimeError("database is locked")
+            return await claim()
+
+        monkeypatch.setattr(GenerationJobRepository, "claim", flaky_claim)
+        bot = _mock_bot()
+        queue = GenerationQueue(workers=1, max_pending=10)
+
+        await queue.start(bot)
+        try:
+            for chat_id in (100, 101):
+                await queue.submit(chat_id, chat_id, f"ниша: фитнес {chat_id}", PRIORITY_PAID)
+            for _ in range(100):
+                if bot.send_message.call_count >= 2:
+                    break
+                await asyncio.sleep(0.05)
+            alive = not queue._tasks[0].done()
+        finally:
+            await queue.stop()
+
+        assert failures
+        assert alive
+        assert {call.kwargs["chat_id"] for call in bot.send_message.call_args_list} == {100, 101}
+
+    @pytest.mark.asyncio
+    async def test_submit_rejected_when_full(self, temp_db):
+        """Тест ограничения числа ожидающих заданий."""
+        queue = GenerationQueue(workers=1, max_pending=1)
+
+        await queue.submit(1, 1, "ниша: a", PRIORITY_PAID)
+        with pytest.raises(QueueFullError):
+            await queue.submit(2, 2, "ниша: b", PRIORITY_PAID)
+
+        assert await queue.position(1) == 1
+
+    @pytest.mark.asyncio
+    async def test_plan_streamed_into_status_message(self, temp_db):
+        """Тест что план выводится правкой сообщения-статуса."""
+        bot = _mock_bot()
+        queue = GenerationQueue(workers=1, max_pending=10)
+
+        await queue.start(bot)
+        try:
+            await queue.submit(1, 100, "ниша: фитнес", PRIORITY_PAID, message_id=42)
+            for _ in range(100):
+                if bot.edit_message_text.called:
+                    break
+                await asyncio.sleep(0.05)
+        finally:
+            await queue.stop()
+
+        bot.send_message.assert_not_called()
+        kwargs = bot.edit_message_text.call_args.kwargs
+        assert kwargs["message_id"] == 42
+        assert "День 7" in kwargs["text"]
+
+    @pytest.mark.asyncio
+    async def test_each_platform_plan_in_own_message(self, temp_db):
+        """Тест что план каждой площадки приходит отдельным сообщением."""
+        bot = _mock_bot()
+        queue = GenerationQueue(workers=1, max_pending=10)
+
+        await queue.start(bot)
+        try:
+            await queue.submit(1, 100, "ниша: фитнес, площадки: telegram, instagram, vk", PRIORITY_PAID,
+                               message_id=42)
+            for _ in range(100):
+                if bot.send_message.call_count >= 2:
+                    break
+                await asyncio.sleep(0.05)
+            await asyncio.sleep(0.1)
+        finally:
+            await queue.stop()
+
+        assert "Telegram" in bot.edit_message_text.call_args_list[0].kwargs["text"]
+        texts = [call.kwargs["text"] for call in bot.send_message.call_args_list]
+        assert len(texts) == 2
+        assert "Instagram" in texts[0]
+        assert "ВКонтакте" in texts[1]
+
+
+class TestMessageStream:
+    """Тесты постепенной доставки плана."""
+
+    @pytest.mark.asyncio
+    async def test_first_chunk_shown_immediately_rest_coalesced(self):
+        """Тест что первая правка сразу, а частые фрагменты объединяются."""
+        bot = _mock_bot()
+        stream = MessageStream(bot, chat_id=1, message_id=7, min_interval=0.2)
+
+        await stream.write("День 1\n")
+        await asyncio.sleep(0.01)
+        assert bot.edit_message_text.call_args.kwargs["text"] == "День 1\n"
+
+        for day in range(2, 8):
+            await stream.write(f"День {day}\n")
+            await asyncio.sleep(0.01)
+        await stream.close()
+
+        assert bot.edit_message_text.await_count == 2
+        assert bot.edit_message_text.call_args.kwargs["text"].endswith("День 7\n")
+
+    @pytest.mark.asyncio
+    async def test_overflow_continues_in_new_message(self):
+        """Тест переноса продолжения в новое сообщение по лимиту длины."""
+        bot = _mock_bot()
+        stream = MessageStream(bot, chat_id=1, message_id=7, min_interval=0, max_length=10)
+
+        await stream.write("123456")
+        await stream.write("789012")
+        await stream.close()
+
+        assert bot.edit_message_text.call_args.kwargs["text"] == "123456"
+        assert bot.send_message.call_args.kwargs["text"] == "789012"
+        assert stream.message_id == 500
+
+    @pytest.mark.asyncio
+    async def test_oversized_chunk_split_at_safe_boundaries(self):
+        """Тест что фрагмент длиннее сообщения режется по строкам, не ломая теги."""
+        bot = _mock_bot()
+        stream = MessageStream(bot, chat_id=1, message_id=7, min_interval=0, max_length=30)
+        chunk = "<b>День 1</b> • идея поста\n" * 3 + "<b>" + "ж" * 40 + "</b>"
+
+        await stream.write(chunk)
+        await stream.close()
+
+        texts = [call.kwargs["text"] for call in bot.edit_message_text.call_args_list]
+        texts += [call.kwargs["text"] for call in bot.send_message.call_args_list]
+        assert all(len(text) <= 30 for text in texts)
+        assert texts[0] == "<b>День 1</b> • идея поста\n"
+        assert all(text.count("<b>") == text.count("</b>") for text in texts)
+        assert "".join(texts).count("ж") == 40
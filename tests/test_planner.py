@@ -2,11 +2,29 @@
 Тесты для сервиса генерации контент-плана.
 """
 
+import pytest
 
 from app.services.planner import (
+    CONTENT_TEMPLATES,
+    build_plan,
+    choose_templates,
+    compile_template,
+    decode_templates,
+    encode_templates,
+    normalize_text,
+    PLAN_BREAK,
+    PLATFORMS,
+    PlanRequest,
+    build_platform_plans,
+    iter_content_plan,
+    parse_request,
     parse_user_input,
     generate_content_plan,
-    generate_day_content
+    generate_day_content,
+    plan_cache,
+    plan_cache_stats,
+    plural_days,
+    render_template,
 )
 
 
@@ -45,6 +63,86 @@ class TestParseUserInput:
         assert niche == "кулинария"
         assert ta == "молодёжь"
 
+    def test_does_not_use_full_parser(self, monkeypatch):
+        """Тест что ниша и ЦА разбираются без parse_request."""
+        def full_parse(text):
+            raise AssertionError("slow path used")
+
+        monkeypatch.setattr("app.services.planner.parse_request", full_parse)
+
+        assert parse_user_input("Ниша: IT-курсы,  ЦА:  женщины 25-35 ") == ("IT-курсы", "женщины 25-35")
+
+
+class TestParseRequest:
+    """Тесты однопроходного разбора запроса."""
+
+    def test_returns_slotted_dataclass(self):
+        """Тест типа результата."""
+        request = parse_request("ниша: фитнес")
+
+        assert isinstance(request, PlanRequest)
+        assert not hasattr(request, "__dict__")
+
+    def test_multiline_request_with_all_fields(self):
+        """Тест многострочного запроса со всеми полями."""
+        request = parse_request(
+            "Привет!\n"
+            "Ниша:  йога;  ЦА: офисные работники, 30+\n"
+            "тон: дружелюбный\n"
+            "платформа: Инстаграм\n"
+            "3 поста в неделю на 2 недели"
+        )
+
+        assert request == PlanRequest(
+            niche="йога",
+            target_audience="офисные работники, 30+",
+            tone="дружелюбный",
+            platform="instagram",
+            platforms=("instagram",),
+            posts_per_week=3,
+            horizon=14,
+        )
+
+    def test_several_platforms(self):
+        """Тест перечисления площадок."""
+        request = parse_request("ниша: фитнес, площадки: Telegram, инстаграм, ВК и YouTube Shorts")
+
+        assert request.niche == "фитнес"
+        assert request.platform == "telegram"
+        assert request.platforms == ("telegram", "instagram", "vk", "youtube")
+
+    def test_free_text_with_horizon_frequency_and_platform(self):
+        """Тест свободного текста без ключей."""
+        request = parse_request("продвижение кофейни в телеграме на месяц, 2 поста в день")
+
+        assert request.niche == "продвижение кофейни в телеграме"
+        assert request.platform == "telegram"
+        assert request.horizon == 30
+        assert request.posts_per_week == 14
+
+    def test_numeric_field_values_and_aliases(self):
+        """Тест синонимов полей и чисел без единиц."""
+        request = parse_request("тема - ремонт\nаудитория - новосёлы\nгоризонт: 90\nчастота: 5")
+
+        assert request.niche == "ремонт"
+        assert request.target_audience == "новосёлы"
+        assert request.horizon == 90
+        assert request.posts_per_week == 5
+
+    def test_keys_need_word_boundary(self):
+        """Тест что «ца» внутри слова не считается полем ЦА."""
+        request = parse_request("уличная еда, улица и площадь")
+
+        assert request.niche == "уличная еда, улица и площадь"
+        assert request.target_audience == "широкая аудитория"
+
+    def test_plan_horizon_taken_from_request(self):
+        """Тест что горизонт из текста задаёт длину плана."""
+        plan = generate_content_plan("ниша: фитнес на 14 дней", seed=3)
+
+        assert "Контент-план на 14 дней" in plan
+        assert "Ниша: <b>фитнес</b>" in plan
+
 
 class TestGenerateContentPlan:
     """Тесты для функции generate_content_plan."""
@@ -76,6 +174,159 @@ class TestGenerateContentPlan:
         assert "Совет" in plan
 
 
+class TestCompiledTemplates:
+    """Тесты скомпилированных шаблонов и горизонтов плана."""
+
+    def test_compiled_templates_match_str_format(self):
+        """Тест что сборка из фрагментов совпадает с str.format."""
+        values = {"niche": "йога", "topic": "йога", "target_audience": "офис"}
+        for templates in CONTENT_TEMPLATES.values():
+            for template in templates:
+                assert render_template(compile_template(template), values) == template.format(**values)
+
+    def test_unsupported_placeholder_rejected(self):
+        """Тест что позиционные подстановки и спецификаторы не принимаются."""
+        with pytest.raises(ValueError):
+            compile_template("{niche:>10}")
+        with pytest.raises(ValueError):
+            compile_template("{}")
+
+    @pytest.mark.parametrize("days", [7, 14, 30, 90])
+    def test_plan_horizons(self, days):
+        """Тест планов на несколько недель."""
+        plan = generate_content_plan("ниша: фитнес", seed=1, days=days)
+
+        assert f"Контент-план на {days} {plural_days(days)}" in plan
+        assert f"День {days}</b>" in plan
+        assert f"День {days + 1}</b>" not in plan
+
+    def test_short_plan_is_prefix_of_long_plan(self):
+        """Тест что горизонт не меняет выбор первых дней."""
+        assert choose_templates(5, 30)[:7] == choose_templates(5, 7)
+
+    def test_plural_days(self):
+        """Тест склонения «день»."""
+        assert [plural_days(n) for n in (1, 3, 7, 11, 21, 22, 90)] == [
+            "день", "дня", "дней", "дней", "день", "дня", "дней"
+        ]
+
+    def test_invalid_horizon(self):
+        """Тест ограничения горизонта."""
+        with pytest.raises(ValueError):
+            choose_templates(1, 0)
+
+
+class TestSeededGeneration:
+    """Тесты воспроизводимой генерации."""
+
+    def test_same_seed_same_plan(self):
+        """Тест что seed полностью определяет план."""
+        first = generate_content_plan("ниша: фитнес", seed=42)
+        plan_cache.clear()
+
+        assert generate_content_plan("ниша: фитнес", seed=42) == first
+
+    def test_templates_depend_only_on_seed(self):
+        """Тест выбора шаблонов по seed."""
+        assert choose_templates(42) == choose_templates(42)
+        assert len({choose_templates(seed) for seed in range(20)}) > 1
+        assert build_plan("ниша: спорт", seed=42).templates == choose_templates(42)
+
+    def test_templates_encoding_roundtrip(self):
+        """Тест формата хранения индексов шаблонов."""
+        templates = choose_templates(7)
+
+        assert decode_templates(encode_templates(templates)) == templates
+
+
+class TestMultiPlatformPlans:
+    """Тесты планов для нескольких площадок."""
+
+    REQUEST = "ниша: фитнес, ЦА: мамы, площадки: telegram, instagram, vk, youtube на 14 дней"
+
+    def test_one_plan_per_platform_with_shared_calendar(self):
+        """Тест что у площадок общие ниша, дата и горизонт, но свой выбор шаблонов."""
+        plans = build_platform_plans(self.REQUEST, seed=5)
+
+        assert [p.platform for p in plans] == ["telegram", "instagram", "vk", "youtube"]
+        assert {(p.niche, p.target_audience, p.start_date, len(p.templates)) for p in plans} == {
+            (plans[0].niche, "мамы", plans[0].start_date, 14)
+        }
+        assert len({p.templates for p in plans}) > 1
+
+    def test_plans_separated_by_break(self):
+        """Тест что планы площадок идут отдельными сообщениями."""
+        chunks = list(iter_content_plan(self.REQUEST, seed=5))
+
+        assert chunks.count(PLAN_BREAK) == 3
+        messages = "".join(chunks).split(PLAN_BREAK)
+        for message, platform in zip(messages, ("telegram", "instagram", "vk", "youtube")):
+            assert f"Площадка: <b>{PLATFORMS[platform].title}</b>" in message
+            assert "День 14" in message
+
+    def test_platform_formats_are_used(self):
+        """Тест что у площадки появляются свои форматы постов."""
+        plan = "".join(iter_content_plan("ниша: фитнес, youtube на 90 дней", seed=1))
+
+        assert "Shorts" in plan
+        assert PLAN_BREAK not in plan
+
+    def test_request_without_platforms_unchanged(self):
+        """Тест что запрос без площадок даёт общий план без строки площадки."""
+        plans = build_platform_plans("ниша: фитнес", seed=3)
+
+        assert len(plans) == 1
+        assert plans[0].platform is None
+        assert plans[0].templates == choose_templates(3)
+        assert "Площадка" not in generate_content_plan("ниша: фитнес", seed=3)
+
+
+class TestPlanCache:
+    """Тесты кэша планов."""
+
+    def setup_method(self):
+        plan_cache.clear()
+
+    def test_normalize_text(self):
+        """Тест нормализации ключа."""
+        assert normalize_text("  Фитнес,  ЙОГА! ") == "фитнес йога"
+
+    def test_seeded_plan_is_cached_by_normalized_key(self):
+        """Тест что варианты написания попадают в одну запись, но каждый видит своё."""
+        plan = generate_content_plan("ниша: Фитнес!, ЦА: мамы", seed=7)
+        other = generate_content_plan("ниша: фитнес, ЦА: Мамы.", seed=7)
+
+        stats = plan_cache_stats()
+        assert stats["size"] == 1
+        assert stats["hits"] == 1
+        assert "Ниша: <b>Фитнес!</b>" in plan and "ЦА: <b>мамы</b>" in plan
+        assert "Ниша: <b>фитнес</b>" in other and "ЦА: <b>Мамы</b>" in other
+        assert "Фитнес!" not in other
+        plan_cache.clear()
+        assert generate_content_plan("ниша: фитнес, ЦА: Мамы.", seed=7) == other
+
+    def test_colliding_keys_keep_own_niche(self):
+        """Тест что ниши с одинаковым ключом («C++» и «C#») не получают чужой план."""
+        generate_content_plan("ниша: C++", seed=8)
+        plan = generate_content_plan("ниша: C#", seed=8)
+
+        assert plan_cache_stats()["hits"] == 1
+        assert "C#" in plan and "C++" not in plan
+
+    def test_seed_is_part_of_key(self):
+        """Тест что разные seed не смешиваются."""
+        generate_content_plan("ниша: фитнес", seed=1)
+        generate_content_plan("ниша: фитнес", seed=2)
+
+        assert plan_cache_stats()["size"] == 2
+
+    def test_unseeded_plans_bypass_cache(self):
+        """Тест что случайные планы не кэшируются."""
+        generate_content_plan("ниша: фитнес")
+
+        assert len(plan_cache) == 0
+
+
 class TestGenerateDayContent:
     """Тесты для функции generate_day_content."""
 
@@ -92,3 +343,65 @@ class TestGenerateDayContent:
 
         # Должны быть хоть какие-то различия
         assert len(set(contents)) > 1
+
+
+class TestPlanExecutor:
+    """Тесты пула генерации."""
+
+    @pytest.mark.asyncio
+    async def test_runs_off_event_loop(self):
+        """Тест что функция выполняется в отдельном потоке."""
+        import threading
+        from app.services.executor import PlanExecutor
+
+        executor = PlanExecutor(kind="thread", workers=1, max_queue=1)
+        try:
+            thread_name = await executor.run(lambda: threading.current_thread().name)
+        finally:
+            executor.shutdown()
+
+        assert thread_name != threading.current_thread().name
+
+    @pytest.mark.asyncio
+    async def test_queue_position_and_overflow(self):
+        """Тест позиции в очереди и отказа при переполнении."""
+        import asyncio
+        import threading
+        from app.services.executor import ExecutorBusyError, PlanExecutor
+
+        executor = PlanExecutor(kind="thread", workers=1, max_queue=1)
+        release = threading.Event()
+        positions = []
+
+        async def on_accepted(position):
+            positions.append(position)
+
+        try:
+            first = asyncio.create_task(executor.run(release.wait, on_accepted=on_accepted))
+            second = asyncio.create_task(executor.run(release.wait, on_accepted=on_accepted))
+            await asyncio.sleep(0.05)
+
+            assert executor.queued == 1
+            with pytest.raises(ExecutorBusyError):
+                await executor.run(release.wait)
+
+            release.set()
+            await asyncio.gather(first, second)
+        finally:
+            executor.shutdown()
+
+        assert positions == [0, 1]
+        assert executor.in_flight == 0
+
+    @pytest.mark.asyncio
+    async def test_process_pool_generates_plan(self):
+        """Тест генерации плана в пуле процессов."""
+        from app.services.executor import PlanExecutor
+
+        executor = PlanExecutor(kind="process", workers=1, max_queue=1)
+        try:
+            plan = await executor.run(generate_content_plan, "ниша: тест")
+        finally:
+            executor.shutdown()
+
+        assert "День 7" in plan
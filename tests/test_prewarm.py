@@ -0,0 +1,105 @@
+"""
+Тесты для прогрева кэша планов популярных ниш.
+"""
+
+from datetime import timedelta
+
+import pytest
+
+from app.services import prewarm
+from app.services.generators import TemplateGenerator
+from app.services.planner import cached_plan_chunks, generate_content_plan_chunks, plan_cache
+from app.services.prewarm import NICHE_PRESETS, PlanPrewarmer
+from app.services.trends import HOUR, TrendTracker
+
+FITNESS = NICHE_PRESETS["fitness"]
+
+
+@pytest.fixture(autouse=True)
+def clear_plan_cache():
+    plan_cache.clear()
+    yield
+    plan_cache.clear()
+
+
+class TestPlanPrewarmer:
+    """Тесты прогрева."""
+
+    @pytest.mark.asyncio
+    async def test_presets_served_from_cache(self, monkeypatch):
+        """Тест что прогретый план отдаётся без пула исполнителей и совпадает с обычным."""
+        prewarmer = PlanPrewarmer(top_niches=0, pause=0)
+        assert prewarmer.seed_for(FITNESS) is None
+
+        assert await prewarmer.warm() == len(NICHE_PRESETS)
+        seed = prewarmer.seed_for("Ниша:  фитнес,  ЦА: женщины 25-35")
+        assert seed is not None and seed == prewarmer.seed_for(FITNESS)
+        # Другое написание — свой план, а не прогретый
+        assert prewarmer.seed_for("Ниша: Фитнес!, ЦА: Женщины 25-35") is None
+        assert prewarmer.seed_for("ниша: йога") is None
+
+        async def busy(*args, **kwargs):
+            raise AssertionError("plan generated instead of cache hit")
+
+        monkeypatch.setattr("app.services.generators.plan_executor.run", busy)
+        chunks = [chunk async for chunk in TemplateGenerator().stream(FITNESS, seed)]
+        assert chunks == generate_content_plan_chunks(FITNESS, seed)
+
+        # Повторный прогрев того же дня ничего не перерисовывает
+        assert await prewarmer.warm() == 0
+
+    @pytest.mark.asyncio
+    async def test_popular_niches_warmed(self, temp_db, monkeypatch):
+        """Тест что частые ниши за сутки прогреваются вместе с кнопками."""
+        tracker = TrendTracker(k=5, width=64, depth=4, flush_interval=60, retention=HOUR)
+        for _ in range(3):
+            tracker.record("ниша: йога, ЦА: офисные работники")
+        monkeypatch.setattr(prewarm, "niche_trends", tracker)
+        prewarmer = PlanPrewarmer(top_niches=5, pause=0)
+
+        await prewarmer.warm()
+
+        seed = prewarmer.seed_for("йога")
+        assert seed is not None
+        assert cached_plan_chunks("йога", seed) is not None
+
+    @pytest.mark.asyncio
+    async def test_popular_niche_keeps_user_spelling(self, temp_db, monkeypatch):
+        """Тест что прогрев берёт частое написание ниши, а seed выдаётся только ему."""
+        tracker = TrendTracker(k=5, width=64, depth=4, flush_interval=60, retention=HOUR)
+        for text in ["ниша: C++"] * 3 + ["ниша: C#", "ниша: IT-курсы для Senior Python-разработчиков"]:
+            tracker.record(text)
+        monkeypatch.setattr(prewarm, "niche_trends", tracker)
+        prewarmer = PlanPrewarmer(top_niches=5, pause=0)
+
+        assert "ниша: C++" in await prewarmer.requests()
+        await prewarmer.warm()
+
+        seed = prewarmer.seed_for("ниша: C++")
+        assert seed is not None
+        assert prewarmer.seed_for("ниша: C#") is None
+        assert prewarmer.seed_for("ниша: c++") is None
+
+        async def busy(*args, **kwargs):
+            raise AssertionError("plan generated instead of cache hit")
+
+        monkeypatch.setattr("app.services.generators.plan_executor.run", busy)
+        text = "ниша: IT-курсы для Senior Python-разработчиков"
+        for request, niche in (("ниша: C++", "C++"), (text, "IT-курсы для Senior Python-разработчиков")):
+            plan = "".join([chunk async for chunk in TemplateGenerator().stream(request, prewarmer.seed_for(request))])
+            assert f"<b>{niche}</b>" in plan
+            assert niche.lower() not in plan
+
+    @pytest.mark.asyncio
+    async def test_seeds_expire_with_start_date(self, monkeypatch):
+        """Тест что после полуночи старые seed не выдаются до нового прогрева."""
+        prewarmer = PlanPrewarmer(top_niches=0, pause=0)
+        await prewarmer.warm()
+        old_seed = prewarmer.seed_for(FITNESS)
+
+        tomorrow = prewarm.default_start_date() + timedelta(days=1)
+        monkeypatch.setattr(prewarm, "default_start_date", lambda: tomorrow)
+        assert prewarmer.seed_for(FITNESS) is None
+
+        await prewarmer.warm()
+        assert prewarmer.seed_for(FITNESS) not in (None, old_seed)
@@ -0,0 +1,162 @@
+"""
+Тесты для поиска по планам.
+"""
+
+import pytest
+from unittest.mock import AsyncMock, MagicMock
+
+from app.database.connection import get_connection
+from app.database.fts import build_match, search_terms, search_words
+from app.database.repository import ContentPlanRepository, PlanSearchRepository
+from app.handlers.search import search_page
+from app.services.history import HistoryService
+from app.services.planner import generate_content_plan, plan_to_text
+from app.services.search import SearchIndexer, SearchService, format_results, highlight, search_queries
+
+
+async def _ids(user_id: int, query: str, limit: int = 10) -> list:
+    return [row["id"] for row in await PlanSearchRepository.search(user_id, query, limit)]
+
+
+class TestSearchTerms:
+    """Тесты термов индекса и запросов."""
+
+    def test_terms_scoped_by_owner(self):
+        """Тест что слова индексируются с ID владельца, ниша — с весом."""
+        terms = search_terms(17, "Бег", "мамы", "<b>Ёлка</b>").split()
+
+        assert terms.count("17_бег") == 3
+        assert terms.count("17_мамы") == 2
+        assert "17_елка" in terms
+        assert "17_b" not in terms
+
+    def test_match_prefixes_without_endings(self):
+        """Тест запроса: начала слов, без окончаний и предлогов."""
+        assert build_match(5, "Подготовку к марафону") == '"5_подготов"* "5_марафо"*'
+        assert build_match(5, "?!") is None
+
+
+class TestPlanSearch:
+    """Тесты индекса и выдачи."""
+
+    @pytest.mark.asyncio
+    async def test_triggers_keep_index_in_sync(self, temp_db):
+        """Тест что вставка, изменение и удаление плана видны в поиске."""
+        plan_id = await ContentPlanRepository.create(1, "подготовка к марафону", "бегуны", "")
+        await ContentPlanRepository.create(2, "марафон", "все", "")
+
+        assert await _ids(1, "марафон") == [plan_id]
+
+        # Без SQL-функций: так же можно писать из sqlite3 или скриптов
+        conn = await get_connection()
+        await conn.execute(
+            "UPDATE content_plans SET niche = 'йога', search_terms = ? WHERE id = ?",
+            (search_terms(1, "йога", "бегуны", ""), plan_id)
+        )
+        await conn.commit()
+        assert await _ids(1, "марафон") == []
+        assert await _ids(1, "йога") == [plan_id]
+
+        await conn.execute("DELETE FROM content_plans WHERE id = ?", (plan_id,))
+        await conn.commit()
+        assert await _ids(1, "йога") == []
+
+    @pytest.mark.asyncio
+    async def test_niche_ranked_above_text(self, temp_db):
+        """Тест что совпадение в нише важнее, чем в тексте плана."""
+        in_text = await ContentPlanRepository.create(1, "спорт", "все", "день 1: пробежка к марафону")
+        in_niche = await ContentPlanRepository.create(1, "марафон", "все", "")
+
+        assert await _ids(1, "марафон") == [in_niche, in_text]
+
+    @pytest.mark.asyncio
+    async def test_pages_and_snippets(self, temp_db):
+        """Тест листания и сниппетов."""
+        for i in range(7):
+            await ContentPlanRepository.create(1, f"бег {i}", "все", "")
+        await ContentPlanRepository.create(
+            1, "спорт", "все", "<b>День 1</b>\nдолгий текст про подготовку к марафону и питание перед стартом"
+        )
+
+        first = await SearchService.search(1, "бег")
+        second = await SearchService.search(1, "бег", page=1)
+        assert len(first.plans) == 5 and first.has_next
+        assert len(second.plans) == 2 and not second.has_next
+
+        text = format_results(await SearchService.search(1, "марафон"))
+        assert "<b>марафону</b>" in text
+        assert "&lt;b&gt;" not in text
+
+    @pytest.mark.asyncio
+    async def test_compact_plan_found_by_text(self, temp_db):
+        """Тест что компактный план находится по слову из текста дней, не из ниши и ЦА."""
+        text = "ниша: фитнес, ЦА: мамы"
+        plan = generate_content_plan(text, seed=5)
+        await HistoryService.save(1, text, 5, [plan])
+        [row] = await ContentPlanRepository.get_by_user(1)
+        assert row["plan_content"] == ""
+
+        word = max(set(search_words(plan_to_text(plan))) - {"фитнес", "мамы"}, key=len)
+        assert await _ids(1, word) == [row["id"]]
+        assert f"<b>{word}" in format_results(await SearchService.search(1, word)).lower()
+
+        conn = await get_connection()
+        await conn.execute("DELETE FROM content_plans WHERE id = ?", (row["id"],))
+        await conn.commit()
+        assert await _ids(1, word) == []
+        await conn.execute("INSERT INTO content_plans_fts (content_plans_fts, rank) VALUES ('integrity-check', 0)")
+
+    @pytest.mark.asyncio
+    async def test_backfill_indexes_existing_plans(self, temp_db):
+        """Тест фоновой индексации планов, сохранённых до появления термов."""
+        old = [await ContentPlanRepository.create(1, f"марафон {i}", "все", "") for i in range(4)]
+        text = "ниша: марафон, ЦА: бегуны"
+        plan = generate_content_plan(text, seed=3)
+        await HistoryService.save(1, text, 3, [plan])
+        [compact] = [row["id"] for row in await ContentPlanRepository.get_by_user(1) if row["id"] not in old]
+        old.append(compact)
+        conn = await get_connection()
+        # Состояние сразу после миграции 15 на существующей базе
+        await conn.execute(
+            "INSERT INTO content_plans_fts_backfill (id, position, last_id) VALUES (1, 0, ?)", (old[-1],)
+        )
+        await conn.execute("INSERT INTO content_plans_fts (content_plans_fts) VALUES ('delete-all')")
+        await conn.execute("UPDATE content_plans SET search_terms = NULL")
+        await conn.commit()
+        new = await ContentPlanRepository.create(1, "марафон новый", "все", "")
+        await conn.execute("UPDATE content_plans SET niche = 'марафон старый' WHERE id = ?", (old[0],))
+        await conn.commit()
+
+        assert await _ids(1, "марафон") == [new]
+
+        indexer = SearchIndexer(batch_size=2, pause=0)
+        await indexer._run()
+
+        assert indexer.indexed == 5
+        assert sorted(await _ids(1, "марафон")) == old + [new]
+        assert await _ids(1, "старый") == [old[0]]
+        word = max(set(search_words(plan_to_text(plan))) - {"марафон", "бегуны"}, key=len)
+        assert await _ids(1, word) == [compact]
+        assert await PlanSearchRepository.unindexed(10) == []
+        await conn.execute("INSERT INTO content_plans_fts (content_plans_fts, rank) VALUES ('integrity-check', 0)")
+
+    @pytest.mark.asyncio
+    async def test_page_callback_uses_last_query(self, temp_db):
+        """Тест листания по кнопке: запрос берётся из памяти."""
+        search_queries.clear()
+        callback = MagicMock()
+        callback.data = "search:1"
+        callback.from_user.id = 1
+        callback.answer = AsyncMock()
+        callback.message.edit_text = AsyncMock()
+
+        await search_page(callback)
+        assert callback.answer.call_args.kwargs["show_alert"] is True
+
+        await SearchService.search(1, "марафон")
+        await search_page(callback)
+        assert "марафон" in callback.message.edit_text.call_args[0][0]
+
+    def test_highlight_escapes_html(self):
+        """Тест подсветки: совпадения жирным, разметка экранирована."""
+        assert highlight("Бег & <йога>", "бег") == "<b>Бег</b> &amp; &lt;йога&gt;"
@@ -0,0 +1,143 @@
+"""
+Тесты для счётчиков и дневной статистики /admin.
+"""
+
+from datetime import date
+from types import SimpleNamespace
+
+import aiosqlite
+import pytest
+
+from app.database import migrations
+from app.database.connection import get_connection
+from app.database.repository import ContentPlanRepository, StatsRepository, UserRepository
+from app.services.stats import StatsService, format_summary
+from app.services.subscription import SubscriptionService
+
+
+def _users(*ids: int) -> list:
+    return [SimpleNamespace(id=i, username=f"user{i}", first_name=None) for i in ids]
+
+
+async def _today() -> dict:
+    rows = await StatsRepository.daily(date.today().isoformat())
+    return rows[0] if rows else {}
+
+
+class TestCounters:
+    """Тесты счётчиков, которые ведут триггеры."""
+
+    @pytest.mark.asyncio
+    async def test_counters_follow_writes(self, temp_db):
+        """Тест итогов после вставок, блокировок и удаления плана."""
+        await UserRepository.upsert_many(_users(1, 2, 3))
+        await UserRepository.upsert_many(_users(1, 2))
+        await UserRepository.set_inactive([2, 3])
+        await UserRepository.set_inactive([3])
+        plan_id = await ContentPlanRepository.create(1, "фитнес", "все", "план")
+        await ContentPlanRepository.create(1, "йога", "все", "план")
+
+        conn = await get_connection()
+        await conn.execute("DELETE FROM content_plans WHERE id = ?", (plan_id,))
+        await conn.commit()
+
+        assert await UserRepository.count_all() == 3
+        assert await UserRepository.count_active() == 1
+        assert await ContentPlanRepository.count_all() == 1
+        today = await _today()
+        assert today["new_users"] == 3
+        # Созданные за день планы не уменьшаются при удалении
+        assert today["plans"] == 2
+
+    @pytest.mark.asyncio
+    async def test_dau_counts_each_user_once(self, temp_db):
+        """Тест DAU: повторные апдейты пользователя за день не увеличивают счётчик."""
+        await UserRepository.upsert_many(_users(1, 2))
+        await UserRepository.upsert_many(_users(2, 3))
+        await UserRepository.upsert(3, "user3")
+        await UserRepository.set_inactive([1])
+
+        assert (await _today())["active_users"] == 3
+
+    @pytest.mark.asyncio
+    async def test_payments_and_subscribers(self, temp_db):
+        """Тест оплат за день и снимка числа подписчиков."""
+        await SubscriptionService.grant_access(1, 30)
+        await SubscriptionService.grant_access(1, 30)
+        await SubscriptionService.grant_access(2, 30)
+        await UserRepository.upsert(3)
+
+        await StatsService.record_snapshot()
+        today = await _today()
+
+        assert today["payments"] == 3
+        assert today["subscribers"] == 2
+
+
+class TestStatsSummary:
+    """Тесты сводки /admin."""
+
+    @pytest.mark.asyncio
+    async def test_trends_sum_window(self, temp_db):
+        """Тест трендов: дни вне окна не учитываются."""
+        conn = await get_connection()
+        await conn.executemany(
+            "INSERT INTO stats_daily (day, new_users, plans, active_users, subscribers) VALUES (?, ?, ?, ?, ?)",
+            [
+                (date.fromordinal(date.today().toordinal() - 40).isoformat(), 100, 100, 100, 1),
+                (date.fromordinal(date.today().toordinal() - 20).isoformat(), 5, 7, 4, 2),
+                (date.fromordinal(date.today().toordinal() - 3).isoformat(), 1, 2, 2, 4),
+            ]
+        )
+        await conn.commit()
+        await UserRepository.upsert_many(_users(1))
+        await StatsService.record_snapshot()
+
+        summary = await StatsService.summary()
+        week, month = summary.trends
+
+        assert (week.new_users, week.plans, week.avg_dau) == (2, 2, 1.5)
+        assert (month.new_users, month.plans) == (7, 9)
+        assert month.avg_dau == pytest.approx(7 / 3)
+        assert week.subscribers_change == -4
+        assert "30 дн." in format_summary(summary)
+
+
+class TestStatsMigration:
+    """Тесты агрегирования существующих данных миграцией 10."""
+
+    @pytest.mark.asyncio
+    async def test_existing_rows_are_aggregated(self, tmp_path, monkeypatch):
+        """Тест пачечного заполнения счётчиков и агрегатов по дням."""
+        monkeypatch.setattr(migrations, "BATCH_SIZE", 2)
+        conn = await aiosqlite.connect(str(tmp_path / "stats.sqlite3"))
+        try:
+            await migrations.migrate(conn, target=8)
+            await conn.executemany(
+                "INSERT INTO users (telegram_id, is_active, created_at) VALUES (?, ?, ?)",
+                [(1, 1, 1700000000), (2, 0, 1700000000), (3, 1, 1700100000)]
+            )
+            await conn.executemany(
+                "INSERT INTO content_plans (user_id, niche, plan_content, created_at) VALUES (?, ?, '', ?)",
+                [(1, "a", 1700000000)] * 5
+            )
+            await conn.commit()
+
+            assert await migrations.migrate(conn) == migrations.MIGRATIONS[-1].version
+            await conn.execute("INSERT INTO content_plans (user_id, niche, plan_content) VALUES (1, 'b', '')")
+            await conn.commit()
+
+            cursor = await conn.execute("SELECT name, value FROM stats_counters")
+            counters = dict(await cursor.fetchall())
+            cursor = await conn.execute("SELECT day, new_users, plans FROM stats_daily ORDER BY day")
+            daily = await cursor.fetchall()
+            cursor = await conn.execute("SELECT COUNT(*) FROM schema_migration_progress")
+            progress_rows = (await cursor.fetchone())[0]
+        finally:
+            await conn.close()
+
+        first_day = date.fromtimestamp(1700000000).isoformat()
+        assert counters == {"users": 3, "active_users": 2, "plans": 6}
+        assert daily[0] == (first_day, 2, 5)
+        assert sum(row[1] for row in daily) == 3
+        assert progress_rows == 0
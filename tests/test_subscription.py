@@ -27,6 +27,15 @@ class TestSubscriptionService:
         has_access = await SubscriptionService.check_access(user_id)
         assert has_access is True
 
+    @pytest.mark.asyncio
+    async def test_grant_access_unknown_user(self, temp_db):
+        """Тест выдачи доступа пользователю, которого ещё нет в БД."""
+        user_id = 1005
+
+        await SubscriptionService.grant_access(user_id, 30)
+
+        assert await SubscriptionService.check_access(user_id) is True
+
     @pytest.mark.asyncio
     async def test_grant_access_extension(self, temp_db):
         """Тест продления доступа."""
@@ -52,6 +61,7 @@ class TestSubscriptionService:
         # Ставим дату в прошлом
         past_date = datetime.now() - timedelta(days=1)
         await UserRepository.update_subscription(user_id, past_date)
+        SubscriptionService.invalidate(user_id)
 
         has_access = await SubscriptionService.check_access(user_id)
         assert has_access is False
@@ -64,3 +74,236 @@ class TestSubscriptionService:
 
         has_access = await SubscriptionService.check_access(user_id)
         assert has_access is False
+
+
+class TestSubscriptionCache:
+    """Тесты кэша сроков подписки."""
+
+    @pytest.mark.asyncio
+    async def test_repeated_checks_hit_cache(self, temp_db):
+        """Тест что повторные проверки не обращаются к БД."""
+        from unittest.mock import patch
+
+        user_id = 2001
+        await SubscriptionService.grant_access(user_id, 30)
+
+        with patch.object(
+            UserRepository, "get_by_telegram_id", side_effect=AssertionError("DB hit")
+        ):
+            for _ in range(5):
+                assert await SubscriptionService.check_access(user_id) is True
+
+        assert SubscriptionService.cache_stats()["hits"] == 5
+
+    @pytest.mark.asyncio
+    async def test_grant_access_updates_cached_denial(self, temp_db):
+        """Тест что оплата обновляет закэшированный отказ."""
+        user_id = 2002
+        await UserRepository.get_or_create(user_id)
+
+        assert await SubscriptionService.check_access(user_id) is False
+        await SubscriptionService.grant_access(user_id, 30)
+
+        assert await SubscriptionService.check_access(user_id) is True
+
+    @pytest.mark.asyncio
+    async def test_cached_expiry_is_checked_against_clock(self, temp_db):
+        """Тест что закэшированная подписка истекает по времени."""
+        from unittest.mock import patch
+
+        user_id = 2003
+        end = await SubscriptionService.grant_access(user_id, 1)
+
+        with patch("app.services.subscription.time.time", return_value=end.timestamp() + 1):
+            assert await SubscriptionService.check_access(user_id) is False
+
+    @pytest.mark.asyncio
+    async def test_slow_load_does_not_overwrite_grant(self, temp_db, monkeypatch):
+        """Тест что чтение из БД, закончившееся после оплаты, не кладёт в кэш старый срок."""
+        import asyncio
+
+        user_id = 2004
+        await UserRepository.get_or_create(user_id)
+        SubscriptionService.clear_cache()
+        load_expiry = SubscriptionService._load_expiry
+        read_done = asyncio.Event()
+        release = asyncio.Event()
+
+        async def slow_load(uid):
+            value = await load_expiry(uid)
+            read_done.set()
+            await release.wait()
+            return value
+
+        monkeypatch.setattr(SubscriptionService, "_load_expiry", staticmethod(slow_load))
+        check = asyncio.create_task(SubscriptionService.check_access(user_id))
+        await read_done.wait()
+        await SubscriptionService.grant_access(user_id, 30)
+        release.set()
+
+        assert await check is False  # прочитано до оплаты
+        assert await SubscriptionService.check_access(user_id) is True
+
+
+class TestLRUCache:
+    """Тесты LRU-кэша с TTL."""
+
+    def test_evicts_least_recently_used(self):
+        """Тест вытеснения самой давней записи."""
+        from app.services.cache import LRUCache, MISSING
+
+        cache = LRUCache(max_size=2)
+        cache.set("a", 1)
+        cache.set("b", 2)
+        cache.get("a")
+        cache.set("c", 3)
+
+        assert cache.get("b") is MISSING
+        assert cache.get("a") == 1
+        assert cache.stats()["evictions"] == 1
+
+    def test_expired_entries_are_misses(self):
+        """Тест что устаревшие записи не возвращаются."""
+        from app.services.cache import LRUCache
+
+        cache = LRUCache(max_size=10, ttl=60)
+        cache.set("a", None, ttl=-1)
+
+        assert cache.get("a", "default") == "default"
+        assert cache.stats()["misses"] == 1
+
+
+class TestExpiryScheduler:
+    """Тесты планировщика окончания подписок."""
+
+    @staticmethod
+    def _collector(scheduler):
+        events = []
+
+        async def listener(event):
+            events.append((event.kind, event.user_id))
+
+        scheduler.subscribe(listener)
+        return events
+
+    @pytest.mark.asyncio
+    async def test_fires_reminder_then_expiry(self, temp_db):
+        """Тест напоминания и окончания подписки в нужном порядке."""
+        import asyncio
+        import time
+        from app.services.expiry import EXPIRED, EXPIRING_SOON, ExpiryScheduler
+
+        await UserRepository.get_or_create(3001)
+        expires_at = int(time.time()) + 3
+        await UserRepository.update_subscription(3001, datetime.fromtimestamp(expires_at))
+
+        scheduler = ExpiryScheduler(reminder_before=1.5, window=60)
+        events = self._collector(scheduler)
+        await scheduler.start()
+        try:
+            assert len(scheduler) == 1
+            await asyncio.sleep(expires_at - time.time() + 0.2)
+        finally:
+            await scheduler.stop()
+
+        assert events == [(EXPIRING_SOON, 3001), (EXPIRED, 3001)]
+        assert len(scheduler) == 0
+
+    @pytest.mark.asyncio
+    async def test_reminds_at_once_inside_reminder_window(self, temp_db):
+        """Тест что подписка, уже попавшая в окно напоминания при запуске, получает напоминание."""
+        import asyncio
+        from app.services.expiry import EXPIRING_SOON, ExpiryScheduler
+
+        await UserRepository.get_or_create(3005)
+        await UserRepository.update_subscription(3005, datetime.now() + timedelta(hours=1))
+
+        scheduler = ExpiryScheduler(reminder_before=86400, window=60)
+        events = self._collector(scheduler)
+        await scheduler.start()
+        try:
+            await asyncio.sleep(0.1)
+        finally:
+            await scheduler.stop()
+
+        assert events == [(EXPIRING_SOON, 3005)]
+
+    @pytest.mark.asyncio
+    async def test_restart_does_not_repeat_events(self, temp_db):
+        """Тест что перезапуск не повторяет напоминание, а истёкшая за простой подписка получает EXPIRED один раз."""
+        import asyncio
+        import time
+        from app.services.expiry import EXPIRED, EXPIRING_SOON, ExpiryScheduler
+
+        await UserRepository.get_or_create(3007)
+        await UserRepository.update_subscription(3007, datetime.now() + timedelta(hours=1))
+        await UserRepository.get_or_create(3008)
+        await UserRepository.update_subscription(3008, datetime.fromtimestamp(int(time.time()) - 600))
+
+        events = []
+        for _ in range(2):
+            scheduler = ExpiryScheduler(reminder_before=86400, window=3600)
+            events.append(self._collector(scheduler))
+            await scheduler.start()
+            try:
+                await asyncio.sleep(0.1)
+            finally:
+                await scheduler.stop()
+
+        assert sorted(events[0]) == [(EXPIRED, 3008), (EXPIRING_SOON, 3007)]
+        assert events[1] == []
+
+    @pytest.mark.asyncio
+    async def test_reminder_uses_configured_lead_time(self, monkeypatch):
+        """Тест что в напоминании указан настроенный срок."""
+        from unittest.mock import AsyncMock, MagicMock
+        from app.config import settings
+        from app.handlers.payment import send_expiry_reminder
+        from app.services.expiry import EXPIRING_SOON, ExpiryEvent
+
+        bot = MagicMock()
+        bot.send_message = AsyncMock()
+        event = ExpiryEvent(EXPIRING_SOON, 3006, 0)
+        for days, expected in ((1, "меньше 1 дня"), (5, "меньше 5 дней"), (0.5, "меньше 0,5 дня")):
+            monkeypatch.setattr(settings, "expiry_reminder_days", days)
+            await send_expiry_reminder(bot, event)
+            assert expected in bot.send_message.call_args.kwargs["text"]
+
+    @pytest.mark.asyncio
+    async def test_reschedule_drops_stale_events(self, temp_db):
+        """Тест что продление подписки отменяет старые события."""
+        import asyncio
+        import time
+        from app.services.expiry import ExpiryScheduler
+
+        scheduler = ExpiryScheduler(reminder_before=0, window=60)
+        events = self._collector(scheduler)
+        await scheduler.start()
+        try:
+            now = int(time.time())
+            scheduler.schedule(3002, now + 1)
+            scheduler.schedule(3002, now + 30)
+            await asyncio.sleep(now + 1 - time.time() + 0.2)
+        finally:
+            await scheduler.stop()
+
+        assert events == []
+
+    @pytest.mark.asyncio
+    async def test_far_expiries_stay_out_of_memory(self, temp_db):
+        """Тест что подписки за пределами окна не загружаются."""
+        from app.services.expiry import ExpiryScheduler
+
+        await UserRepository.get_or_create(3003)
+        await UserRepository.get_or_create(3004)
+        await UserRepository.update_subscription(3003, datetime.now() + timedelta(days=2))
+        await UserRepository.update_subscription(3004, datetime.now() + timedelta(days=90))
+
+        scheduler = ExpiryScheduler(reminder_before=86400, window=7 * 86400)
+        await scheduler.start()
+        try:
+            assert len(scheduler) == 1
+            scheduler.schedule(3004, int((datetime.now() + timedelta(days=91)).timestamp()))
+            assert len(scheduler) == 1
+        finally:
+            await scheduler.stop()
@@ -0,0 +1,145 @@
+"""
+Тесты для статистики популярных ниш (/top).
+"""
+
+import random
+
+import pytest
+from unittest.mock import AsyncMock, MagicMock
+
+from app.config import settings
+from app.handlers.admin import cmd_top
+from app.services import trends
+from app.services.trends import AUDIENCE, HOUR, NICHE, CountMinSketch, HeavyHitters, TrendTracker
+
+
+def _tracker() -> TrendTracker:
+    return TrendTracker(k=3, width=64, depth=4, flush_interval=60, retention=7 * 24 * HOUR)
+
+
+class TestSketch:
+    """Тесты count-min sketch и top-K."""
+
+    def test_estimate_never_below_true_count(self):
+        """Тест что оценка не меньше настоящей частоты."""
+        sketch = CountMinSketch(width=32, depth=4)
+        rng = random.Random(1)
+        counts = {}
+        for _ in range(2000):
+            key = f"ниша {rng.randrange(300)}"
+            counts[key] = counts.get(key, 0) + 1
+            sketch.add(key)
+
+        assert all(sketch.estimate(key) >= count for key, count in counts.items())
+        assert sketch.total == 2000
+
+    def test_heavy_hitters_survive_long_tail(self):
+        """Тест что частые ключи остаются в top-K среди тысяч редких."""
+        hitters = HeavyHitters(k=5, width=256, depth=4)
+        rng = random.Random(2)
+        stream = ["фитнес"] * 300 + ["кулинария"] * 200 + [f"редкая {i}" for i in range(3000)]
+        rng.shuffle(stream)
+        for key in stream:
+            hitters.add(key)
+
+        top = hitters.top(2)
+        assert [key for key, _ in top] == ["фитнес", "кулинария"]
+        assert top[0][1] >= 300
+        assert len(hitters) == 5
+
+
+class TestTrendTracker:
+    """Тесты почасового учёта и сброса в БД."""
+
+    def test_record_normalizes_and_skips_default_audience(self):
+        """Тест ключей: регистр и пунктуация не важны, ЦА по умолчанию не считается."""
+        tracker = _tracker()
+        tracker.record("ниша: Фитнес!, ЦА: мамы")
+        tracker.record("фитнес")
+        tracker.record("ниша: Фитнес!")
+
+        # Показывается самое частое исходное написание
+        assert tracker.hourly(NICHE) == [("Фитнес!", 3)]
+        assert tracker.hourly(AUDIENCE) == [("мамы", 1)]
+
+    def test_long_text_not_counted(self):
+        """Тест что длинное описание своими словами не обрезается в ключ, а не учитывается."""
+        tracker = _tracker()
+        tracker.record("ниша: " + "очень длинное описание бизнеса " * 3)
+
+        assert tracker.hourly(NICHE) == []
+
+    def test_frequent_label_survives_rare_spellings(self):
+        """Тест что редкие написания не вытесняют частое."""
+        hitters = HeavyHitters(k=1, width=64, depth=4)
+        for label in ["C++"] * 5 + [f"c{'+' * i}" for i in range(3, 20)]:
+            hitters.add("c", label=label)
+
+        assert hitters.label("c") == "C++"
+
+    @pytest.mark.asyncio
+    async def test_daily_sums_finished_hours(self, temp_db, monkeypatch):
+        """Тест суток: закончившийся час сбрасывается в БД и суммируется с текущим."""
+        now = [1_700_000_000 - 1_700_000_000 % HOUR + 10]
+        monkeypatch.setattr(trends.time, "time", lambda: now[0])
+        tracker = _tracker()
+
+        for _ in range(3):
+            tracker.record("ниша: йога")
+        tracker.record("ниша: бег")
+        now[0] += HOUR
+        tracker.record("ниша: бег")
+
+        assert tracker.hourly(NICHE) == [("бег", 1)]
+        assert await tracker.daily(NICHE) == [("йога", 3), ("бег", 2)]
+
+        # Повторный сброс заменяет оценку часа, а не прибавляет её
+        tracker.record("ниша: бег")
+        assert await tracker.daily(NICHE) == [("бег", 3), ("йога", 3)]
+
+        now[0] += 24 * HOUR
+        assert await tracker.daily(NICHE) == []
+
+    @pytest.mark.asyncio
+    async def test_restart_continues_current_hour(self, temp_db):
+        """Тест что после перезапуска посреди часа сброс не занижает записанные оценки."""
+        before = _tracker()
+        for _ in range(5):
+            before.record("ниша: йога")
+        await before.flush()
+
+        after = _tracker()
+        await after.start()
+        try:
+            after.record("ниша: Йога")
+            assert await after.daily(NICHE) == [("йога", 6)]
+        finally:
+            await after.stop()
+
+    @pytest.mark.asyncio
+    async def test_daily_keeps_label(self, temp_db):
+        """Тест что сутки из БД показывают исходное написание, а не ключ."""
+        tracker = _tracker()
+        tracker.record("ниша: IT-курсы для Senior Python-разработчиков")
+        tracker.record("ниша: it курсы для senior python разработчиков")
+        tracker.record("ниша: IT-курсы для Senior Python-разработчиков")
+
+        assert await tracker.daily(NICHE) == [("IT-курсы для Senior Python-разработчиков", 3)]
+
+    @pytest.mark.asyncio
+    async def test_top_command(self, temp_db, monkeypatch):
+        """Тест /top для админа."""
+        tracker = _tracker()
+        monkeypatch.setattr("app.handlers.admin.niche_trends", tracker)
+        settings.admin_ids = [123456789]
+        tracker.record("ниша: <кофейня>, ЦА: студенты")
+        message = MagicMock()
+        message.from_user.id = 123456789
+        message.answer = AsyncMock()
+
+        await cmd_top(message)
+
+        text = message.answer.call_args[0][0]
+        assert "Ниши за сутки" in text
+        assert "1. &lt;кофейня&gt; — ~1" in text
+        assert "студенты" in text